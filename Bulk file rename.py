@@ -1,25 +1,193 @@
+import ctypes
+import ctypes.util
+import hashlib
+import json
 import os
+import re
+import select
 import shutil
-from pathlib import Path
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 
-def backup_files(directory, backup_directory):
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl, so reflinks are unavailable there
+    fcntl = None
+
+# Backup engine configuration
+BACKUP_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+COPY_BUFFER_SIZE = 1024 * 1024
+FICLONE = 0x40049409  # Linux ioctl that clones a file's extents (btrfs, XFS, ...)
+
+# Rename engine configuration
+JOURNAL_NAME = ".bulk_rename.journal"
+TEMP_SUFFIX = ".bulk_rename.tmp"
+DISPLACED_SUFFIX = ".bulk_rename.displaced"
+
+# Incremental backup configuration
+BACKUP_CACHE_NAME = "hash_cache.json"
+
+# Watch mode configuration
+WATCH_STATE_NAME = ".bulk_rename.watch"
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT_SIZE = struct.calcsize("iIII")
+
+def _same_filesystem(path_a, path_b):
+    """
+    Check whether two paths live on the same filesystem.
+
+    Args:
+        path_a (str): First path.
+        path_b (str): Second path.
+
+    Returns:
+        bool: True if both paths share a device id.
+    """
+    return os.stat(path_a).st_dev == os.stat(path_b).st_dev
+
+def _reflink(source_fd, target_fd):
+    """
+    Clone the source file into the target with a copy-on-write reflink.
+
+    Raises:
+        OSError: If the platform or filesystem does not support reflinks.
+    """
+    if fcntl is None:
+        raise OSError("Reflinks are not supported on this platform")
+    fcntl.ioctl(target_fd, FICLONE, source_fd)
+
+def _kernel_copy(source_fd, target_fd, size):
+    """
+    Copy data between two file descriptors inside the kernel.
+
+    Uses os.copy_file_range when available and os.sendfile otherwise, so the
+    data never passes through a user-space buffer.
+
+    Raises:
+        OSError: If neither system call can be used for these files.
+    """
+    copy_range = getattr(os, "copy_file_range", None)
+    offset = 0
+    while offset < size:
+        if copy_range is not None:
+            copied = copy_range(source_fd, target_fd, size - offset)
+        elif hasattr(os, "sendfile"):
+            copied = os.sendfile(target_fd, source_fd, offset, size - offset)
+        else:
+            raise OSError("No kernel copy system call available")
+        if copied == 0:
+            break
+        offset += copied
+
+def _buffered_copy(source_file, target_file):
+    """Copy data between two open file objects through a large buffer."""
+    shutil.copyfileobj(source_file, target_file, COPY_BUFFER_SIZE)
+
+def copy_file(source_path, target_path, size, same_filesystem, method="auto"):
+    """
+    Copy a single file using the fastest method available.
+
+    Args:
+        source_path (str): File to copy.
+        target_path (str): Destination file path.
+        size (int): Size of the source file in bytes.
+        same_filesystem (bool): True if source and target share a filesystem.
+        method (str, optional): "auto" tries reflink, then copy_file_range/sendfile, then a buffered copy.
+            "hardlink" links the file instead of copying it, "copy" always uses a buffered copy. Defaults to "auto".
+
+    Returns:
+        int: Number of bytes backed up.
+    """
+    # An existing target may be a hardlink to the source from an earlier backup, so it is
+    # never opened in place: the copy is built under a temporary name and swapped in
+    temp_path = f"{target_path}.{os.getpid()}{TEMP_SUFFIX}"
+    if os.path.lexists(temp_path):
+        os.remove(temp_path)
+    try:
+        if method == "hardlink" and same_filesystem:
+            try:
+                os.link(source_path, temp_path)
+            except OSError:
+                pass
+            else:
+                os.replace(temp_path, target_path)
+                return size
+
+        _copy_contents(source_path, temp_path, size, same_filesystem, method)
+        shutil.copystat(source_path, temp_path)
+        os.replace(temp_path, target_path)
+        return size
+    finally:
+        # rename() leaves both names alone when they already link to the same file
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+
+def _copy_contents(source_path, target_path, size, same_filesystem, method):
+    """Write a copy of the source into a new target file with the fastest method allowed."""
+    with open(source_path, "rb") as source_file, open(target_path, "wb") as target_file:
+        copied = False
+        if method != "copy" and same_filesystem:
+            try:
+                _reflink(source_file.fileno(), target_file.fileno())
+                copied = True
+            except OSError:
+                pass
+        if not copied and method != "copy":
+            try:
+                _kernel_copy(source_file.fileno(), target_file.fileno(), size)
+                copied = True
+            except OSError:
+                # Start over from a clean target before falling back
+                target_file.seek(0)
+                target_file.truncate()
+        if not copied:
+            source_file.seek(0)
+            _buffered_copy(source_file, target_file)
+
+def backup_files(directory, backup_directory, workers=BACKUP_WORKERS, method="auto"):
     """
     Create a backup of files in the specified directory.
 
+    Files are copied across a thread pool. When the backup directory is on the same
+    filesystem as the source, reflinks or in-kernel copies are used where possible.
+
     Args:
         directory (str): Source directory to backup files from.
         backup_directory (str): Directory where the backup will be stored.
+        workers (int, optional): Number of copy threads. Defaults to BACKUP_WORKERS.
+        method (str, optional): Copy method, one of "auto", "hardlink" or "copy". Defaults to "auto".
 
     Returns:
-        None
+        Tuple[int, int]: Number of files and total bytes backed up.
     """
     if not os.path.exists(backup_directory):
         os.makedirs(backup_directory)
 
-    for entry in os.scandir(directory):
-        if entry.is_file():
-            shutil.copy2(entry.path, backup_directory)
-            print(f"Backed up: {entry.name}")
+    same_filesystem = _same_filesystem(directory, backup_directory)
+    jobs = [(entry.path, os.path.join(backup_directory, entry.name), entry.stat().st_size)
+            for entry in os.scandir(directory) if entry.is_file()]
+
+    start_time = time.perf_counter()
+    file_count = 0
+    total_bytes = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(copy_file, source, target, size, same_filesystem, method)
+                   for source, target, size in jobs]
+        for (source, _, _), future in zip(jobs, futures):
+            try:
+                total_bytes += future.result()
+                file_count += 1
+            except Exception as e:
+                print(f"Error backing up {os.path.basename(source)}: {str(e)}")
+    elapsed = max(time.perf_counter() - start_time, 1e-9)
+
+    print(f"Backed up {file_count} files ({total_bytes} bytes) in {elapsed:.2f}s "
+          f"- {file_count / elapsed:.1f} files/s, {total_bytes / elapsed / (1024 * 1024):.1f} MB/s")
+    return file_count, total_bytes
 
 def restore_files(directory, backup_directory):
     """
@@ -34,72 +202,774 @@ def restore_files(directory, backup_directory):
     """
     for entry in os.scandir(backup_directory):
         if entry.is_file():
-            new_filename = os.path.splitext(entry.name)[0]
             old_filepath = entry.path
-            new_filepath = os.path.join(directory, new_filename)
+            new_filepath = os.path.join(directory, entry.name)
             try:
                 os.rename(old_filepath, new_filepath)
-                print(f"Restored: {entry.name} --> {new_filename}")
+                print(f"Restored: {entry.name}")
             except Exception as e:
                 print(f"Error restoring {entry.name}: {str(e)}")
 
-def bulk_rename(directory, prefix, extension_filter=None, preview=False, interactive=False, backup=False):
+def _file_key(stat):
+    """Build the backup cache key of a file from its inode, size and mtime."""
+    return f"{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def _hash_file(path):
+    """Return the BLAKE2b content hash of a file."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(COPY_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _object_path(backup_store, content_hash):
+    """Return the path of a content-addressed object in the backup store."""
+    return os.path.join(backup_store, "objects", content_hash[:2], content_hash)
+
+def _write_json_atomic(path, data):
+    """Write JSON to a temporary file and move it into place."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+def _load_backup_cache(backup_store):
+    """Load the persisted (inode, size, mtime) --> hash cache of a backup store."""
+    try:
+        with open(os.path.join(backup_store, BACKUP_CACHE_NAME)) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _hash_directory(directory, cache, workers=BACKUP_WORKERS):
+    """
+    Hash the files of a directory, reusing cached hashes for files whose key did not change.
+
+    Returns:
+        Tuple[Dict[str, Tuple[str, int]], Dict[str, str], int]: Name --> (hash, size), the cache entries of the
+            current files and the number of files that had to be hashed.
+    """
+    files = {}
+    new_cache = {}
+    to_hash = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and not _is_engine_file(entry.name):
+            stat = entry.stat()
+            key = _file_key(stat)
+            content_hash = cache.get(key)
+            if content_hash is None:
+                to_hash.append((entry.name, entry.path, key, stat.st_size))
+            else:
+                files[entry.name] = (content_hash, stat.st_size)
+                new_cache[key] = content_hash
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        hashes = executor.map(_hash_file, [path for _, path, _, _ in to_hash])
+        for (name, _, key, size), content_hash in zip(to_hash, hashes):
+            files[name] = (content_hash, size)
+            new_cache[key] = content_hash
+
+    return files, new_cache, len(to_hash)
+
+def _store_object(source_path, backup_store, content_hash, size, same_filesystem):
+    """Copy a file into the object store unless its content is already there. Returns the bytes copied."""
+    object_path = _object_path(backup_store, content_hash)
+    if os.path.exists(object_path):
+        return 0
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    temp_path = f"{object_path}.tmp"
+    copy_file(source_path, temp_path, size, same_filesystem)
+    os.replace(temp_path, object_path)
+    return size
+
+def incremental_backup(directory, backup_store, workers=BACKUP_WORKERS):
+    """
+    Take an incremental, content-addressed snapshot of the files in a directory.
+
+    Only files whose (inode, size, mtime) changed since the last snapshot are hashed, and only content
+    that is not already in the store is copied.
+
+    Args:
+        directory (str): Source directory to backup files from.
+        backup_store (str): Directory holding the objects, hash cache and snapshots.
+        workers (int, optional): Number of hashing and copy threads. Defaults to BACKUP_WORKERS.
+
+    Returns:
+        str: Path of the snapshot manifest.
+    """
+    os.makedirs(os.path.join(backup_store, "snapshots"), exist_ok=True)
+    same_filesystem = _same_filesystem(directory, backup_store)
+
+    files, cache, hashed_count = _hash_directory(directory, _load_backup_cache(backup_store), workers)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {}
+        for name, (content_hash, size) in files.items():
+            if content_hash not in futures:
+                futures[content_hash] = executor.submit(_store_object, os.path.join(directory, name),
+                                                        backup_store, content_hash, size, same_filesystem)
+        copied_bytes = sum(future.result() for future in futures.values())
+        stored_count = sum(1 for future in futures.values() if future.result())
+
+    timestamp_ns = time.time_ns()
+    snapshot_name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(timestamp_ns // 10**9))}-{timestamp_ns % 10**9:09d}.json"
+    snapshot_path = os.path.join(backup_store, "snapshots", snapshot_name)
+    _write_json_atomic(snapshot_path, {"directory": os.path.abspath(directory),
+                                       "files": {name: content_hash for name, (content_hash, _) in files.items()}})
+    _write_json_atomic(os.path.join(backup_store, BACKUP_CACHE_NAME), cache)
+
+    print(f"Snapshot of {len(files)} files: {hashed_count} hashed, {stored_count} new objects ({copied_bytes} bytes copied).")
+    return snapshot_path
+
+def list_snapshots(backup_store):
+    """
+    List the snapshot manifests of a backup store, oldest first.
+
+    Args:
+        backup_store (str): Directory holding the snapshots.
+
+    Returns:
+        List[str]: Paths of the snapshot manifests.
+    """
+    snapshot_directory = os.path.join(backup_store, "snapshots")
+    if not os.path.isdir(snapshot_directory):
+        return []
+    return sorted(os.path.join(snapshot_directory, name) for name in os.listdir(snapshot_directory) if name.endswith(".json"))
+
+def restore_snapshot(directory, backup_store, snapshot=None, prune=False):
+    """
+    Restore the files of a directory to the state recorded in a snapshot.
+
+    With prune enabled, files that are not in the snapshot but whose content is in the store are removed,
+    and a renamed file is moved back to its snapshot name instead of being copied from the store.
+
+    Args:
+        directory (str): Target directory to restore files to.
+        backup_store (str): Directory holding the objects, hash cache and snapshots.
+        snapshot (str, optional): Snapshot manifest to restore. Defaults to the latest snapshot.
+        prune (bool, optional): If True, remove or reuse backed-up files that are not in the snapshot. Defaults to False.
+
+    Returns:
+        None
+    """
+    if snapshot is None:
+        snapshots = list_snapshots(backup_store)
+        if not snapshots:
+            print(f"Error: No snapshots found in '{backup_store}'.")
+            return
+        snapshot = snapshots[-1]
+
+    with open(snapshot) as file:
+        wanted = json.load(file)["files"]
+
+    current, _, _ = _hash_directory(directory, _load_backup_cache(backup_store))
+    same_filesystem = _same_filesystem(directory, backup_store)
+
+    # Files that only exist under a new name can be moved back instead of copied
+    spare = {}
+    if prune:
+        for name, (content_hash, _) in current.items():
+            if name not in wanted and os.path.exists(_object_path(backup_store, content_hash)):
+                spare.setdefault(content_hash, []).append(name)
+
+    restored_count = 0
+    for name, content_hash in wanted.items():
+        if name in current and current[name][0] == content_hash:
+            continue
+        target_path = os.path.join(directory, name)
+        try:
+            if spare.get(content_hash):
+                os.replace(os.path.join(directory, spare[content_hash].pop()), target_path)
+            else:
+                object_path = _object_path(backup_store, content_hash)
+                temp_path = f"{target_path}{TEMP_SUFFIX}"
+                copy_file(object_path, temp_path, os.path.getsize(object_path), same_filesystem)
+                os.replace(temp_path, target_path)
+            restored_count += 1
+        except Exception as e:
+            print(f"Error restoring {name}: {str(e)}")
+
+    removed_count = 0
+    for names in spare.values():
+        for name in names:
+            os.remove(os.path.join(directory, name))
+            removed_count += 1
+
+    print(f"Restored {restored_count} files from {os.path.basename(snapshot)}, removed {removed_count}.")
+
+def scan_directory(directory, recursive=False, directory_mtimes=None):
+    """
+    Stream the files of a directory in a single scandir pass.
+
+    Args:
+        directory (str): Directory to scan.
+        recursive (bool, optional): If True, descend into subdirectories. Defaults to False.
+        directory_mtimes (dict, optional): If given, filled with the mtime of every scanned directory. Defaults to None.
+
+    Yields:
+        Tuple[str, int, float]: Path relative to the directory, size in bytes and modification time of each file.
+    """
+    pending = [""]
+    while pending:
+        relative_directory = pending.pop()
+        current_directory = os.path.join(directory, relative_directory)
+        if directory_mtimes is not None:
+            directory_mtimes[current_directory] = os.stat(current_directory).st_mtime_ns
+        with os.scandir(current_directory) as entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_directory, entry.name)
+                if entry.is_file():
+                    stat = entry.stat()
+                    yield relative_path, stat.st_size, stat.st_mtime
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    pending.append(relative_path)
+
+class DirectoryIndex:
+    """
+    Cached index of the files in a directory, built in a single scandir pass.
+
+    Sizes, modification times and extension ids are kept in compact arrays so size filters, sorted
+    listings, counts and extension filters run as in-memory queries. The index is invalidated when
+    the mtime of any scanned directory changes.
+    """
+
+    def __init__(self, directory, recursive=False):
+        self.directory = directory
+        self.recursive = recursive
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the index from disk."""
+        self.names = []
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        self.extension_ids = array("I")
+        self.extensions = []
+        self.directory_mtimes = {}
+        extension_lookup = {}
+
+        for name, size, mtime in scan_directory(self.directory, self.recursive, self.directory_mtimes):
+            extension = os.path.splitext(name)[1].lower()
+            extension_id = extension_lookup.get(extension)
+            if extension_id is None:
+                extension_id = extension_lookup[extension] = len(self.extensions)
+                self.extensions.append(extension)
+            self.names.append(name)
+            self.sizes.append(size)
+            self.mtimes.append(mtime)
+            self.extension_ids.append(extension_id)
+
+    def is_stale(self):
+        """Check whether any scanned directory has changed since the index was built."""
+        try:
+            return any(os.stat(path).st_mtime_ns != mtime for path, mtime in self.directory_mtimes.items())
+        except FileNotFoundError:
+            return True
+
+    def count(self):
+        """Return the number of indexed files."""
+        return len(self.names)
+
+    def sorted_names(self):
+        """Return the indexed file names in sorted order."""
+        return sorted(self.names)
+
+    def filter_by_size(self, size_limit):
+        """Return (name, size) pairs for files no larger than size_limit bytes."""
+        return [(name, size) for name, size in zip(self.names, self.sizes) if size <= size_limit]
+
+    def names_with_extension(self, extension=None):
+        """Return the names of files with the given extension, or all names if extension is None."""
+        if not extension:
+            return list(self.names)
+        extension = extension.lower()
+        if extension not in self.extensions:
+            return []
+        extension_id = self.extensions.index(extension)
+        return [name for name, name_extension in zip(self.names, self.extension_ids) if name_extension == extension_id]
+
+_directory_indexes = {}
+
+def get_directory_index(directory, recursive=False):
+    """
+    Return a cached DirectoryIndex for the directory, rebuilding it if the directory has changed.
+
+    Args:
+        directory (str): Directory to index.
+        recursive (bool, optional): If True, index subdirectories as well. Defaults to False.
+
+    Returns:
+        DirectoryIndex: Up-to-date index of the directory.
+    """
+    key = (os.path.abspath(directory), recursive)
+    index = _directory_indexes.get(key)
+    if index is None:
+        index = _directory_indexes[key] = DirectoryIndex(directory, recursive)
+    elif index.is_stale():
+        index.refresh()
+    return index
+
+def _is_engine_file(name):
+    """Check whether a filename belongs to the rename engine's own bookkeeping."""
+    return (name in (JOURNAL_NAME, WATCH_STATE_NAME) or name.endswith(TEMP_SUFFIX)
+            or name.endswith(DISPLACED_SUFFIX) or name.endswith(f"{WATCH_STATE_NAME}.tmp"))
+
+def plan_renames(directory, prefix, extension_filter=None):
+    """
+    Build the full old --> new filename mapping without renaming anything.
+
+    Args:
+        directory (str): Directory where the files to be renamed are located.
+        prefix (str): Prefix to be added to the new filenames.
+        extension_filter (str, optional): Filter for specific file extensions. Defaults to None.
+
+    Returns:
+        Tuple[List[Tuple[str, str]], Set[str]]: Planned (old name, new name) pairs and the names of all files in the directory.
+    """
+    index = get_directory_index(directory)
+    candidates = sorted(name for name in index.names_with_extension(extension_filter) if not _is_engine_file(name))
+
+    renames = []
+    for counter, name in enumerate(candidates, start=1):
+        new_filename = f"{prefix}_{counter:03}{os.path.splitext(name)[1]}"
+        if new_filename != name:
+            renames.append((name, new_filename))
+
+    return renames, set(index.names)
+
+def find_conflicts(renames, existing_names):
+    """
+    Find conflicts and rename chains in a rename plan using set lookups only.
+
+    Args:
+        renames (List[Tuple[str, str]]): Planned (old name, new name) pairs.
+        existing_names (Set[str]): Names of all files currently in the directory.
+
+    Returns:
+        Tuple[List[str], Set[str]]: New names already taken by files that are not being renamed, and the old names
+            whose target is the source of another rename (chains and cycles).
+    """
+    sources = {old_name for old_name, _ in renames}
+    conflicts = [new_name for _, new_name in renames if new_name in existing_names and new_name not in sources]
+    chained = {old_name for old_name, new_name in renames if new_name in sources}
+    return conflicts, chained
+
+def _build_steps(renames, conflicts):
+    """
+    Turn a rename plan into an ordered list of (source, target) filesystem renames.
+
+    Conflicting files are moved aside first. Renames that land on another rename's source go through a
+    temporary name so that chains such as a --> b, b --> c and cycles such as a --> b, b --> a are safe.
+    """
+    _, chained = find_conflicts(renames, set())
+    steps = [(new_name, f".{new_name}{DISPLACED_SUFFIX}") for new_name in conflicts]
+    steps += [(old_name, f".{old_name}{TEMP_SUFFIX}") for old_name, _ in renames if old_name in chained]
+    steps += [(old_name, new_name) for old_name, new_name in renames if old_name not in chained]
+    steps += [(f".{old_name}{TEMP_SUFFIX}", new_name) for old_name, new_name in renames if old_name in chained]
+    return steps
+
+def _write_journal_record(journal, record):
+    """Append a single record to the journal and fsync it, so it is on disk before the rename it describes."""
+    journal.write(json.dumps(record) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+
+def _read_journal(directory):
+    """
+    Read the rename journal of a directory.
+
+    Returns:
+        Tuple[List[Tuple[str, str]], int, bool]: The planned steps, the number of steps that were started
+            and whether the run was committed. Returns None if there is no journal.
+    """
+    journal_path = os.path.join(directory, JOURNAL_NAME)
+    if not os.path.exists(journal_path):
+        return None
+
+    steps = []
+    started = 0
+    committed = False
+    with open(journal_path) as journal:
+        for line in journal:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # a torn final line from a crash
+            if "plan" in record:
+                steps = _build_steps([tuple(pair) for pair in record["plan"]["renames"]], record["plan"]["conflicts"])
+            elif "step" in record:
+                started = record["step"] + 1
+            elif "commit" in record:
+                committed = True
+    return steps, started, committed
+
+def _completed_steps(directory, steps, started):
+    """
+    Count the journaled steps that were applied.
+
+    Every started step ran except possibly the last one, whose record is written just before
+    its rename; it ran if its source is gone, since each step's source exists until it is renamed.
+    """
+    if started and os.path.lexists(os.path.join(directory, steps[started - 1][0])):
+        return started - 1
+    return started
+
+def _run_steps(directory, steps, journal, first_step=0):
+    """Perform rename steps in order, journaling each one before it is applied."""
+    for index in range(first_step, len(steps)):
+        source, target = steps[index]
+        _write_journal_record(journal, {"step": index})
+        os.rename(os.path.join(directory, source), os.path.join(directory, target))
+
+def apply_renames(directory, renames, conflicts, keep_journal=False):
+    """
+    Apply a rename plan in one pass, recording every step in an append-only journal.
+
+    Args:
+        directory (str): Directory where the files to be renamed are located.
+        renames (List[Tuple[str, str]]): Planned (old name, new name) pairs.
+        conflicts (List[str]): New names occupied by files that should be replaced.
+        keep_journal (bool, optional): If True, keep the journal so the renames can be rolled back later. Defaults to False.
+
+    Returns:
+        None
+    """
+    steps = _build_steps(renames, conflicts)
+    with open(os.path.join(directory, JOURNAL_NAME), "a") as journal:
+        _write_journal_record(journal, {"plan": {"renames": renames, "conflicts": conflicts}})
+        _run_steps(directory, steps, journal)
+        _write_journal_record(journal, {"commit": True})
+
+    if not keep_journal:
+        _remove_journal(directory, steps)
+
+def resume_renames(directory):
+    """
+    Finish an interrupted bulk rename using its journal.
+
+    Args:
+        directory (str): Directory containing the journal.
+
+    Returns:
+        None
+    """
+    journal_state = _read_journal(directory)
+    if journal_state is None:
+        print("No interrupted rename to resume.")
+        return
+
+    steps, started, committed = journal_state
+    if committed:
+        # Kept on purpose for rollback_renames
+        print("The last rename finished; nothing to resume. Use rollback_renames to undo it or discard_journal to keep it.")
+        return
+
+    done = _completed_steps(directory, steps, started)
+    with open(os.path.join(directory, JOURNAL_NAME), "a") as journal:
+        _run_steps(directory, steps, journal, first_step=done)
+        _write_journal_record(journal, {"commit": True})
+    _remove_journal(directory, steps)
+    print(f"Resumed: {len(steps) - done} rename steps completed.")
+
+def rollback_renames(directory):
+    """
+    Undo a bulk rename, interrupted or committed, using its journal.
+
+    Args:
+        directory (str): Directory containing the journal.
+
+    Returns:
+        None
+    """
+    journal_state = _read_journal(directory)
+    if journal_state is None:
+        print("No rename journal found to roll back.")
+        return
+
+    steps, started, _ = journal_state
+    done = _completed_steps(directory, steps, started)
+    for source, target in reversed(steps[:done]):
+        os.rename(os.path.join(directory, target), os.path.join(directory, source))
+    os.remove(os.path.join(directory, JOURNAL_NAME))
+    print(f"Rolled back: {done} rename steps undone.")
+
+def discard_journal(directory):
+    """
+    Remove the rename journal and any files that were replaced by the renames.
+
+    Args:
+        directory (str): Directory containing the journal.
+
+    Returns:
+        None
+    """
+    journal_state = _read_journal(directory)
+    if journal_state is not None:
+        _remove_journal(directory, journal_state[0])
+
+def _remove_journal(directory, steps):
+    """Remove the journal and the displaced files its steps name, without listing the directory."""
+    for _, target in steps:
+        if target.endswith(DISPLACED_SUFFIX):
+            try:
+                os.remove(os.path.join(directory, target))
+            except FileNotFoundError:
+                pass  # never displaced, as the run stopped before that step
+    os.remove(os.path.join(directory, JOURNAL_NAME))
+
+def bulk_rename(directory, prefix, extension_filter=None, preview=False, interactive=False, backup=False, backup_store=None):
     """
     Bulk rename files in the specified directory.
 
+    The full rename plan is built first and then applied through a crash-safe journal. If a previous run
+    was interrupted, use resume_renames or rollback_renames before renaming again.
+
     Args:
         directory (str): Directory where the files to be renamed are located.
         prefix (str): Prefix to be added to the new filenames.
         extension_filter (str, optional): Filter for specific file extensions. Defaults to None.
         preview (bool, optional): If True, preview the renaming without actually renaming the files. Defaults to False.
         interactive (bool, optional): If True, prompt for user confirmation in case of conflicts. Defaults to False.
-        backup (bool, optional): If True, create a backup of the original files. Defaults to False.
+        backup (bool, optional): If True, keep the rename journal so the original filenames can be restored. Defaults to False.
+        backup_store (str, optional): If set, take an incremental snapshot into this directory before renaming. Defaults to None.
 
     Returns:
         None
     """
-    directory_path = Path(directory)
-    backup_directory = directory_path / "backup"
+    if os.path.exists(os.path.join(directory, JOURNAL_NAME)):
+        print(f"Error: An unfinished rename journal exists in '{directory}'. Run resume_renames or rollback_renames first.")
+        return
 
-    if backup:
-        os.makedirs(backup_directory, exist_ok=True)
-        backup_files(directory, backup_directory)
+    renames, existing_names = plan_renames(directory, prefix, extension_filter)
+    conflicts, _ = find_conflicts(renames, existing_names)
 
-    renamed_files = []
-    counter = 1
+    if preview:
+        conflict_names = set(conflicts)
+        for old_name, new_name in renames:
+            note = " (replaces existing file)" if new_name in conflict_names else ""
+            print(f"Preview - Renaming: {old_name} --> {new_name}{note}")
+        return
 
-    for entry in os.scandir(directory_path):
-        if entry.is_file():
-            file_extension = entry.suffix
-            if not extension_filter or file_extension.lower() == extension_filter.lower():
-                new_filename = f"{prefix}_{counter:03}{file_extension}"
-                new_filepath = directory_path / new_filename
-                if preview:
-                    print(f"Preview - Renaming: {entry.name} --> {new_filename}")
-                else:
-                    if interactive and new_filepath.exists():
-                        choice = input(f"Conflict: {new_filename} already exists. Replace it? (y/n): ")
-                        if choice.lower() != 'y':
-                            print(f"Skipped: {entry.name}")
-                            continue
-                    try:
-                        os.rename(entry.path, new_filepath)
-                        renamed_files.append((entry.name, new_filename))
-                        print(f"Renamed: {entry.name} --> {new_filename}")
-                    except Exception as e:
-                        print(f"Error renaming {entry.name}: {str(e)}")
-                counter += 1
-
-    if not preview and len(renamed_files) > 0:
+    if backup_store:
+        incremental_backup(directory, backup_store)
+
+    if interactive and conflicts:
+        skipped = set()
+        for new_name in conflicts:
+            choice = input(f"Conflict: {new_name} already exists. Replace it? (y/n): ")
+            if choice.lower() != 'y':
+                skipped.add(new_name)
+        for old_name, new_name in renames:
+            if new_name in skipped:
+                print(f"Skipped: {old_name}")
+        renames = [(old_name, new_name) for old_name, new_name in renames if new_name not in skipped]
+        conflicts = [new_name for new_name in conflicts if new_name not in skipped]
+
+    try:
+        apply_renames(directory, renames, conflicts, keep_journal=backup)
+    except Exception as e:
+        print(f"Error renaming files: {str(e)}. Run resume_renames or rollback_renames to recover.")
+        return
+
+    if len(renames) > 0:
         print("\nSummary:")
-        for old_name, new_name in renamed_files:
+        for old_name, new_name in renames:
             print(f"{old_name} --> {new_name}")
 
     if backup:
         restore_option = input("Do you want to restore the original filenames? (y/n): ")
         if restore_option.lower() == "y":
-            restore_files(directory, backup_directory)
-        shutil.rmtree(backup_directory)
+            rollback_renames(directory)
+        else:
+            discard_journal(directory)
+
+class _InotifyWatcher:
+    """Report files that finished being written to, or were moved into, a directory using Linux inotify."""
+
+    def __init__(self, directory):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify is not available on this platform")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"Unable to watch '{directory}'")
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds and return the names of the files that arrived."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        names = []
+        offset = 0
+        while offset + INOTIFY_EVENT_SIZE <= len(data):
+            _, _, _, name_length = struct.unpack_from("iIII", data, offset)
+            offset += INOTIFY_EVENT_SIZE
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class _PollingWatcher:
+    """Report files that appeared in a directory by comparing periodic scans."""
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self.known_names = self._scan()
+
+    def _scan(self):
+        return {entry.name for entry in os.scandir(self.directory) if entry.is_file()}
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds and return the names of the files that appeared."""
+        time.sleep(min(timeout, self.interval))
+        current_names = self._scan()
+        new_names = current_names - self.known_names
+        self.known_names = current_names
+        return sorted(new_names)
+
+    def close(self):
+        pass
+
+def _load_watch_counter(directory, prefix):
+    """
+    Return the next free counter for a prefix, from the watch state file or a single directory scan.
+    """
+    try:
+        with open(os.path.join(directory, WATCH_STATE_NAME)) as file:
+            state = json.load(file)
+        if state.get("prefix") == prefix:
+            return state["counter"]
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    pattern = re.compile(rf"^{re.escape(prefix)}_(\d+)")
+    numbers = [int(match.group(1)) for match in map(pattern.match, get_directory_index(directory).names) if match]
+    return max(numbers, default=0) + 1
+
+def _number_batch(directory, prefix, names, counter):
+    """Pair the files that still exist with consecutive free names. Returns the renames and the next counter."""
+    renames = []
+    for name in names:
+        if not os.path.exists(os.path.join(directory, name)):
+            continue
+        new_filename = f"{prefix}_{counter:03}{os.path.splitext(name)[1]}"
+        while os.path.lexists(os.path.join(directory, new_filename)):
+            counter += 1
+            new_filename = f"{prefix}_{counter:03}{os.path.splitext(name)[1]}"
+        renames.append((name, new_filename))
+        counter += 1
+    return renames, counter
+
+def _rename_batch(directory, prefix, names, counter):
+    """
+    Rename a batch of new files with consecutive numbers. Returns the next free counter.
+
+    A file that disappears or is locked before it is renamed makes the batch roll back; the batch is
+    then retried without that file.
+    """
+    names = list(names)
+    while True:
+        renames, next_counter = _number_batch(directory, prefix, names, counter)
+        if not renames:
+            return counter
+        try:
+            apply_renames(directory, renames, [])
+        except OSError as e:
+            try:
+                rollback_renames(directory)
+            except OSError as rollback_error:
+                # Keep whatever was renamed; a leftover journal would block the next batch
+                print(f"Error: Could not roll back the batch: {str(rollback_error)}")
+                discard_journal(directory)
+            failed = os.path.basename(e.filename or "")
+            if failed not in names:
+                print(f"Error: Could not rename batch: {str(e)}")
+                return counter
+            print(f"Error: Could not rename '{failed}' ({e.strerror}), skipping it.")
+            names.remove(failed)
+            continue
+
+        _write_json_atomic(os.path.join(directory, WATCH_STATE_NAME), {"prefix": prefix, "counter": next_counter})
+        print(f"Renamed batch of {len(renames)} files ({renames[0][1]} - {renames[-1][1]})")
+        return next_counter
+
+def watch_and_rename(directory, prefix, extension_filter=None, debounce=1.0, batch_size=1000,
+                     poll_interval=2.0, use_inotify=True, stop_event=None):
+    """
+    Continuously rename files as they arrive in a directory, using bulk_rename's naming rules.
+
+    New files are picked up with inotify where available and by polling otherwise. Bursts are debounced
+    and renamed in batches, and the numbering counter is kept in a state file so the directory is never
+    rescanned to find the next free number.
+
+    Args:
+        directory (str): Directory to watch.
+        prefix (str): Prefix to be added to the new filenames.
+        extension_filter (str, optional): Filter for specific file extensions. Defaults to None.
+        debounce (float, optional): Seconds without new files before a batch is renamed. Defaults to 1.0.
+        batch_size (int, optional): Rename immediately once this many files are pending. Defaults to 1000.
+        poll_interval (float, optional): Seconds between scans when polling. Defaults to 2.0.
+        use_inotify (bool, optional): If False, always poll. Defaults to True.
+        stop_event (threading.Event, optional): Stop watching once this event is set. Defaults to None.
+
+    Returns:
+        None
+    """
+    if os.path.exists(os.path.join(directory, JOURNAL_NAME)):
+        print(f"Error: An unfinished rename journal exists in '{directory}'. Run resume_renames or rollback_renames first.")
+        return
+
+    output_pattern = re.compile(rf"^{re.escape(prefix)}_\d+")
+
+    def is_candidate(name):
+        if _is_engine_file(name) or output_pattern.match(name):
+            return False
+        return not extension_filter or os.path.splitext(name)[1].lower() == extension_filter.lower()
+
+    watcher = None
+    if use_inotify:
+        try:
+            watcher = _InotifyWatcher(directory)
+        except OSError as e:
+            print(f"inotify unavailable ({str(e)}), falling back to polling.")
+    if watcher is None:
+        watcher = _PollingWatcher(directory, poll_interval)
+
+    counter = _load_watch_counter(directory, prefix)
+    existing = sorted(name for name in get_directory_index(directory).names if is_candidate(name))
+    counter = _rename_batch(directory, prefix, existing, counter)
+    print(f"Watching '{directory}' for new files...")
+
+    pending = {}
+    last_arrival = 0.0
+    try:
+        while stop_event is None or not stop_event.is_set():
+            for name in watcher.wait(debounce if pending else poll_interval):
+                if is_candidate(name):
+                    pending[name] = None
+                    last_arrival = time.monotonic()
+            if pending and (time.monotonic() - last_arrival >= debounce or len(pending) >= batch_size):
+                # Cleared first, so an interrupted batch is not renamed a second time by the final flush
+                batch = list(pending)
+                pending.clear()
+                counter = _rename_batch(directory, prefix, batch, counter)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        if pending:
+            _rename_batch(directory, prefix, list(pending), counter)
+        watcher.close()
 
 def filter_files_by_size(directory, size_limit):
     """
@@ -114,10 +984,9 @@ def filter_files_by_size(directory, size_limit):
     """
     filtered_files = []
 
-    for entry in os.scandir(directory):
-        if entry.is_file() and entry.stat().st_size <= size_limit:
-            filtered_files.append(entry.path)
-            print(f"Filtered: {entry.name} (Size: {entry.stat().st_size} bytes)")
+    for name, size in get_directory_index(directory).filter_by_size(size_limit):
+        filtered_files.append(os.path.join(directory, name))
+        print(f"Filtered: {name} (Size: {size} bytes)")
 
     return filtered_files
 
@@ -131,10 +1000,8 @@ def sort_files(directory):
     Returns:
         None
     """
-    file_list = sorted(Path(directory).iterdir())
-    for entry in file_list:
-        if entry.is_file():
-            print(entry.name)
+    for name in get_directory_index(directory).sorted_names():
+        print(name)
 
 def count_files(directory):
     """
@@ -146,7 +1013,7 @@ def count_files(directory):
     Returns:
         None
     """
-    file_count = sum(1 for entry in os.scandir(directory) if entry.is_file())
+    file_count = get_directory_index(directory).count()
     print(f"Total files: {file_count}")
 
 # Example usage
@@ -155,11 +1022,13 @@ new_prefix = "new_prefix"  # Replace with the desired prefix
 file_extension_filter = ".txt"  # Replace with the desired file extension filter (e.g., ".txt", ".jpg"). Set to None to disable filtering.
 preview_mode = True  # Set to True to preview the renaming without actually performing it, or False to perform the renaming.
 interactive_mode = True  # Set to True to prompt for user confirmation in case of conflicts, or False to automatically replace conflicting files.
-backup_mode = True  # Set to True to create a backup of the original files, or False to skip the backup.
+backup_mode = True  # Set to True to keep an undo journal of the original filenames, or False to skip it.
+backup_store_path = None  # Set to a directory to keep incremental content-addressed snapshots, or None to skip them.
 
-bulk_rename(directory_path, new_prefix, file_extension_filter, preview_mode, interactive_mode, backup_mode)
+bulk_rename(directory_path, new_prefix, file_extension_filter, preview_mode, interactive_mode, backup_mode, backup_store_path)
 
 # Additional function usage
 filtered_files = filter_files_by_size(directory_path, 1024)  # Filter files smaller than or equal to 1KB
 sort_files(directory_path)  # Sort files in the directory
-count_files(directory_path)  # Count the total number of files in the directory
\ No newline at end of file
+count_files(directory_path)  # Count the total number of files in the directory
+# watch_and_rename(directory_path, new_prefix, file_extension_filter)  # Keep renaming new files as they arrive (Ctrl+C to stop)
\ No newline at end of file
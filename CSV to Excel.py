@@ -1,5 +1,21 @@
+import csv
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow  # noqa: F401  (only needed for Arrow-backed strings in compact mode)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from csv_cache import ColumnCache
+
 # Constants
 CSV_FILE_PATH = "path/to/input.csv"
 EXCEL_FILE_PATH = "path/to/output.xlsx"
@@ -16,10 +32,38 @@ COLUMN_NAMES_TO_RENAME = {
 }
 COLUMNS_TO_APPLY_FUNCTION = ["column1", "column2"]
 
+EXPLAIN_PLAN = False  # Set to True to print the optimized query plan before processing
+
+# Streaming configuration
+STREAMING_MODE = False  # Set to True to process the CSV in chunks and write the workbook in constant memory
+CHUNK_SIZE = 100_000
+EXCEL_MAX_ROWS = 1_048_576
+
+# Split output configuration
+SPLIT_COLUMNS = None  # e.g. ["region"] to write one sheet or workbook per region
+SPLIT_MODE = "sheets"  # "sheets" for one sheet per key, "files" for one workbook per key
+
+# Compact mode configuration
+COMPACT_MODE = False  # Set to True to downcast numbers and store repeated strings as categoricals
+STEP_REPORT = False  # Set to True to print the time and memory of every pipeline step
+CATEGORY_MAX_RATIO = 0.5  # String columns with fewer unique values than this share of rows become categoricals
+
+# Cache configuration
+USE_CSV_CACHE = False  # Set to True to keep parsed columns under csv_cache.directory (up to CACHE_MAX_BYTES) for faster re-reads
+csv_cache = ColumnCache()
+
+# Merge configuration
+MERGE_WORKERS = os.cpu_count() or 1
+SCHEMA_SAMPLE_ROWS = 10_000
+CATEGORY_MAX_UNIQUE = 1_000
+
 # Utility functions
-def read_csv(csv_file):
+def read_csv(csv_file, **read_options):
     try:
-        data_frame = pd.read_csv(csv_file, skip_blank_lines=True)
+        if USE_CSV_CACHE:
+            data_frame = csv_cache.read_csv(csv_file, skip_blank_lines=True, **read_options)
+        else:
+            data_frame = pd.read_csv(csv_file, skip_blank_lines=True, **read_options)
         return data_frame
     except FileNotFoundError:
         print(f"Error: File '{csv_file}' not found.")
@@ -28,6 +72,30 @@ def read_csv(csv_file):
         print(f"Error: Unable to read '{csv_file}': {e}")
         return None
 
+def read_csv_chunks(csv_file, chunk_size=CHUNK_SIZE, **read_options):
+    try:
+        if USE_CSV_CACHE:
+            return csv_cache.iter_csv_chunks(csv_file, chunk_size, skip_blank_lines=True, **read_options)
+        return pd.read_csv(csv_file, skip_blank_lines=True, chunksize=chunk_size, **read_options)
+    except FileNotFoundError:
+        print(f"Error: File '{csv_file}' not found.")
+        return None
+    except Exception as e:
+        print(f"Error: Unable to read '{csv_file}': {e}")
+        return None
+
+def read_csv_header(csv_file):
+    """Returns the column names of a CSV file, or the union of them for a list of files."""
+    csv_files = [csv_file] if isinstance(csv_file, str) else csv_file
+    header = []
+    for path in csv_files:
+        try:
+            columns = pd.read_csv(path, nrows=0).columns
+        except Exception:
+            continue
+        header += [column for column in columns if column not in header]
+    return header or None
+
 def save_to_excel(data_frame, excel_file):
     try:
         data_frame.to_excel(excel_file, index=False)
@@ -35,54 +103,1080 @@ def save_to_excel(data_frame, excel_file):
     except Exception as e:
         print(f"Error: Unable to save data to '{excel_file}': {e}")
 
-# Data processing functions
-def process_and_save_csv(csv_file, excel_file, functions):
-    data_frame = read_csv(csv_file)
-    if data_frame is not None:
-        for function in functions:
-            data_frame = function(data_frame)
-        save_to_excel(data_frame, excel_file)
+class StreamingExcelWriter:
+    """Writes DataFrame chunks to an XLSX file in constant memory.
 
-def remove_duplicates(data_frame):
-    data_frame.drop_duplicates(inplace=True)
-    return data_frame
+    Rows are flushed to disk as they are written, and a new sheet is started
+    (with the header repeated) whenever Excel's row limit is reached. Chunks can
+    be routed to several named sheets, each with its own rollover. Given the
+    PartitionNamer of those sheet names, rollover names are reserved through it
+    so they never clash with another partition's sheet.
+    """
 
-def sort_data(data_frame):
-    if SORT_COLUMN_NAME in data_frame.columns:
-        return data_frame.sort_values(by=SORT_COLUMN_NAME)
-    else:
-        print(f"Error: Column '{SORT_COLUMN_NAME}' does not exist in the CSV file.")
+    def __init__(self, excel_file, sheet_name="Sheet", max_rows=EXCEL_MAX_ROWS, namer=None):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(excel_file, {"constant_memory": True, "nan_inf_to_errors": True})
+        self.sheet_name = sheet_name
+        self.max_rows = max_rows
+        self.namer = namer
+        self.sheets = {}  # base sheet name -> [worksheet, next row, number of sheets]
+        self.columns = None
+        self.sheet_count = 0
+        self.rows_written = 0
+
+    def _add_sheet(self, base_name):
+        state = self.sheets.setdefault(base_name, [None, 0, 0])
+        state[2] += 1
+        if self.namer is not None:
+            # Every base name came from the namer, so only rollover titles still need reserving
+            title = base_name if state[2] == 1 else self.namer.rollover(base_name, state[2])
+        elif base_name == self.sheet_name:
+            title = f"{base_name}{state[2]}"
+        elif state[2] == 1:
+            title = base_name
+        else:
+            title = f"{base_name} ({state[2]})"
+        state[0] = self.workbook.add_worksheet(title)
+        state[0].write_row(0, 0, self.columns)
+        state[1] = 1
+        self.sheet_count += 1
+        return state
+
+    def write_chunk(self, data_frame, sheet_name=None):
+        base_name = sheet_name or self.sheet_name
+        if self.columns is None:
+            self.columns = [str(column) for column in data_frame.columns]
+        state = self.sheets.get(base_name) or self._add_sheet(base_name)
+        values = data_frame.astype(object).where(data_frame.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if state[1] >= self.max_rows:
+                state = self._add_sheet(base_name)
+            state[0].write_row(state[1], 0, row)
+            state[1] += 1
+        self.rows_written += len(data_frame)
+
+    def close(self):
+        if not self.sheets:
+            self.columns = self.columns or []
+            self._add_sheet(self.sheet_name)
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+# Split-by-key output
+INVALID_SHEET_CHARACTERS = str.maketrans({character: "_" for character in "[]:*?/\\"})
+INVALID_FILE_CHARACTERS = str.maketrans({character: "_" for character in '<>:"/\\|?*'})
+
+class PartitionNamer:
+    """Gives every partition key a stable, unique sheet name or file path."""
+
+    def __init__(self, excel_file, mode):
+        self.excel_file = excel_file
+        self.mode = mode
+        self.names = {}
+        self.used = set()
+
+    def __call__(self, key):
+        if key not in self.names:
+            label = "_".join("blank" if pd.isna(value) else str(value) for value in key) or "blank"
+            if self.mode == "sheets":
+                # 31 characters is Excel's limit; leave room for the " (n)" rollover suffix
+                label = label.translate(INVALID_SHEET_CHARACTERS).strip("'")[:25] or "blank"
+            else:
+                label = label.translate(INVALID_FILE_CHARACTERS)
+            name, suffix = label, 1
+            while name.lower() in self.used:
+                suffix += 1
+                name = f"{label[:22]}~{suffix}"
+            self.used.add(name.lower())
+            if self.mode == "files":
+                root, extension = os.path.splitext(self.excel_file)
+                name = f"{root}_{name}{extension or '.xlsx'}"
+            self.names[key] = name
+        return self.names[key]
+
+    def rollover(self, name, number):
+        """Reserves a unique name for the number-th sheet of a partition that overflowed Excel's row limit."""
+        title = f"{name} ({number})"
+        while title.lower() in self.used:
+            number += 1
+            title = f"{name} ({number})"
+        self.used.add(title.lower())
+        return title
+
+def partition_frame(data_frame, columns):
+    """Splits a frame by the values of columns in one hash-partitioning pass.
+
+    Returns (key tuple, frame) pairs in order of first appearance.
+    """
+    codes, keys = pd.MultiIndex.from_frame(data_frame[columns]).factorize(use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+    return [(tuple(keys[codes[rows[0]]]), data_frame.iloc[rows])
+            for rows in np.split(order, boundaries) if len(rows)]
+
+def _write_partition_file(excel_file, data_frame):
+    with StreamingExcelWriter(excel_file) as writer:
+        writer.write_chunk(data_frame)
+    return len(data_frame)
+
+def save_split_to_excel(data_frame, excel_file, split_columns, mode="sheets", workers=MERGE_WORKERS):
+    """Writes one sheet, or one workbook, per distinct value of split_columns.
+
+    Separate workbooks are serialized in parallel worker processes, since XLSX
+    writing is CPU-bound.
+    """
+    missing = [column for column in split_columns if column not in data_frame.columns]
+    if missing:
+        print(f"Error: Columns not found for splitting: {', '.join(missing)}")
+        return
+
+    namer = PartitionNamer(excel_file, mode)
+    partitions = partition_frame(data_frame, split_columns)
+    try:
+        if mode == "sheets":
+            with StreamingExcelWriter(excel_file, namer=namer) as writer:
+                for key, partition in partitions:
+                    writer.write_chunk(partition, sheet_name=namer(key))
+            print(f"Data saved to '{excel_file}' successfully ({len(partitions)} partition sheet(s)).")
+        else:
+            paths = [namer(key) for key, _ in partitions]
+            with ProcessPoolExecutor(max_workers=max(1, min(workers, len(partitions) or 1))) as executor:
+                list(executor.map(_write_partition_file, paths, [partition for _, partition in partitions]))
+            print(f"Data saved to {len(paths)} workbook(s) next to '{excel_file}' successfully.")
+    except Exception as e:
+        print(f"Error: Unable to save data to '{excel_file}': {e}")
+
+# Query operations
+def _quote(column):
+    return '"' + str(column).replace('"', '""') + '"'
+
+def _upper_value(value):
+    return value.upper() if isinstance(value, str) else value
+
+def _upper_series(series):
+    """Uppercases the strings in a column with vectorized operations; other values are left as they are."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        if pd.api.types.is_string_dtype(categories) or categories.inferred_type == "string":
+            upper = categories.str.upper()
+            if upper.is_unique:
+                return series.cat.rename_categories(upper).cat.reorder_categories(upper.sort_values())
+            return series.astype(object).str.upper().astype("category")
+        return series
+    if pd.api.types.is_string_dtype(series.dtype):
+        if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) != "string":
+            return series.map(_upper_value)
+        return series.str.upper()
+    return series
+
+class Operation:
+    """A declarative pipeline step.
+
+    Subclasses know how to run on a DataFrame, how to compile to SQL for the
+    spill-to-disk path, and which columns they read, so the planner can reorder,
+    merge and prune them.
+    """
+
+    row_local = True
+
+    def columns_used(self):
+        return set()
+
+    def output_columns(self, columns):
+        return columns
+
+    def required_columns(self, needed):
+        """Columns this step needs from its input, given the columns needed from its output (None means all)."""
+        if needed is None:
+            return None
+        return needed | self.columns_used()
+
+    def prune(self, needed):
+        """Returns this step restricted to the needed columns, or None if it can be dropped."""
+        return self
+
+    def merge(self, other):
+        """Returns a single step equivalent to this step followed by other, or None."""
+        return None
+
+    def apply(self, data_frame):
+        raise NotImplementedError
+
+    def to_sql(self, query, columns):
+        raise NotImplementedError
+
+class Rename(Operation):
+    def __init__(self, mapping):
+        self.mapping = dict(mapping)
+
+    def __repr__(self):
+        return f"Rename({self.mapping})"
+
+    def output_columns(self, columns):
+        return [self.mapping.get(column, column) for column in columns]
+
+    def original_name(self, column):
+        """Returns the input name of an output column, or None if the column is renamed away."""
+        for old, new in self.mapping.items():
+            if new == column:
+                return old
+        return None if column in self.mapping else column
+
+    def required_columns(self, needed):
+        if needed is None:
+            return None
+        return {self.original_name(column) or column for column in needed}
+
+    def merge(self, other):
+        if not isinstance(other, Rename):
+            return None
+        mapping = {old: other.mapping.get(new, new) for old, new in self.mapping.items()}
+        for old, new in other.mapping.items():
+            if old not in self.mapping.values() and old not in self.mapping:
+                mapping[old] = new
+        return Rename(mapping)
+
+    def apply(self, data_frame):
+        return data_frame.rename(columns=self.mapping)
+
+    def to_sql(self, query, columns):
+        renamed = self.output_columns(columns)
+        selection = ", ".join(f"{_quote(old)} AS {_quote(new)}" for old, new in zip(columns, renamed))
+        return f"SELECT {selection}, {SPILL_ORDER} FROM ({query})", renamed, []
+
+class Dedup(Operation):
+    row_local = False
+
+    def __repr__(self):
+        return "Dedup()"
+
+    def required_columns(self, needed):
+        return None
+
+    def merge(self, other):
+        return self if isinstance(other, Dedup) else None
+
+    def apply(self, data_frame):
+        return data_frame.drop_duplicates()
+
+    def to_sql(self, query, columns):
+        # keeps each row's first occurrence, like drop_duplicates(); GROUP BY treats NULLs as equal too
+        selection = ", ".join(_quote(column) for column in columns)
+        return f"SELECT {selection}, MIN({SPILL_ORDER}) AS {SPILL_ORDER} FROM ({query}) GROUP BY {selection}", columns, []
+
+class Uppercase(Operation):
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+    def __repr__(self):
+        return f"Uppercase({self.columns})"
+
+    def columns_used(self):
+        return set(self.columns)
+
+    def required_columns(self, needed):
+        return needed
+
+    def prune(self, needed):
+        if needed is None:
+            return self
+        columns = [column for column in self.columns if column in needed]
+        return Uppercase(columns) if columns else None
+
+    def merge(self, other):
+        if not isinstance(other, Uppercase):
+            return None
+        return Uppercase(self.columns + [column for column in other.columns if column not in self.columns])
+
+    def apply(self, data_frame):
+        data_frame = data_frame.copy(deep=False)
+        for column in self.columns:
+            data_frame[column] = _upper_series(data_frame[column])
         return data_frame
 
-def filter_data(data_frame):
-    if FILTER_COLUMN_NAME in data_frame.columns:
-        return data_frame[data_frame[FILTER_COLUMN_NAME] == FILTER_VALUE]
-    else:
-        print(f"Error: Column '{FILTER_COLUMN_NAME}' does not exist in the CSV file.")
+    def to_sql(self, query, columns):
+        missing = [column for column in self.columns if column not in columns]
+        if missing:
+            raise ValueError(f"Columns not found: {', '.join(missing)}")
+        selection = ", ".join(
+            f"py_upper({_quote(column)}) AS {_quote(column)}" if column in self.columns else _quote(column)
+            for column in columns
+        )
+        return f"SELECT {selection}, {SPILL_ORDER} FROM ({query})", columns, []
+
+class Sort(Operation):
+    row_local = False
+
+    def __init__(self, column):
+        self.column = column
+
+    def __repr__(self):
+        return f"Sort({self.column!r})"
+
+    def columns_used(self):
+        return {self.column}
+
+    def apply(self, data_frame):
+        if self.column in data_frame.columns:
+            return data_frame.sort_values(by=self.column, kind="stable")
+        print(f"Error: Column '{self.column}' does not exist in the CSV file.")
         return data_frame
 
-def aggregate_data(data_frame):
-    if all(column in data_frame.columns for column in GROUP_BY_COLUMNS + [AGGREGATION_COLUMN]):
-        return data_frame.groupby(GROUP_BY_COLUMNS)[AGGREGATION_COLUMN].agg(AGGREGATION_FUNCTION).reset_index()
-    else:
+    def to_sql(self, query, columns):
+        if self.column not in columns:
+            print(f"Error: Column '{self.column}' does not exist in the CSV file.")
+            return query, columns, []
+        # NULLs last and ties in their current order, like a stable sort_values()
+        column = _quote(self.column)
+        selection = ", ".join(_quote(name) for name in columns)
+        order = f"ROW_NUMBER() OVER (ORDER BY {column} IS NULL, {column}, {SPILL_ORDER}) AS {SPILL_ORDER}"
+        return f"SELECT {selection}, {order} FROM ({query})", columns, []
+
+class Filter(Operation):
+    """Keeps the rows where every (column, value) condition holds."""
+
+    def __init__(self, conditions):
+        self.conditions = list(conditions)
+
+    def __repr__(self):
+        return f"Filter({' AND '.join(f'{column} == {value!r}' for column, value in self.conditions)})"
+
+    def columns_used(self):
+        return {column for column, _ in self.conditions}
+
+    def merge(self, other):
+        return Filter(self.conditions + other.conditions) if isinstance(other, Filter) else None
+
+    def push_past(self, operation):
+        """Returns this filter rewritten to run before operation, or None if that would change the result."""
+        if isinstance(operation, (Dedup, Sort)):
+            return self
+        if isinstance(operation, Uppercase) and not self.columns_used() & set(operation.columns):
+            return self
+        if isinstance(operation, Rename):
+            conditions = [(operation.original_name(column), value) for column, value in self.conditions]
+            if all(column is not None for column, _ in conditions):
+                return Filter(conditions)
+        return None
+
+    def apply(self, data_frame):
+        for column, value in self.conditions:
+            if column in data_frame.columns:
+                data_frame = data_frame[data_frame[column] == value]
+            else:
+                print(f"Error: Column '{column}' does not exist in the CSV file.")
+        return data_frame
+
+    def to_sql(self, query, columns):
+        clauses, params = [], []
+        for column, value in self.conditions:
+            if column in columns:
+                clauses.append(f"{_quote(column)} = ?")
+                params.append(value)
+            else:
+                print(f"Error: Column '{column}' does not exist in the CSV file.")
+        if not clauses:
+            return query, columns, []
+        return f"SELECT * FROM ({query}) WHERE {' AND '.join(clauses)}", columns, params
+
+class Aggregate(Operation):
+    row_local = False
+
+    def __init__(self, keys, column, function):
+        self.keys = list(keys)
+        self.column = column
+        self.function = function
+
+    def __repr__(self):
+        return f"Aggregate({self.function}({self.column!r}) by {self.keys})"
+
+    def columns_used(self):
+        return set(self.keys) | {self.column}
+
+    def required_columns(self, needed):
+        return self.columns_used()
+
+    def output_columns(self, columns):
+        return self.keys + [self.column]
+
+    def apply(self, data_frame):
+        if all(column in data_frame.columns for column in self.keys + [self.column]):
+            return data_frame.groupby(self.keys, observed=True)[self.column].agg(self.function).reset_index()
         print("Error: One or more columns do not exist in the CSV file.")
         return data_frame
 
-def merge_csv_files(csv_files):
-    data_frames = [read_csv(csv_file) for csv_file in csv_files]
-    data_frames = [df for df in data_frames if df is not None]
-    if data_frames:
-        return pd.concat(data_frames)
+    def partial(self, data_frame):
+        """Computes the mergeable per-group state of one chunk (see merge_partials)."""
+        if not all(column in data_frame.columns for column in self.keys + [self.column]):
+            raise ValueError("One or more columns do not exist in the CSV file.")
+        grouped = data_frame.groupby(self.keys, observed=True)[self.column]
+        fields = PARTIAL_AGGREGATES[self.function]
+        state = {}
+        if "count" in fields:
+            state["count"] = grouped.count()
+        if "sum" in fields:
+            state["sum"] = grouped.sum()
+        if "min" in fields:
+            state["min"] = grouped.min()
+        if "max" in fields:
+            state["max"] = grouped.max()
+        if "m2" in fields:
+            state["m2"] = grouped.var(ddof=0) * state["count"]
+        return pd.DataFrame(state)
+
+    def finalize(self, state):
+        """Turns a merged partial state into the same result apply() would give."""
+        if self.function == "mean":
+            values = state["sum"] / state["count"]
+        elif self.function in ("var", "std"):
+            values = (state["m2"] / (state["count"] - 1)).where(state["count"] > 1)
+            if self.function == "std":
+                values = values ** 0.5
+        else:
+            values = state[self.function]
+        values = values.rename(self.column)
+        values.index.names = self.keys
+        return values.reset_index()
+
+    def to_sql(self, query, columns):
+        if not all(column in columns for column in self.keys + [self.column]):
+            print("Error: One or more columns do not exist in the CSV file.")
+            return query, columns, []
+        if self.function not in SQL_AGGREGATES:
+            raise ValueError(f"Aggregation '{self.function}' is not supported in streaming mode")
+        keys = ", ".join(_quote(column) for column in self.keys)
+        not_null = " AND ".join(f"{_quote(column)} IS NOT NULL" for column in self.keys)
+        aggregate = f"{SQL_AGGREGATES[self.function]}({_quote(self.column)})"
+        if self.function == "sum":
+            # pandas sums a group of only missing values to 0, SQLite to NULL
+            aggregate = f"COALESCE({aggregate}, 0)"
+        order = f"ROW_NUMBER() OVER (ORDER BY {keys}) AS {SPILL_ORDER}"
+        return (f"SELECT {keys}, {aggregate} AS {_quote(self.column)}, {order} FROM ({query}) "
+                f"WHERE {not_null} GROUP BY {keys}", self.output_columns(columns), [])
+
+class Custom(Operation):
+    """An opaque user function. The planner never moves anything past it."""
+
+    row_local = False
+
+    def __init__(self, function):
+        self.function = function
+
+    def __repr__(self):
+        return f"Custom({getattr(self.function, '__name__', repr(self.function))})"
+
+    def required_columns(self, needed):
+        return None
+
+    def apply(self, data_frame):
+        return self.function(data_frame)
+
+    def to_sql(self, query, columns):
+        raise ValueError(f"{self!r} cannot run in streaming mode")
+
+# Partial state fields each aggregation needs for out-of-core merging
+PARTIAL_AGGREGATES = {
+    "sum": ("sum",),
+    "count": ("count",),
+    "min": ("min",),
+    "max": ("max",),
+    "mean": ("count", "sum"),
+    "var": ("count", "sum", "m2"),
+    "std": ("count", "sum", "m2"),
+}
+SQL_AGGREGATES = {"sum": "SUM", "mean": "AVG", "min": "MIN", "max": "MAX", "count": "COUNT"}
+# Hidden column of the spilled rows' positions, carried through every step so the result keeps pandas' row order
+SPILL_ORDER = '"__spill_order"'
+ORDER_INSENSITIVE_AGGREGATES = {"sum", "mean", "min", "max", "count", "size", "median", "std", "var", "nunique"}
+
+# Compact mode
+def _arrow_string_dtype():
+    """Returns an Arrow-backed string dtype with NaN missing values, or None if unavailable."""
+    if not HAS_PYARROW:
+        return None
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        return pd.StringDtype("pyarrow_numpy")
+
+def compact_frame(data_frame, category_max_ratio=CATEGORY_MAX_RATIO):
+    """Shrinks a DataFrame's memory footprint without changing its values.
+
+    Integers are downcast to the smallest type that holds them, floats to
+    float32 only where that is lossless, repeated strings become categoricals and
+    the remaining strings use Arrow-backed storage when pyarrow is installed.
+    """
+    arrow_strings = _arrow_string_dtype()
+    columns = {}
+    for column in data_frame.columns:
+        series = data_frame[column]
+        dtype = series.dtype
+        if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+            pass
+        elif pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+            downcast = "unsigned" if len(series) and series.min() >= 0 else "integer"
+            series = pd.to_numeric(series, downcast=downcast)
+        elif pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype) and dtype != np.float32:
+            narrow = series.astype(np.float32)
+            if ((narrow.astype(dtype) == series) | series.isna()).all():
+                series = narrow
+        elif pd.api.types.is_string_dtype(dtype) and pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+            if series.nunique(dropna=True) <= category_max_ratio * len(series):
+                series = series.astype("category")
+            elif arrow_strings is not None and dtype != arrow_strings:
+                series = series.astype(arrow_strings)
+        columns[column] = series
+    return pd.DataFrame(columns, index=data_frame.index)
+
+def print_step_report(report):
+    """Prints the time and memory recorded for each pipeline step."""
+    print(f"{'Step':<60} {'Time (s)':>10} {'Memory (MB)':>12}")
+    for name, seconds, memory in report:
+        print(f"{name[:60]:<60} {seconds:>10.3f} {memory / (1024 * 1024):>12.2f}")
+
+# Query planner
+def push_down_filters(operations):
+    """Moves filters as early as they can go without changing the result."""
+    operations = list(operations)
+    moved = True
+    while moved:
+        moved = False
+        for i in range(1, len(operations)):
+            if isinstance(operations[i], Filter):
+                pushed = operations[i].push_past(operations[i - 1])
+                if pushed is not None:
+                    operations[i - 1], operations[i] = pushed, operations[i - 1]
+                    moved = True
+    return operations
+
+def merge_adjacent(operations):
+    """Fuses neighbouring steps of the same kind into one."""
+    merged = []
+    for operation in operations:
+        combined = merged[-1].merge(operation) if merged else None
+        if combined is not None:
+            merged[-1] = combined
+        else:
+            merged.append(operation)
+    return merged
+
+def drop_discarded_sorts(operations):
+    """Removes sorts whose order is thrown away by a later order-insensitive aggregation."""
+    kept = []
+    for i, operation in enumerate(operations):
+        if isinstance(operation, Sort):
+            for later in operations[i + 1:]:
+                if isinstance(later, Aggregate) and later.function in ORDER_INSENSITIVE_AGGREGATES:
+                    operation = None
+                    break
+                if not isinstance(later, (Filter, Uppercase, Rename, Dedup, Sort)):
+                    break
+        if operation is not None:
+            kept.append(operation)
+    return kept
+
+def prune_columns(operations):
+    """Drops dead steps and returns (operations, columns needed from the input, or None for all)."""
+    needed = None
+    kept = []
+    for operation in reversed(operations):
+        operation = operation.prune(needed)
+        if operation is None:
+            continue
+        needed = operation.required_columns(needed)
+        kept.append(operation)
+    kept.reverse()
+    return kept, needed
+
+class QueryPlan:
+    """A lazy CSV pipeline that is optimized before any data is read.
+
+    csv_file may also be a list of files, which are merged with a unified schema.
+
+    Filters are pushed ahead of dedup, sort, uppercase and rename steps, adjacent
+    steps are merged, sorts feeding an aggregation are dropped, and only the
+    columns the steps actually need are parsed.
+    """
+
+    def __init__(self, csv_file, operations, compact=False, report=False):
+        self.csv_file = csv_file
+        self.operations = list(operations)
+        self.compact = compact
+        self.report = report
+        self._optimized = None
+
+    @classmethod
+    def from_steps(cls, csv_file, functions, compact=False, report=False):
+        operations = [STEP_OPERATIONS[function]() if function in STEP_OPERATIONS else Custom(function)
+                      for function in functions]
+        return cls(csv_file, operations, compact, report)
+
+    def optimize(self):
+        if self._optimized is None:
+            operations = push_down_filters(self.operations)
+            operations = merge_adjacent(operations)
+            operations = drop_discarded_sorts(operations)
+            operations, needed = prune_columns(operations)
+            usecols = None
+            header = read_csv_header(self.csv_file) if needed is not None else None
+            if header is not None:
+                usecols = [column for column in header if column in needed] or None
+            self._optimized = (operations, usecols)
+        return self._optimized
+
+    def explain(self):
+        operations, usecols = self.optimize()
+        lines = ["Original plan:"]
+        lines += [f"  {i}. {operation!r}" for i, operation in enumerate(self.operations, start=1)]
+        lines.append("Optimized plan:")
+        scan = "Scan" if isinstance(self.csv_file, str) else "MergeScan"
+        lines.append(f"  0. {scan}({self.csv_file!r}, columns={usecols if usecols is not None else 'all'})")
+        lines += [f"  {i}. {operation!r}" for i, operation in enumerate(operations, start=1)]
+        plan = "\n".join(lines)
+        print(plan)
+        return plan
+
+    def _partial_aggregation_index(self, operations):
+        """Returns the position of an aggregation that only row-local steps precede, if it can run out of core."""
+        for i, operation in enumerate(operations):
+            if not operation.row_local:
+                if isinstance(operation, Aggregate) and operation.function in PARTIAL_AGGREGATES:
+                    return i
+                return None
+        return None
+
+    def _run_step(self, report, name, step, data_frame):
+        started = time.perf_counter()
+        data_frame = step(data_frame)
+        if self.report and data_frame is not None:
+            report.append((name, time.perf_counter() - started, data_frame.memory_usage(deep=True).sum()))
+        return data_frame
+
+    def collect(self):
+        """Runs the plan in memory. With compact enabled, the data is compacted right after reading."""
+        operations, usecols = self.optimize()
+        report = []
+        split = self._partial_aggregation_index(operations)
+        if split is not None:
+            data_frame = self._run_step(report, f"Read + chunked {operations[split]!r}", lambda _: aggregate_in_chunks(
+                self.csv_file, operations[:split], operations[split], usecols=usecols), None)
+            operations = operations[split + 1:]
+        elif isinstance(self.csv_file, str):
+            data_frame = self._run_step(report, "Read", lambda _: read_csv(self.csv_file, usecols=usecols), None)
+        else:
+            data_frame = self._run_step(report, "Merge", lambda _: merge_csv_files(self.csv_file, usecols=usecols), None)
+        if data_frame is None:
+            return None
+
+        if self.compact:
+            data_frame = self._run_step(report, "Compact", compact_frame, data_frame)
+        for operation in operations:
+            data_frame = self._run_step(report, repr(operation), operation.apply, data_frame)
+
+        if self.report:
+            print_step_report(report)
+        return data_frame
+
+    def stream(self, chunk_size=CHUNK_SIZE):
+        """Yields the result in chunks.
+
+        An aggregation that only row-local steps precede runs on mergeable partial
+        states. Otherwise steps after the first non-row-local one are spilled to disk.
+        """
+        operations, usecols = self.optimize()
+        custom = [operation for operation in operations if isinstance(operation, Custom)]
+        if custom:
+            raise ValueError(f"Streaming mode cannot run step(s): {', '.join(map(repr, custom))}")
+
+        split = self._partial_aggregation_index(operations)
+        if split is not None:
+            data_frame = aggregate_in_chunks(self.csv_file, operations[:split], operations[split], chunk_size, usecols)
+            if data_frame is not None:
+                yield _apply_operations(data_frame, operations[split + 1:])
+            return
+
+        if isinstance(self.csv_file, str):
+            chunks = read_csv_chunks(self.csv_file, chunk_size, usecols=usecols)
+        else:
+            chunks = iter_merged_csv_chunks(self.csv_file, chunk_size, usecols=usecols)
+        if chunks is None:
+            return
+
+        first_spill = next((i for i, operation in enumerate(operations) if not operation.row_local), len(operations))
+        chunks = (_apply_operations(chunk, operations[:first_spill]) for chunk in chunks)
+        if first_spill < len(operations):
+            chunks = spill_to_disk(chunks, operations[first_spill:], chunk_size)
+        yield from chunks
+
+def _apply_operations(data_frame, operations):
+    for operation in operations:
+        data_frame = operation.apply(data_frame)
+    return data_frame
+
+def spill_to_disk(chunks, operations, chunk_size=CHUNK_SIZE):
+    """Runs whole-dataset steps by spilling the chunks to a temporary SQLite database.
+
+    SQLite sorts, deduplicates and groups on disk, so memory stays bounded by the chunk size.
+    Every step keeps a position column up to date, and the rows are read back in its order.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        connection = sqlite3.connect(os.path.join(temp_dir, "spill.db"))
+        connection.create_function("py_upper", 1, _upper_value, deterministic=True)
+        try:
+            columns = None
+            for chunk in chunks:
+                if columns is None:
+                    columns = list(chunk.columns)
+                chunk.to_sql("data", connection, if_exists="append", index=False)
+            if columns is None:
+                return
+
+            query, params = f'SELECT *, rowid AS {SPILL_ORDER} FROM "data"', []
+            for operation in operations:
+                query, columns, step_params = operation.to_sql(query, columns)
+                params += step_params
+            selection = ", ".join(_quote(column) for column in columns)
+            query = f"SELECT {selection} FROM ({query}) ORDER BY {SPILL_ORDER}"
+            yield from pd.read_sql_query(query, connection, params=params, chunksize=chunk_size)
+        finally:
+            connection.close()
+
+# Schema-unifying merge
+def _sample_csv(csv_file):
+    """Summarizes the first rows of a CSV as {column: (kind, distinct strings, non-null count)}."""
+    try:
+        sample = pd.read_csv(csv_file, skip_blank_lines=True, nrows=SCHEMA_SAMPLE_ROWS)
+    except FileNotFoundError:
+        return None, f"Error: File '{csv_file}' not found."
+    except Exception as e:
+        return None, f"Error: Unable to read '{csv_file}': {e}"
+
+    columns = {}
+    for column in sample.columns:
+        series = sample[column]
+        if pd.api.types.is_bool_dtype(series):
+            columns[column] = ("b", None, 0)
+        elif pd.api.types.is_integer_dtype(series):
+            columns[column] = ("i", None, 0)
+        elif pd.api.types.is_float_dtype(series) and series.notna().any():
+            columns[column] = ("f", None, 0)
+        else:
+            values = series.dropna()
+            distinct = set(values.unique()[:CATEGORY_MAX_UNIQUE + 1]) if len(values) else set()
+            columns[column] = ("O" if len(values) else "f", distinct, len(values))
+    return columns, None
+
+def unify_schema(samples):
+    """Picks one dtype per column that every sampled file can be read with.
+
+    Integer and boolean columns use nullable dtypes so missing values later in a
+    file do not force an upcast. Low-cardinality string columns become categoricals.
+    """
+    kinds, distinct_values, counts = {}, {}, {}
+    for sample in samples:
+        for column, (kind, distinct, count) in sample.items():
+            kinds.setdefault(column, set()).add(kind)
+            if distinct:
+                distinct_values.setdefault(column, set()).update(distinct)
+            counts[column] = counts.get(column, 0) + count
+
+    dtypes = {}
+    for column, column_kinds in kinds.items():
+        if column_kinds == {"i"}:
+            dtypes[column] = "Int64"
+        elif column_kinds <= {"i", "f"}:
+            dtypes[column] = "float64"
+        elif column_kinds == {"b"}:
+            dtypes[column] = "boolean"
+        else:
+            unique_count = len(distinct_values.get(column, ()))
+            if unique_count <= CATEGORY_MAX_UNIQUE and unique_count * 2 <= counts[column]:
+                dtypes[column] = "category"
+            else:
+                dtypes[column] = "str"
+    return dtypes
+
+def infer_merged_schema(csv_files, workers=MERGE_WORKERS):
+    """Samples every file in a process pool and returns (readable files, unified dtypes)."""
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(csv_files)))) as executor:
+        results = list(executor.map(_sample_csv, csv_files))
+
+    readable, samples = [], []
+    for csv_file, (sample, error) in zip(csv_files, results):
+        if error:
+            print(error)
+        else:
+            readable.append(csv_file)
+            samples.append(sample)
+    return readable, unify_schema(samples)
+
+def _read_with_schema(csv_file, dtypes, usecols=None):
+    """Reads one CSV with the unified dtypes, relaxing them if a guess from the sample turns out wrong."""
+    wanted = set(usecols) if usecols is not None else None
+    select = (lambda column: column in wanted) if wanted is not None else None
+    read = csv_cache.read_csv if USE_CSV_CACHE else pd.read_csv
+    try:
+        return read(csv_file, skip_blank_lines=True, dtype=dtypes, usecols=select), None
+    except (ValueError, TypeError) as e:
+        relaxed = {column: dtype for column, dtype in dtypes.items() if dtype == "category"}
+        data_frame = read(csv_file, skip_blank_lines=True, dtype=relaxed, usecols=select)
+        return data_frame, f"Warning: '{csv_file}' did not match the sampled schema ({e}); read with inferred types."
+
+def _unify_categories(data_frames):
+    """Gives every categorical column the same categories in all frames so concat keeps it categorical."""
+    columns = {column for data_frame in data_frames for column in data_frame.columns
+               if isinstance(data_frame[column].dtype, pd.CategoricalDtype)}
+    for column in columns:
+        categories = pd.Index([])
+        for data_frame in data_frames:
+            if column in data_frame.columns:
+                categories = categories.union(data_frame[column].astype("category").cat.categories)
+        for data_frame in data_frames:
+            if column in data_frame.columns:
+                data_frame[column] = data_frame[column].astype("category").cat.set_categories(categories)
+
+def merge_csv_files(csv_files, usecols=None, workers=MERGE_WORKERS):
+    readable, dtypes = infer_merged_schema(csv_files, workers)
+    if not readable:
+        return None
+
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(readable)))) as executor:
+        results = list(executor.map(_read_with_schema, readable, [dtypes] * len(readable), [usecols] * len(readable)))
+
+    data_frames = []
+    for data_frame, warning in results:
+        if warning:
+            print(warning)
+        data_frames.append(data_frame)
+
+    if len(data_frames) == 1:
+        return data_frames[0]
+    _unify_categories(data_frames)
+    return pd.concat(data_frames)
+
+def iter_merged_csv_chunks(csv_files, chunk_size=CHUNK_SIZE, usecols=None):
+    """Yields the merged rows of several CSVs in chunks that all share the unified columns and dtypes."""
+    readable, dtypes = infer_merged_schema(csv_files)
+    columns = [column for column in dtypes if usecols is None or column in usecols]
+    # Per-chunk categories would differ, so strings stay plain when streaming
+    dtypes = {column: ("str" if dtype == "category" else dtype) for column, dtype in dtypes.items()}
+    for csv_file in readable:
+        chunks = read_csv_chunks(csv_file, chunk_size, dtype=dtypes,
+                                 usecols=lambda column: column in columns)
+        if chunks is None:
+            continue
+        for chunk in chunks:
+            yield chunk.reindex(columns=columns)
+
+# Out-of-core aggregation
+def merge_partials(partials):
+    """Merges per-chunk aggregation states that share the same group-key index.
+
+    Counts, sums, minima and maxima combine directly. The sums of squared deviations
+    (M2) combine with Chan's parallel formula, so variance stays numerically stable.
+    """
+    combined = pd.concat(partials)
+    levels = list(range(combined.index.nlevels))
+    grouped = combined.groupby(level=levels)
+    merged = {}
+    for field in ("count", "sum"):
+        if field in combined.columns:
+            merged[field] = grouped[field].sum()
+    if "min" in combined.columns:
+        merged["min"] = grouped["min"].min()
+    if "max" in combined.columns:
+        merged["max"] = grouped["max"].max()
+    if "m2" in combined.columns:
+        group_mean = grouped["sum"].transform("sum") / grouped["count"].transform("sum")
+        delta = combined["sum"] / combined["count"] - group_mean
+        merged["m2"] = (combined["m2"] + combined["count"] * delta ** 2).groupby(level=levels).sum()
+    return pd.DataFrame(merged)
+
+def _source_column(column, operations):
+    """Traces a column back through the renames in operations to its name in the CSV, or None."""
+    for operation in reversed(operations):
+        if isinstance(operation, Rename):
+            column = operation.original_name(column)
+            if column is None:
+                return None
+    return column
+
+def _text_key_columns(csv_file, operations, aggregate):
+    """Group-key columns of a CSV to read as text, so that every chunk parses its keys the same way.
+
+    Chunks infer their own dtypes, so a key column could read as 1 in one chunk and
+    "1" in another and split the group. Keys that a filter compares keep their parsed
+    type, since the filter value is matched against it.
+    """
+    header = read_csv_header(csv_file) or []
+    filtered = set()
+    for position, operation in enumerate(operations):
+        if isinstance(operation, Filter):
+            filtered |= {_source_column(column, operations[:position]) for column in operation.columns_used()}
+    sources = {key: _source_column(key, operations) for key in aggregate.keys}
+    return {key: source for key, source in sources.items() if source in header and source not in filtered}
+
+def _parse_text_keys(state, keys):
+    """Parses text group keys back into numbers or booleans where every key allows it, as a whole-file read would."""
+    if not keys or state is None:
+        return state
+    names = list(state.index.names)
+    state = state.reset_index()
+    for key in keys:
+        values = state[key]
+        lowered = values.str.lower()
+        if values.notna().any() and lowered.dropna().isin(["true", "false"]).all():
+            state[key] = lowered.map({"true": True, "false": False})
+            continue
+        try:
+            state[key] = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            pass
+    state = state.set_index(names)
+    # "1" and "1.0" are separate text keys but the same number
+    return state if state.index.is_unique else merge_partials([state])
+
+def _aggregate_file(csv_file, operations, aggregate, chunk_size, usecols, dtypes, columns=None):
+    """Folds one CSV into a partial aggregation state chunk by chunk.
+
+    With columns set, every chunk is first reindexed to that unified column list, so a
+    column this file lacks reads as missing values instead of being skipped by the steps.
+    """
+    chunks = read_csv_chunks(csv_file, chunk_size, usecols=usecols, dtype=dtypes)
+    if chunks is None:
+        return None
+    state = None
+    try:
+        for chunk in chunks:
+            if columns is not None:
+                chunk = chunk.reindex(columns=columns)
+            partial = aggregate.partial(_apply_operations(chunk, operations))
+            state = partial if state is None else merge_partials([state, partial])
+    except (ValueError, pd.errors.ParserError, csv.Error, OSError) as e:
+        print(f"Error: Unable to aggregate '{csv_file}': {e}")
+        return None
+    return state
+
+def aggregate_in_chunks(csv_file, operations, aggregate, chunk_size=CHUNK_SIZE, usecols=None, workers=MERGE_WORKERS):
+    """Runs row-local steps and a groupby aggregation in bounded memory.
+
+    Each chunk is reduced to a per-group partial state and merged into a running
+    state, so memory scales with the number of groups rather than rows. Several
+    input files are folded in parallel worker processes.
+    """
+    if isinstance(csv_file, str):
+        text_keys = _text_key_columns(csv_file, operations, aggregate)
+        state = _aggregate_file(csv_file, operations, aggregate, chunk_size, usecols,
+                                dict.fromkeys(text_keys.values(), "str") or None)
+        state = _parse_text_keys(state, list(text_keys))
+        states = [state] if state is not None else []
     else:
+        readable, dtypes = infer_merged_schema(csv_file, workers)
+        # Per-file categories would not line up, so strings stay plain here
+        dtypes = {column: ("str" if dtype == "category" else dtype) for column, dtype in dtypes.items()}
+        wanted = set(usecols) if usecols is not None else None
+        columns = [column for column in dtypes if wanted is None or column in wanted]
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(readable) or 1))) as executor:
+            futures = [executor.submit(_aggregate_file, path, operations, aggregate, chunk_size,
+                                       [column for column in read_csv_header(path) or [] if wanted is None or column in wanted],
+                                       dtypes, columns)
+                       for path in readable]
+            states = [state for state in (future.result() for future in futures) if state is not None]
+
+    if not states:
         return None
+    return aggregate.finalize(merge_partials(states) if len(states) > 1 else states[0])
+
+# Data processing functions
+def process_and_save_csv(csv_file, excel_file, functions, streaming=False, chunk_size=CHUNK_SIZE,
+                         compact=False, report=False, split_columns=None, split_mode="sheets"):
+    plan = QueryPlan.from_steps(csv_file, functions, compact, report)
+    if streaming:
+        stream_and_save_csv(plan, excel_file, chunk_size, split_columns, split_mode)
+        return
+
+    data_frame = plan.collect()
+    if data_frame is None:
+        return
+    if split_columns:
+        save_split_to_excel(data_frame, excel_file, split_columns, split_mode)
+    else:
+        save_to_excel(data_frame, excel_file)
+
+def stream_and_save_csv(plan, excel_file, chunk_size=CHUNK_SIZE, split_columns=None, split_mode="sheets"):
+    """Streams a query plan's result into constant-memory workbooks, optionally split by key."""
+    custom = [operation for operation in plan.optimize()[0] if isinstance(operation, Custom)]
+    if custom:
+        print(f"Error: Streaming mode cannot run step(s): {', '.join(map(repr, custom))}.")
+        return
+
+    if split_columns and split_mode == "files":
+        _stream_split_files(plan, excel_file, chunk_size, split_columns)
+        return
+
+    try:
+        namer = PartitionNamer(excel_file, "sheets")
+        with StreamingExcelWriter(excel_file, namer=namer) as writer:
+            for chunk in plan.stream(chunk_size):
+                if split_columns:
+                    for key, partition in partition_frame(chunk, split_columns):
+                        writer.write_chunk(partition, sheet_name=namer(key))
+                else:
+                    writer.write_chunk(chunk)
+        print(f"Data saved to '{excel_file}' successfully ({writer.rows_written} rows, {writer.sheet_count} sheet(s)).")
+    except Exception as e:
+        print(f"Error: Unable to save data to '{excel_file}': {e}")
+
+def _stream_split_files(plan, excel_file, chunk_size, split_columns):
+    writers = {}
+    namer = PartitionNamer(excel_file, "files")
+    try:
+        for chunk in plan.stream(chunk_size):
+            for key, partition in partition_frame(chunk, split_columns):
+                path = namer(key)
+                if path not in writers:
+                    writers[path] = StreamingExcelWriter(path)
+                writers[path].write_chunk(partition)
+        print(f"Data saved to {len(writers)} workbook(s) next to '{excel_file}' successfully.")
+    except Exception as e:
+        print(f"Error: Unable to save data to '{excel_file}': {e}")
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+def remove_duplicates(data_frame):
+    return Dedup().apply(data_frame)
+
+def sort_data(data_frame):
+    return Sort(SORT_COLUMN_NAME).apply(data_frame)
+
+def filter_data(data_frame):
+    return Filter([(FILTER_COLUMN_NAME, FILTER_VALUE)]).apply(data_frame)
+
+def aggregate_data(data_frame):
+    return Aggregate(GROUP_BY_COLUMNS, AGGREGATION_COLUMN, AGGREGATION_FUNCTION).apply(data_frame)
 
 def rename_columns(data_frame):
-    data_frame.rename(columns=COLUMN_NAMES_TO_RENAME, inplace=True)
-    return data_frame
+    return Rename(COLUMN_NAMES_TO_RENAME).apply(data_frame)
 
 def apply_function(data_frame):
-    data_frame[COLUMNS_TO_APPLY_FUNCTION] = data_frame[COLUMNS_TO_APPLY_FUNCTION].apply(lambda x: x.upper())
-    return data_frame
+    return Uppercase(COLUMNS_TO_APPLY_FUNCTION).apply(data_frame)
+
+# Steps the planner understands; any other function runs as an opaque Custom step
+STEP_OPERATIONS = {
+    rename_columns: lambda: Rename(COLUMN_NAMES_TO_RENAME),
+    remove_duplicates: Dedup,
+    apply_function: lambda: Uppercase(COLUMNS_TO_APPLY_FUNCTION),
+    sort_data: lambda: Sort(SORT_COLUMN_NAME),
+    filter_data: lambda: Filter([(FILTER_COLUMN_NAME, FILTER_VALUE)]),
+    aggregate_data: lambda: Aggregate(GROUP_BY_COLUMNS, AGGREGATION_COLUMN, AGGREGATION_FUNCTION),
+}
 
 if __name__ == '__main__':
     functions_to_apply = [
@@ -99,4 +1193,11 @@ if __name__ == '__main__':
     if merged_data_frame is not None:
         functions_to_apply.append(lambda df: merged_data_frame)
 
-    process_and_save_csv(CSV_FILE_PATH, EXCEL_FILE_PATH, functions_to_apply)
\ No newline at end of file
+    if EXPLAIN_PLAN:
+        QueryPlan.from_steps(CSV_FILE_PATH, functions_to_apply).explain()
+
+    process_and_save_csv(CSV_FILE_PATH, EXCEL_FILE_PATH, functions_to_apply, streaming=STREAMING_MODE,
+                         compact=COMPACT_MODE, report=STEP_REPORT, split_columns=SPLIT_COLUMNS, split_mode=SPLIT_MODE)
+
+    # To run the pipeline over the merged files without building the merged frame first:
+    # process_and_save_csv(CSV_FILES_TO_MERGE, EXCEL_FILE_PATH, functions_to_apply[:-1], streaming=True)
\ No newline at end of file
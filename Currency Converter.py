@@ -1,20 +1,620 @@
-import tkinter as tk
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import tkinter as tk
+except ImportError:
+    tk = None  # the convert and serve commands run headless without Tk
+
+# Rate store configuration
+RATE_API_URL = "https://api.exchangerate-api.com/v4/latest/{base}"
+RATE_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "currency_rates.json")
+RATE_TTL_SECONDS = 3600
+REQUEST_TIMEOUT_SECONDS = 10
+HTTP_POOL_SIZE = 10
+LATENCY_SAMPLES = 1000
+
+# Historical rates configuration
+HISTORY_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "currency_history")
+HISTORY_INDEX_NAME = "index.json"
+HISTORY_DATES_NAME = "dates.bin"
+
+# GUI refresh configuration
+REFRESH_TIMEOUT_SECONDS = 15
+POLL_INTERVAL_MS = 100
+
+# Batch conversion configuration
+ROUND_DECIMALS = 4
+MINOR_UNIT_SAFE_BOUND = 2 ** 61  # |amount * fixed-point rate| stays below this in int64
+MAX_RATE_DIGITS = 18  # 10 ** 18 is the largest power of ten int64 holds
+DEFAULT_MINOR_DIGITS = 2
+# ISO 4217 currencies whose minor unit is not the cent
+MINOR_UNIT_DIGITS = {
+    "BHD": 3, "CLP": 0, "IQD": 3, "ISK": 0, "JOD": 3, "JPY": 0, "KRW": 0, "KWD": 3,
+    "LYD": 3, "OMR": 3, "PYG": 0, "TND": 3, "UGX": 0, "VND": 0, "XAF": 0, "XOF": 0,
+}
+
+class Metrics:
+    """Thread-safe counters and latency samples for the converter service."""
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.started_at = time.monotonic()
+        self.counters = {}
+        self.latencies = {}
+        self.samples = samples
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Counts one event called name and records how long it took."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+            self.latencies.setdefault(name, deque(maxlen=self.samples)).append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            uptime = time.monotonic() - self.started_at
+            report = {"uptime_seconds": round(uptime, 3), "counters": dict(self.counters), "latency_ms": {},
+                      "per_second": {name: round(value / uptime, 3) for name, value in self.counters.items()}}
+            for name, samples in self.latencies.items():
+                ordered = np.sort(np.fromiter(samples, dtype=np.float64)) * 1000
+                report["latency_ms"][name] = {
+                    "p50": round(float(np.percentile(ordered, 50)), 3),
+                    "p95": round(float(np.percentile(ordered, 95)), 3),
+                    "max": round(float(ordered[-1]), 3),
+                }
+        return report
+
+class HttpRateFetcher:
+    """
+    Fetches rates tables over a pooled keep-alive session, revalidating with ETag/Last-Modified.
+
+    A table that has not changed since the last fetch comes back as 304 Not Modified,
+    and the copy already held is returned instead of downloading it again.
+    """
+
+    def __init__(self, url_template=RATE_API_URL, session=None, metrics=None, timeout=REQUEST_TIMEOUT_SECONDS):
+        self.url_template = url_template
+        self.timeout = timeout
+        self.metrics = metrics or Metrics()
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, base):
+        with self._lock:
+            cached = self._validators.get(base)
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        started = time.perf_counter()
+        response = self.session.get(self.url_template.format(base=base), headers=headers, timeout=self.timeout)
+        self.metrics.observe("fetch", time.perf_counter() - started)
+        if response.status_code == 304 and cached is not None:
+            self.metrics.count("fetch_not_modified")
+            return cached["rates"]
+        response.raise_for_status()
+        self.metrics.count("fetch_bytes", len(response.content))
+
+        rates = response.json()["rates"]
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._lock:
+                self._validators[base] = {"etag": etag, "last_modified": last_modified, "rates": rates}
+        return rates
+
+class RateStore:
+    """Exchange rates for one base currency, fetched once and shared by every conversion.
+
+    Cross rates are computed locally (from -> base -> to), so one table serves
+    every currency pair. The table is kept in memory with a TTL and persisted to
+    disk, so startup does not wait on the network. Once the TTL expires the stale
+    table keeps being served while a background refresh runs. Concurrent refresh
+    requests share one in-flight fetch.
+    The fetcher is any callable taking a base currency and returning {code: rate}.
+    """
+
+    def __init__(self, base="USD", fetcher=None, ttl=RATE_TTL_SECONDS, cache_file=RATE_CACHE_FILE):
+        self.base = base
+        self.fetcher = fetcher or HttpRateFetcher()
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.fetched_at = 0.0
+        self.last_error = None
+        self._rates = None
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._load()
+
+    def _load(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get("base") == self.base and data.get("rates"):
+            self._rates = data["rates"]
+            self.fetched_at = data.get("fetched_at", 0.0)
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            temp_file = f"{self.cache_file}.tmp"
+            with open(temp_file, "w") as file:
+                json.dump({"base": self.base, "fetched_at": self.fetched_at, "rates": self._rates}, file)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            self.last_error = e
+
+    def has_rates(self):
+        return self._rates is not None
+
+    def is_stale(self):
+        return self._rates is None or time.time() - self.fetched_at >= self.ttl
+
+    def refresh(self):
+        """Fetches the base table now and returns it."""
+        rates = self.fetcher(self.base)
+        with self._lock:
+            self._rates = rates
+            self.fetched_at = time.time()
+            self.last_error = None
+            self._save()
+        return rates
+
+    def refresh_async(self):
+        """Starts a refresh on a worker thread, or joins the one already running, and returns its Future."""
+        with self._lock:
+            if self._inflight is None:
+                self._inflight = Future()
+                threading.Thread(target=self._run_refresh, args=(self._inflight,), daemon=True).start()
+            return self._inflight
+
+    def _run_refresh(self, future):
+        try:
+            rates = self.refresh()
+        except Exception as e:
+            self.last_error = e
+            with self._lock:
+                self._inflight = None
+            future.set_exception(e)
+        else:
+            with self._lock:
+                self._inflight = None
+            future.set_result(rates)
+
+    def rates(self):
+        """Returns the rates table, fetching it only if there is none yet."""
+        if self._rates is None:
+            return self.refresh()
+        if self.is_stale():
+            self.refresh_async()
+        return self._rates
+
+    def rate(self, from_currency, to_currency):
+        """Returns how many units of to_currency one unit of from_currency buys."""
+        rates = self.rates()
+        return rates[to_currency] / rates[from_currency]
+
+def round_amounts(amounts, decimals=ROUND_DECIMALS):
+    """Rounds converted amounts the same way for single and batch conversions."""
+    if np.ndim(amounts) == 0:
+        return round(amounts, decimals)
+    rounded = np.round(amounts, decimals)
+    # np.round scales before rounding, which can tip values within an ulp of a half the other way;
+    # round() rounds the exact binary value, so those few are redone with it
+    scaled = amounts * 10.0 ** decimals
+    with np.errstate(invalid="ignore"):  # infinities are never near a half
+        near_half = np.abs(scaled - np.floor(scaled) - 0.5) <= np.abs(scaled) * 2.0 ** -50
+    for position in np.flatnonzero(near_half):
+        rounded.flat[position] = round(float(amounts.flat[position]), decimals)
+    return rounded
+
+def _divide_half_even(numerator, denominator):
+    """Integer division of int64 (or Python int object) arrays rounding halves to even, like round() does."""
+    quotient = numerator // denominator
+    remainder = numerator - quotient * denominator
+    twice = 2 * remainder
+    quotient += (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient
+
+def encode_currencies(codes, index):
+    """
+    Maps currency codes (a single code, a list or a pandas column) to positions in index.
+
+    Integer arrays are taken as positions already, so columns that are converted
+    repeatedly can be encoded once; categorical columns only look up their categories.
+    Unknown codes and positions outside index raise KeyError.
+    """
+    if np.ndim(codes) == 0:
+        if codes not in index:
+            raise KeyError(f"Unknown currency code: {codes}")
+        return np.intp(index[codes])
+    if hasattr(codes, "cat"):
+        lookup = encode_currencies(np.asarray(codes.cat.categories), index)
+        codes = codes.cat.codes.to_numpy()
+        if np.any(codes < 0):
+            raise KeyError("Missing currency code")
+        return lookup[codes]
+
+    codes = np.asarray(codes)
+    if codes.dtype.kind in "iu":
+        outside = (codes < 0) | (codes >= len(index))
+        if np.any(outside):
+            raise KeyError(f"Unknown currency position: {codes[outside].flat[0]}")
+        return codes.astype(np.intp, copy=False)
+    import pandas as pd
+
+    # a column holds few distinct currencies, so only those are looked up
+    positions, unique = pd.factorize(codes.ravel())
+    if np.any(positions < 0):
+        raise KeyError("Missing currency code")
+    try:
+        lookup = np.array([index[code] for code in unique], dtype=np.intp)
+    except KeyError as e:
+        raise KeyError(f"Unknown currency code: {e.args[0]}") from None
+    return lookup[positions].reshape(codes.shape)
+
+def minor_unit_digits(codes):
+    return np.array([MINOR_UNIT_DIGITS.get(code, DEFAULT_MINOR_DIGITS) for code in codes], dtype=np.int64)
+
+def _exact_minor_units(amounts, rates, shift):
+    """Half-even conversion at the exact binary value of each rate, in Python integers."""
+    ratios = [rate.as_integer_ratio() for rate in rates.tolist()]
+    numerator = np.array([amount * ratio[0] * 10 ** max(digits, 0)
+                          for amount, ratio, digits in zip(amounts.tolist(), ratios, shift.tolist())], dtype=object)
+    denominator = np.array([ratio[1] * 10 ** max(-digits, 0) for ratio, digits in zip(ratios, shift.tolist())],
+                           dtype=object)
+    return _divide_half_even(numerator, denominator)
+
+def convert_minor_units(amounts, rates, from_digits, to_digits):
+    """
+    Converts integer minor-unit amounts (cents, yen, fils...) at float rates, rounding half to even.
+
+    Each line runs in int64 on a fixed-point copy of its rate with as many digits as
+    the amount leaves room for, so small rates such as VND -> USD keep their precision.
+    Lines too large for that, or too close to a rounding midpoint for that precision,
+    are redone exactly in Python integers; results that do not fit int64 raise OverflowError.
+    """
+    amounts = np.asarray(amounts)
+    if amounts.dtype.kind not in "iu":
+        raise TypeError("Minor-unit amounts must be integers")
+    lines = np.broadcast_arrays(amounts.astype(np.int64), np.asarray(rates, dtype=np.float64), from_digits, to_digits)
+    shape = lines[0].shape
+    amounts, rates, from_digits, to_digits = (np.ravel(line) for line in lines)
+
+    # moving between currencies with different minor units scales by a power of ten
+    shift = to_digits - from_digits
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        magnitude = np.maximum(np.abs(amounts), 1) * np.abs(rates) * 10.0 ** shift
+        digits = np.clip(np.floor(np.log10(MINOR_UNIT_SAFE_BOUND / magnitude)), -1, MAX_RATE_DIGITS)
+        fast = np.isfinite(rates) & (digits >= 0)
+        digits = np.where(fast, digits, 0).astype(np.int64)
+        fixed = np.rint(np.where(fast, rates, 0.0) * 10.0 ** (shift + digits))
+        # the fixed-point rate is off by up to half a unit, plus the float rounding of the line above
+        error = np.abs(amounts) * (0.5 + np.abs(fixed) * 1e-15) / 10.0 ** digits
+
+    result = np.empty(amounts.shape, dtype=np.int64)
+    numerator = amounts[fast] * fixed[fast].astype(np.int64)
+    denominator = 10 ** digits[fast]
+    result[fast] = _divide_half_even(numerator, denominator)
+    fraction = (numerator - numerator // denominator * denominator) / denominator
+    fast[fast] = np.abs(fraction - 0.5) > error[fast]
+
+    if not fast.all():
+        slow = ~fast
+        exact = _exact_minor_units(amounts[slow], rates[slow], shift[slow])
+        if any(abs(value) >= 2 ** 63 for value in exact):
+            raise OverflowError("Converted amounts do not fit in int64")
+        result[slow] = exact.astype(np.int64)
+    return result[0] if shape == () else result.reshape(shape)
+
+class RateMatrix:
+    """N x N cross rates for one rates table, where matrix[i, j] converts currency i into currency j."""
+
+    def __init__(self, rates):
+        self.codes = list(rates)
+        self.index = {code: position for position, code in enumerate(self.codes)}
+        self.base_rates = np.array([rates[code] for code in self.codes], dtype=np.float64)
+        self.matrix = self.base_rates[np.newaxis, :] / self.base_rates[:, np.newaxis]
+        self.minor_digits = minor_unit_digits(self.codes)
+
+    def indices(self, codes):
+        """Maps currency codes to matrix indices; see encode_currencies."""
+        return encode_currencies(codes, self.index)
+
+    def convert(self, from_currencies, to_currencies, amounts):
+        from_index = self.indices(from_currencies)
+        to_index = self.indices(to_currencies)
+        # through the base currency in the same order of operations as CurrencyConverter.convert
+        amounts = np.asarray(amounts, dtype=np.float64) / self.base_rates[from_index]
+        return round_amounts(amounts * self.base_rates[to_index])
+
+    def convert_minor(self, from_currencies, to_currencies, amounts):
+        from_index = self.indices(from_currencies)
+        to_index = self.indices(to_currencies)
+        return convert_minor_units(amounts, self.matrix[from_index, to_index],
+                                   self.minor_digits[from_index], self.minor_digits[to_index])
+
+def to_days(dates):
+    """Converts dates (strings, date objects, datetime64 or a pandas column) to int64 days since 1970-01-01."""
+    if hasattr(dates, "dt"):
+        dates = dates.to_numpy()
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+def load_snapshots(paths):
+    """Yields rate snapshots ({"base", "date", "rates"}) from JSON files, directories of them, or dicts."""
+    for path in paths:
+        if isinstance(path, dict):
+            yield path
+            continue
+        files = sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+        for file_name in files:
+            with open(file_name) as file:
+                data = json.load(file)
+            yield from data if isinstance(data, list) else [data]
+
+class HistoricalRateStore:
+    """
+    Daily rates history for one base currency, one memory-mapped file per currency.
+
+    dates.bin holds the sorted snapshot dates as int64 days and is the index shared
+    by every <CODE>.bin float64 column (NaN where a currency was not quoted).
+    Lookups binary-search the dates, and the rate on a date is that of the latest
+    snapshot on or before it, so weekends and holidays use the previous quote.
+    """
+
+    def __init__(self, directory=HISTORY_DIRECTORY, base="USD"):
+        self.directory = directory
+        self.base = base
+        self.currencies = []
+        self._maps = {}
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, HISTORY_INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path) as file:
+                index = json.load(file)
+            if index["base"] != base:
+                raise ValueError(f"History in {directory} is based on {index['base']}, not {base}")
+            self.currencies = index["currencies"]
+        self.index = {code: position for position, code in enumerate(self.currencies)}
+        self.minor_digits = minor_unit_digits(self.currencies)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _row_count(self):
+        try:
+            return os.path.getsize(self._path(HISTORY_DATES_NAME)) // 8
+        except FileNotFoundError:
+            return 0
+
+    def _map(self, name, dtype):
+        if name not in self._maps:
+            rows = self._row_count()
+            if rows == 0:
+                return np.empty(0, dtype=dtype)
+            self._maps[name] = np.memmap(self._path(name), dtype=dtype, mode="r", shape=(rows,))
+        return self._maps[name]
+
+    def dates(self):
+        return self._map(HISTORY_DATES_NAME, np.int64)
+
+    def column(self, currency):
+        if currency not in self.index:
+            raise KeyError(f"Unknown currency code: {currency}")
+        return self._map(f"{currency}.bin", np.float64)
+
+    def rows_for(self, dates):
+        """Row of the latest snapshot on or before each date, or -1 before the first snapshot."""
+        return np.searchsorted(self.dates(), to_days(dates), side="right") - 1
+
+    def rate_on(self, currency, date):
+        """Rate of currency against the base on date."""
+        row = int(self.rows_for(date))
+        if row < 0:
+            raise KeyError(f"No {currency} rate on or before {date}")
+        return float(self.column(currency)[row])
+
+    def rates_between(self, currency, start, end):
+        """Returns (dates, rates) for the snapshots from start to end inclusive."""
+        dates = self.dates()
+        first = np.searchsorted(dates, to_days(start), side="left")
+        last = np.searchsorted(dates, to_days(end), side="right")
+        return np.array(dates[first:last]).astype("datetime64[D]"), np.array(self.column(currency)[first:last])
+
+    def ingest(self, sources, replace=False):
+        """
+        Adds snapshots to the history and returns how many new dates were stored.
+
+        Dates already stored are skipped unless replace is True. Snapshots after the
+        last stored date are appended to the column files; older ones trigger a rewrite.
+        """
+        snapshots = {}
+        for snapshot in load_snapshots(sources):
+            rates = snapshot["rates"]
+            if snapshot.get("base", self.base) != self.base:
+                # rebasing keeps every column relative to the same currency
+                pivot = rates[self.base]
+                rates = {code: rate / pivot for code, rate in rates.items()}
+            snapshots[int(to_days(snapshot["date"]))] = rates
+        if not snapshots:
+            return 0
+
+        old_dates = np.array(self.dates())
+        days = np.array(sorted(snapshots), dtype=np.int64)
+        known = np.isin(days, old_dates)
+        new_days = days[~known]
+        updates = days[known] if replace else np.empty(0, dtype=np.int64)
+        codes = sorted({code for rates in snapshots.values() for code in rates} - set(self.currencies))
+        self._maps.clear()
+
+        if len(old_dates) == 0 or len(new_days) == 0 or new_days[0] > old_dates[-1]:
+            self._append(old_dates, new_days, codes, snapshots)
+        else:
+            self._rewrite(old_dates, new_days, codes, snapshots)
+        if len(updates):
+            self._update(updates, snapshots)
+        self._maps.clear()
+        return len(new_days)
+
+    def _add_currencies(self, codes):
+        self.currencies = self.currencies + codes
+        self.index = {code: position for position, code in enumerate(self.currencies)}
+        self.minor_digits = minor_unit_digits(self.currencies)
+        temp_path = self._path(f"{HISTORY_INDEX_NAME}.tmp")
+        with open(temp_path, "w") as file:
+            json.dump({"base": self.base, "currencies": self.currencies}, file)
+        os.replace(temp_path, self._path(HISTORY_INDEX_NAME))
+
+    def _column_values(self, code, days, snapshots):
+        return np.array([snapshots[day].get(code, np.nan) for day in days], dtype=np.float64)
+
+    def _append(self, old_dates, new_days, codes, snapshots):
+        rows = len(old_dates)
+        for code in codes:
+            np.full(rows, np.nan).tofile(self._path(f"{code}.bin"))
+        self._add_currencies(codes)
+        for code in self.currencies:
+            path = self._path(f"{code}.bin")
+            with open(path, "ab") as file:
+                # drops rows left behind by an append that died before dates.bin was extended
+                file.truncate(rows * 8)
+                self._column_values(code, new_days, snapshots).tofile(file)
+        # the dates file goes last so readers never see rows without values
+        with open(self._path(HISTORY_DATES_NAME), "ab") as file:
+            file.truncate(rows * 8)
+            new_days.tofile(file)
+
+    def _rewrite(self, old_dates, new_days, codes, snapshots):
+        all_days = np.union1d(old_dates, new_days)
+        old_rows = np.searchsorted(all_days, old_dates)
+        new_rows = np.searchsorted(all_days, new_days)
+        self._add_currencies(codes)
+        for code in self.currencies:
+            path = self._path(f"{code}.bin")
+            values = np.full(len(all_days), np.nan)
+            if os.path.exists(path) and len(old_dates):
+                values[old_rows] = np.fromfile(path, dtype=np.float64, count=len(old_dates))
+            values[new_rows] = self._column_values(code, new_days, snapshots)
+            values.tofile(f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        all_days.tofile(self._path(f"{HISTORY_DATES_NAME}.tmp"))
+        os.replace(self._path(f"{HISTORY_DATES_NAME}.tmp"), self._path(HISTORY_DATES_NAME))
+
+    def _update(self, days, snapshots):
+        rows = np.searchsorted(self.dates(), days)
+        self._maps.clear()
+        for code in self.currencies:
+            column = np.memmap(self._path(f"{code}.bin"), dtype=np.float64, mode="r+", shape=(self._row_count(),))
+            column[rows] = self._column_values(code, days, snapshots)
+            column.flush()
+            del column
+
+    def _gather(self, currency_index, rows):
+        """Looks up the base rate of each (currency, row) pair, NaN where there is none."""
+        values = np.full(rows.shape, np.nan)
+        valid = rows >= 0
+        for position in np.unique(currency_index[valid]):
+            mask = valid & (currency_index == position)
+            values[mask] = self.column(self.currencies[position])[rows[mask]]
+        return values
+
+    def cross_rates(self, from_currencies, to_currencies, dates):
+        from_index = encode_currencies(from_currencies, self.index)
+        to_index = encode_currencies(to_currencies, self.index)
+        from_index, to_index, rows = np.broadcast_arrays(from_index, to_index, self.rows_for(dates))
+        return from_index, to_index, self._gather(to_index, rows) / self._gather(from_index, rows)
+
+    def convert(self, from_currencies, to_currencies, amounts, dates, minor_units=False):
+        """
+        Converts amounts at the rates of each line's date (e.g. the invoice date).
+
+        Lines dated before the history starts, or in a currency not quoted then, come
+        out as NaN; with minor_units=True they raise ValueError instead.
+        """
+        from_index, to_index, rates = self.cross_rates(from_currencies, to_currencies, dates)
+        if not minor_units:
+            return round_amounts(np.asarray(amounts, dtype=np.float64) * rates)
+        if np.any(np.isnan(rates)):
+            raise ValueError("No historical rate for some lines")
+        return convert_minor_units(amounts, rates, self.minor_digits[from_index],
+                                   self.minor_digits[to_index])
 
 class CurrencyConverter:
-    def __init__(self, url):
-        data = requests.get(url).json()
-        self.rates = data["rates"]
+    def __init__(self, url=None, store=None, history=None):
+        self.store = store
+        self.history = history
+        self._matrix = None
+        if store is None:
+            data = requests.get(url, timeout=REQUEST_TIMEOUT_SECONDS).json()
+            self._rates = data["rates"]
+
+    @property
+    def rates(self):
+        return self.store.rates() if self.store is not None else self._rates
+
+    @property
+    def rate_matrix(self):
+        rates = self.rates
+        # the store swaps in a new dict on refresh, so identity tells whether the matrix is current
+        if self._matrix is None or self._matrix[0] is not rates:
+            self._matrix = (rates, RateMatrix(rates))
+        return self._matrix[1]
 
     def convert(self, from_currency, to_currency, amount):
-        initial_amount = amount
-        if from_currency != "USD":
-            amount = amount / self.rates[from_currency]
+        rates = self.rates
+        # going through the table's base currency, whose own rate is 1
+        amount = amount / rates[from_currency]
         # limiting the precision to 4 decimal places
-        amount = round(amount * self.rates[to_currency], 4)
-        return amount
+        return float(round_amounts(amount * rates[to_currency]))
+
+    def convert_batch(self, from_currencies, to_currencies, amounts, minor_units=False, dates=None):
+        """
+        Converts many amounts at once; results match convert() line by line.
 
-class App(tk.Frame):
+        from_currencies and to_currencies may be single codes or arrays/columns of codes.
+        With minor_units=True, amounts are integers in the source currency's minor unit
+        and the result is an int64 array in the target currency's minor unit.
+        With dates (e.g. an invoice date column), each line uses the historical rates
+        of its date instead of the latest table.
+        """
+        if dates is not None:
+            if self.history is None:
+                raise ValueError("Historical conversion needs a HistoricalRateStore")
+            return self.history.convert(from_currencies, to_currencies, amounts, dates, minor_units)
+        matrix = self.rate_matrix
+        if minor_units:
+            return matrix.convert_minor(from_currencies, to_currencies, amounts)
+        return matrix.convert(from_currencies, to_currencies, amounts)
+
+class App(tk.Frame if tk is not None else object):
     currencies = {
         "USD": "$",
         "EUR": "€",
@@ -28,9 +628,11 @@ class App(tk.Frame):
         "NZD": "$"
     }
 
-    def __init__(self, master=None):
+    def __init__(self, master=None, rate_store=None):
         super().__init__(master)
         self.master = master
+        self.rate_store = rate_store or RateStore()
+        self._pending = []
         self.pack()
         self.create_widgets()
         self.refresh_rates()
@@ -82,31 +684,165 @@ class App(tk.Frame):
             self.result_label.config(text="Please select different currencies")
             return
 
-        converter = CurrencyConverter(f"https://api.exchangerate-api.com/v4/latest/{from_currency}")
-        converted_amount = converter.convert(from_currency, to_currency, amount)
-
-        self.result_label.config(text=f"{self.currencies[to_currency]}{converted_amount:.2f}")
-
-    def update_currencies(self):
-        response = requests.get("https://api.exchangerate-api.com/v4/latest/USD")
-        if response.status_code == 200:
-            data = response.json()
-            self.currencies = data["rates"]
-            self.from_menu['menu'].delete(0, 'end')
-            self.to_menu['menu'].delete(0, 'end')
-            for code in self.currencies:
-                self.from_menu['menu'].add_command(label=code + " " + self.currencies[code], command=tk._setit(self.from_var, code))
-                self.to_menu['menu'].add_command(label=code + " " + self.currencies[code], command=tk._setit(self.to_var, code))
-            self.from_var.set("USD")
-            self.to_var.set("EUR")
-            self.result_label.config(text="Currencies updated successfully")
+        if not self.rate_store.has_rates():
+            # converting again once the (shared) fetch lands keeps the Tk thread free meanwhile
+            self.result_label.config(text="Fetching rates...")
+            self.when_done(self.rate_store.refresh_async(), lambda rates: self.convert(),
+                           lambda error: self.result_label.config(text="Rates unavailable"))
+            return
+
+        converter = CurrencyConverter(store=self.rate_store)
+        try:
+            converted_amount = converter.convert(from_currency, to_currency, amount)
+        except KeyError:
+            self.result_label.config(text="Rates unavailable")
+            return
+
+        self.result_label.config(text=f"{self.currencies.get(to_currency, '')}{converted_amount:.2f}")
+
+    def update_currencies(self, force=True):
+        if not force and self.rate_store.has_rates():
+            # a cached table is shown right away and revalidated in the background when stale
+            self.show_currencies(self.rate_store.rates())
+            return
+
+        self.result_label.config(text="Updating currencies...")
+        self.when_done(self.rate_store.refresh_async(), self.show_currencies, self.show_update_error)
+
+    def show_update_error(self, error):
+        if isinstance(error, TimeoutError):
+            self.result_label.config(text="Rate update timed out")
         else:
             self.result_label.config(text="Failed to update currencies")
 
+    def show_currencies(self, rates):
+        self.from_menu['menu'].delete(0, 'end')
+        self.to_menu['menu'].delete(0, 'end')
+        for code in rates:
+            label = f"{code} {self.currencies.get(code, '')}".strip()
+            self.from_menu['menu'].add_command(label=label, command=tk._setit(self.from_var, code))
+            self.to_menu['menu'].add_command(label=label, command=tk._setit(self.to_var, code))
+        self.from_var.set("USD")
+        self.to_var.set("EUR")
+        self.result_label.config(text="Currencies updated successfully")
+
+    def when_done(self, future, on_done, on_error, timeout=REFRESH_TIMEOUT_SECONDS):
+        """Runs on_done(result) or on_error(exception) on the Tk thread once future finishes.
+
+        The Tk thread polls through after() instead of waiting on the future, and
+        gives up with a TimeoutError after timeout seconds so a slow API never
+        holds the UI. A late result still updates the rate store.
+        """
+        self._pending.append((future, on_done, on_error, time.monotonic() + timeout))
+        if len(self._pending) == 1:
+            self.master.after(POLL_INTERVAL_MS, self._poll_pending)
+
+    def _poll_pending(self):
+        pending, self._pending = self._pending, []
+        now = time.monotonic()
+        for future, on_done, on_error, deadline in pending:
+            if future.done():
+                error = future.exception()
+                if error is None:
+                    on_done(future.result())
+                else:
+                    on_error(error)
+            elif now >= deadline:
+                on_error(TimeoutError("Rate request timed out"))
+            else:
+                self._pending.append((future, on_done, on_error, deadline))
+        if self._pending:
+            self.master.after(POLL_INTERVAL_MS, self._poll_pending)
+
     def refresh_rates(self):
-        self.update_currencies()
-        self.master.after(3600000, self.refresh_rates)
+        self.update_currencies(force=False)
+        self.master.after(RATE_TTL_SECONDS * 1000, self.refresh_rates)
+
+class ConverterRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints: /convert?from=USD&to=EUR&amount=10, /rates and /metrics."""
+
+    converter = None
+    metrics = None
+
+    def do_GET(self):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/convert":
+                amount = float(query.get("amount", "1"))
+                from_currency, to_currency = query["from"].upper(), query["to"].upper()
+                result = self.converter.convert(from_currency, to_currency, amount)
+                self._send(200, {"from": from_currency, "to": to_currency, "amount": amount, "result": result})
+            elif url.path == "/rates":
+                self._send(200, {"base": self.converter.store.base, "rates": self.converter.rates})
+            elif url.path == "/metrics":
+                self._send(200, self.metrics.snapshot())
+            else:
+                self._send(404, {"error": "Not found"})
+        except (KeyError, ValueError) as e:
+            self._send(400, {"error": f"Bad request: {e}"})
+        except requests.RequestException as e:
+            self._send(503, {"error": f"Rates unavailable: {e}"})
+        self.metrics.observe("request", time.perf_counter() - started)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
-root = tk.Tk()
-app = App(master=root)
-app.mainloop()
\ No newline at end of file
+    def log_message(self, format, *args):
+        pass
+
+def make_converter(url_template=RATE_API_URL, cache_file=RATE_CACHE_FILE, ttl=RATE_TTL_SECONDS, metrics=None):
+    """Builds a headless converter backed by a pooled, revalidating rate store."""
+    metrics = metrics or Metrics()
+    fetcher = HttpRateFetcher(url_template, metrics=metrics)
+    return CurrencyConverter(store=RateStore(fetcher=fetcher, ttl=ttl, cache_file=cache_file))
+
+def make_server(converter, host="127.0.0.1", port=8000):
+    """Returns a threading HTTP server for converter; call serve_forever() to run it."""
+    handler = type("Handler", (ConverterRequestHandler,), {"converter": converter,
+                                                           "metrics": converter.store.fetcher.metrics})
+    return ThreadingHTTPServer((host, port), handler)
+
+def run_gui(rate_store=None):
+    if tk is None:
+        print("Error: The window needs tkinter, which is not installed. Use the convert or serve commands instead.")
+        return
+    root = tk.Tk()
+    app = App(master=root, rate_store=rate_store)
+    app.mainloop()
+
+if __name__ == "__main__":
+    # Command line arguments
+    parser = argparse.ArgumentParser(description="Currency converter")
+    parser.add_argument("--rates-url", default=RATE_API_URL, help="Rates API URL template with a {base} field")
+    parser.add_argument("--cache-file", default=RATE_CACHE_FILE, help="Where the latest rates table is kept")
+    parser.add_argument("--ttl", type=int, default=RATE_TTL_SECONDS, help="Seconds before the rates are refreshed")
+    commands = parser.add_subparsers(dest="command")
+    convert_parser = commands.add_parser("convert", help="Convert an amount and print the result")
+    convert_parser.add_argument("amount", type=float)
+    convert_parser.add_argument("from_currency")
+    convert_parser.add_argument("to_currency")
+    serve_parser = commands.add_parser("serve", help="Serve conversions over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    commands.add_parser("gui", help="Open the converter window (the default)")
+    args = parser.parse_args()
+
+    converter = make_converter(args.rates_url, args.cache_file, args.ttl)
+    if args.command == "convert":
+        print(converter.convert(args.from_currency.upper(), args.to_currency.upper(), args.amount))
+    elif args.command == "serve":
+        server = make_server(converter, args.host, args.port)
+        print(f"Serving conversions on http://{args.host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+    else:
+        run_gui(converter.store)
\ No newline at end of file
@@ -1,11 +1,50 @@
+import argparse
+import html
+import io
+import json
+import os
+import time
+import warnings
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-def read_data(filename):
-    """Reads data from a CSV file."""
+from csv_cache import ColumnCache
+
+USE_CSV_CACHE = False  # Set to True to keep parsed columns under csv_cache.directory (up to CACHE_MAX_BYTES) for faster re-reads
+csv_cache = ColumnCache()
+
+# Streaming statistics configuration
+STATS_CHUNK_SIZE = 1_000_000
+STATS_WORKERS = 1  # Set to os.cpu_count() to split large files across processes, if no field contains a line break
+STATS_BLOCK_BYTES = 64 * 1024 ** 2
+SKETCH_K = 200  # quantile rank error is roughly 1.7 / SKETCH_K
+SUMMARY_QUANTILES = (0.25, 0.5, 0.75)
+
+# Chart rendering configuration
+RENDER_WORKERS = os.cpu_count() or 1
+RENDER_FORMAT = "png"  # "png" or "svg"
+RENDER_DPI = 100
+
+# Large data rendering configuration
+LARGE_DATA_ROWS = 200_000  # above this, scatter plots and histograms are drawn from binned counts
+KDE_GRID_SIZE = 200
+KDE_BINS = 2048
+KDE_CUT = 0  # histplot clips its KDE to the data range
+MARKER_RADIUS_PIXELS = 4  # about the size of seaborn's default scatter marker
+
+# Correlation configuration
+CORRELATION_CHUNK_ROWS = 250_000
+CORRELATION_DTYPE = np.float64  # np.float32 halves memory and speeds up the products
+
+def read_data(filename, usecols=None):
+    """Reads data from a CSV file, through the columnar cache when enabled."""
     try:
-        return pd.read_csv(filename)
+        if USE_CSV_CACHE:
+            return csv_cache.read_csv(filename, usecols=usecols)
+        return pd.read_csv(filename, usecols=usecols)
     except FileNotFoundError:
         raise FileNotFoundError("Error: File not found.")
 
@@ -15,56 +54,703 @@ def validate_columns(data, *column_names):
     if missing_columns:
         raise ValueError(f"Error: Columns not found in the data: {', '.join(missing_columns)}")
 
-def calculate_statistics(data, column_name):
-    """Calculates mean, median, and generates a summary for a column."""
-    validate_columns(data, column_name)
-    mean_value = data[column_name].mean()
-    median_value = data[column_name].median()
-    summary = data[column_name].describe()
-    return mean_value, median_value, summary
+class RunningStats:
+    """Count, mean, variance (Welford/Chan), min and max, updated chunk by chunk and mergeable."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        chunk = RunningStats()
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        self.merge(chunk)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        # sample variance, like pandas
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+class QuantileSketch:
+    """
+    KLL quantile sketch: a stack of compactors where items at level h stand for 2**h values.
+
+    Memory stays around 3 * k items however many values are added, and sketches
+    built on different chunks or processes merge into one. Until the first
+    compaction the sketch holds every value and its quantiles are exact.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                # an odd item out stays behind; every other remaining item moves up with double weight
+                leftover, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = leftover
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def quantiles(self, probabilities):
+        if self.count == 0:
+            return [np.nan for _ in probabilities]
+        if len(self.levels) == 1:
+            return [float(value) for value in np.quantile(self.levels[0], probabilities)]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(probabilities) * cumulative[-1], side="left")
+        return [float(value) for value in items[order][np.minimum(positions, len(items) - 1)]]
+
+class ColumnStatistics:
+    """Running moments plus a quantile sketch for one numeric column."""
+
+    def __init__(self, k=SKETCH_K):
+        self.moments = RunningStats()
+        self.sketch = QuantileSketch(k)
+
+    def update(self, series):
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        self.moments.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+    def summary(self, name=None):
+        """Returns the same fields as pandas' describe()."""
+        moments = self.moments
+        empty = moments.count == 0
+        quartiles = self.sketch.quantiles(SUMMARY_QUANTILES)
+        return pd.Series([moments.count, np.nan if empty else moments.mean, np.sqrt(moments.variance),
+                          np.nan if empty else moments.min, *quartiles, np.nan if empty else moments.max],
+                         index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"], name=name)
+
+def _csv_byte_ranges(filename, parts):
+    """Splits a CSV's data rows into about `parts` byte ranges that start and end on line boundaries."""
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as file:
+        header = file.readline()
+        boundaries = [len(header)]
+        for part in range(1, parts):
+            file.seek(max(boundaries[-1], len(header) + (size - len(header)) * part // parts))
+            file.readline()
+            if file.tell() < size:
+                boundaries.append(file.tell())
+    boundaries.append(size)
+    return header, [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+def _statistics_for_range(filename, start, end, names, columns, k):
+    """Folds the rows in [start, end) of a CSV into per-column statistics."""
+    statistics = {column: ColumnStatistics(k) for column in columns}
+    with open(filename, "rb") as file:
+        file.seek(start)
+        while file.tell() < end:
+            block = file.read(min(STATS_BLOCK_BYTES, end - file.tell()))
+            if file.tell() < end:
+                # finish the line the block stopped in
+                block += file.readline()
+            if not block.strip():
+                # trailing blank lines; some pandas versions raise EmptyDataError on them
+                continue
+            chunk = pd.read_csv(io.BytesIO(block), header=None, names=names, usecols=columns)
+            for column in columns:
+                statistics[column].update(chunk[column])
+    return statistics
+
+def streaming_statistics(filename, columns, workers=STATS_WORKERS, chunk_size=STATS_CHUNK_SIZE, k=SKETCH_K):
+    """
+    Computes describe()-style summaries for numeric CSV columns in one pass with bounded memory.
+
+    Count, mean, variance, min and max are exact; quartiles come from a mergeable
+    KLL sketch. By default one worker reads in chunks through the CSV cache. Opting
+    in to several workers splits the file into line-aligned byte ranges that are
+    folded in separate processes and merged, so rows must not contain quoted line breaks.
+
+    Returns:
+        dict: Column name -> pandas.Series summary.
+    """
+    if workers > 1:
+        header, ranges = _csv_byte_ranges(filename, workers)
+        names = pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist()
+        validate_columns(pd.DataFrame(columns=names), *columns)
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(ranges)))) as executor:
+            partials = list(executor.map(_statistics_for_range, *zip(*[(filename, start, end, names, columns, k)
+                                                                       for start, end in ranges])))
+    else:
+        if USE_CSV_CACHE:
+            chunks = csv_cache.iter_csv_chunks(filename, chunk_size, usecols=columns)
+        else:
+            chunks = pd.read_csv(filename, chunksize=chunk_size, usecols=columns)
+        partial = {column: ColumnStatistics(k) for column in columns}
+        for chunk in chunks:
+            for column in columns:
+                partial[column].update(chunk[column])
+        partials = [partial]
+
+    statistics = {column: ColumnStatistics(k) for column in columns}
+    for partial in partials:
+        for column in columns:
+            statistics[column].merge(partial[column])
+    return {column: statistics[column].summary(column) for column in columns}
+
+def calculate_statistics(data, column_name, workers=STATS_WORKERS):
+    """Calculates mean, median, and generates a summary for a column.
+
+    data may be a DataFrame, or a CSV filename to summarize by streaming it
+    (in parallel with workers > 1; see streaming_statistics).
+    """
+    if isinstance(data, str):
+        summary = streaming_statistics(data, [column_name], workers)[column_name]
+    else:
+        validate_columns(data, column_name)
+        # describe() already holds the mean and median, so the column is only scanned once
+        summary = data[column_name].describe()
+    return summary["mean"], summary["50%"], summary
+
+def load_plotting():
+    """Imports matplotlib and seaborn on first use."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+def _new_figure(output_file):
+    """A pyplot figure to show, or a standalone one to save that needs no display and leaves pyplot's backend alone."""
+    plt, sns = load_plotting()
+    if output_file is None:
+        figure, axes = plt.subplots()
+    else:
+        from matplotlib.figure import Figure
+        figure = Figure()
+        axes = figure.subplots()
+    return plt, sns, figure, axes
+
+def _finish_figure(plt, figure, output_file):
+    """Saves the figure to output_file (PNG or SVG by extension) or shows it, then frees it."""
+    try:
+        if output_file is None:
+            plt.show()
+        else:
+            figure.savefig(output_file, dpi=RENDER_DPI)
+    finally:
+        plt.close(figure)
+
+def binned_kde(values, grid_size=KDE_GRID_SIZE, bins=KDE_BINS, cut=KDE_CUT):
+    """
+    Gaussian KDE from linearly binned counts, convolved with the kernel by FFT.
+
+    Uses Scott's bandwidth and the same support (data range +- cut bandwidths) as
+    seaborn, so the curve matches its exact KDE at O(n + bins log bins) cost.
+    The kernel is applied over the whole grid, so the edges are not truncated.
+
+    Returns:
+        tuple: (support, density) arrays of grid_size points, or None if the data has no spread.
+    """
+    count = len(values)
+    bandwidth = values.std(ddof=1) * count ** (-1 / 5) if count > 1 else 0.0
+    if not bandwidth > 0:
+        return None
+    low, high = values.min() - cut * bandwidth, values.max() + cut * bandwidth
+    step = (high - low) / (bins - 1)
+    position = (values - low) / step
+    left = np.minimum(np.floor(position).astype(np.int64), bins - 2)
+    weight = position - left
+    counts = (np.bincount(left, 1 - weight, minlength=bins) + np.bincount(left + 1, weight, minlength=bins))[:bins]
+
+    reach = int(min(bins - 1, np.ceil(4 * bandwidth / step)))
+    offsets = np.arange(-reach, reach + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    size = 1 << int(np.ceil(np.log2(bins + len(kernel))))
+    smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)[reach:reach + bins]
+
+    grid = np.linspace(low, high, bins)
+    support = np.linspace(low, high, grid_size)
+    return support, np.maximum(np.interp(support, grid, smoothed), 0) / count
+
+def _draw_binned_histogram(sns, axes, series):
+    """Histogram with KDE drawn from counts, styled by seaborn like histplot(kde=True)."""
+    values = series.dropna().to_numpy(dtype=np.float64)
+    counts, edges = np.histogram(values, bins=np.histogram_bin_edges(values, bins="auto"))
+    sns.histplot(x=(edges[:-1] + edges[1:]) / 2, weights=counts, bins=edges.tolist(), ax=axes)
+    kde = binned_kde(values)
+    if kde is not None and axes.patches:
+        support, density = kde
+        # seaborn scales the density to counts: total count times bin width
+        axes.plot(support, density * len(values) * (edges[1] - edges[0]), color=axes.patches[0].get_facecolor()[:3])
 
-def plot_histogram(data, column_name):
+def _draw_density_scatter(axes, x, y):
+    """
+    Datashader-style scatter: points are counted into one bin per axes pixel and
+    spread to marker size, then drawn in the scatter colour with alpha by log density.
+    """
+    from matplotlib.colors import to_rgba
+    valid = x.notna() & y.notna()
+    x_values = x[valid].to_numpy(dtype=np.float64)
+    y_values = y[valid].to_numpy(dtype=np.float64)
+    if len(x_values) == 0:
+        return
+    extent = [x_values.min(), x_values.max(), y_values.min(), y_values.max()]
+    bounds = axes.get_window_extent()
+    shape = (max(1, int(bounds.width)), max(1, int(bounds.height)))
+    counts, _, _ = np.histogram2d(x_values, y_values, bins=shape, range=[extent[:2], extent[2:]])
+
+    radius = MARKER_RADIUS_PIXELS
+    padded = np.pad(counts.T, radius)
+    spread = np.zeros_like(counts.T)
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            if dx * dx + dy * dy <= radius * radius:
+                spread += padded[radius + dy:radius + dy + spread.shape[0], radius + dx:radius + dx + spread.shape[1]]
+
+    image = np.zeros(spread.shape + (4,))
+    image[..., :3] = to_rgba("C0")[:3]
+    filled = spread > 0
+    image[..., 3][filled] = 0.5 + 0.5 * np.log1p(spread[filled]) / np.log1p(spread.max())
+    axes.imshow(image, origin="lower", extent=extent, aspect="auto", interpolation="nearest")
+    # images pin the limits to their extent; pad them like a scatter plot's default margins
+    x_pad = (extent[1] - extent[0]) * 0.05 or 0.5
+    y_pad = (extent[3] - extent[2]) * 0.05 or 0.5
+    axes.set_xlim(extent[0] - x_pad, extent[1] + x_pad)
+    axes.set_ylim(extent[2] - y_pad, extent[3] + y_pad)
+
+def plot_histogram(data, column_name, output_file=None):
     """Plots a histogram for a column."""
     validate_columns(data, column_name)
-    sns.histplot(data[column_name], kde=True)
-    plt.title(f'Distribution of {column_name}')
-    plt.xlabel('Values')
-    plt.ylabel('Frequency')
-    plt.grid(True)
-    plt.show()
-
-def plot_boxplot(data, column_name):
+    plt, sns, figure, axes = _new_figure(output_file)
+    if len(data) > LARGE_DATA_ROWS:
+        _draw_binned_histogram(sns, axes, data[column_name])
+    else:
+        sns.histplot(data[column_name], kde=True, ax=axes)
+    axes.set_title(f'Distribution of {column_name}')
+    axes.set_xlabel('Values')
+    axes.set_ylabel('Frequency')
+    axes.grid(True)
+    _finish_figure(plt, figure, output_file)
+
+def plot_boxplot(data, column_name, output_file=None):
     """Plots a boxplot for a column."""
     validate_columns(data, column_name)
-    sns.boxplot(data[column_name])
-    plt.title(f'Boxplot of {column_name}')
-    plt.xlabel('Values')
-    plt.grid(True)
-    plt.show()
+    plt, sns, figure, axes = _new_figure(output_file)
+    sns.boxplot(data[column_name], ax=axes)
+    axes.set_title(f'Boxplot of {column_name}')
+    axes.set_xlabel('Values')
+    axes.grid(True)
+    _finish_figure(plt, figure, output_file)
 
-def plot_scatter(data, x_column, y_column):
+def plot_scatter(data, x_column, y_column, output_file=None):
     """Plots a scatter plot for two columns."""
     validate_columns(data, x_column, y_column)
-    sns.scatterplot(data=data, x=x_column, y=y_column)
-    plt.title(f'Scatter plot: {x_column} vs {y_column}')
-    plt.xlabel(x_column)
-    plt.ylabel(y_column)
-    plt.grid(True)
-    plt.show()
+    plt, sns, figure, axes = _new_figure(output_file)
+    if len(data) > LARGE_DATA_ROWS:
+        _draw_density_scatter(axes, data[x_column], data[y_column])
+    else:
+        sns.scatterplot(data=data, x=x_column, y=y_column, ax=axes)
+    axes.set_title(f'Scatter plot: {x_column} vs {y_column}')
+    axes.set_xlabel(x_column)
+    axes.set_ylabel(y_column)
+    axes.grid(True)
+    _finish_figure(plt, figure, output_file)
+
+class CorrelationEngine:
+    """
+    Pearson correlations of numeric columns from mergeable sums (n, Σx, Σx², Σxy).
+
+    The sums are kept per column pair over the rows where both values are present,
+    so the results match pandas' pairwise-complete corr(). Chunks are folded in
+    with matrix products and engines built on different chunks can be merged, so
+    appended rows only cost their own pass. Columns are shifted by their first
+    chunk's mean before summing to keep the sums numerically stable.
+    """
+
+    def __init__(self, dtype=CORRELATION_DTYPE):
+        self.dtype = dtype
+        self.columns = None
+        self.rows = 0
+        self._shift = None
+        self._sums = None
+        self._matrix = None
+
+    def update(self, data_frame, chunk_rows=CORRELATION_CHUNK_ROWS):
+        if self.columns is None:
+            self.columns = data_frame.select_dtypes(include=["number", "bool"]).columns.tolist()
+            self._shift = np.nan_to_num(data_frame[self.columns].astype(np.float64).mean().to_numpy())
+            self._sums = {name: np.zeros((len(self.columns), len(self.columns))) for name in ("n", "x", "xx", "xy")}
+        for start in range(0, len(data_frame), chunk_rows):
+            chunk = data_frame[self.columns].iloc[start:start + chunk_rows]
+            values = chunk.to_numpy(dtype=np.float64, na_value=np.nan) - self._shift
+            present = ~np.isnan(values)
+            values = np.where(present, values, 0).astype(self.dtype)
+            present = present.astype(self.dtype)
+            # [i, j] sums run over the rows where both column i and column j are present
+            self._sums["n"] += present.T @ present
+            self._sums["x"] += values.T @ present
+            self._sums["xx"] += (values * values).T @ present
+            self._sums["xy"] += values.T @ values
+        self.rows += len(data_frame)
+        self._matrix = None
+
+    def merge(self, other):
+        if other.columns is None:
+            return
+        if self.columns is None:
+            self.columns, self._shift = other.columns, other._shift
+            self._sums = {name: sums.copy() for name, sums in other._sums.items()}
+        elif other.columns != self.columns:
+            raise ValueError("Error: Correlation engines cover different columns")
+        else:
+            for name, sums in other._sums_shifted_to(self._shift).items():
+                self._sums[name] += sums
+        self.rows += other.rows
+        self._matrix = None
+
+    def _sums_shifted_to(self, shift):
+        """This engine's sums re-expressed for values shifted by `shift` instead of by self._shift."""
+        offset = (self._shift - shift)[:, np.newaxis]
+        n, sum_x = self._sums["n"], self._sums["x"]
+        return {
+            "n": n,
+            "x": sum_x + offset * n,
+            "xx": self._sums["xx"] + 2 * offset * sum_x + offset ** 2 * n,
+            "xy": self._sums["xy"] + offset.T * sum_x + offset * sum_x.T + offset * offset.T * n,
+        }
+
+    def _pearson(self, i, j):
+        n, sum_x, sum_y = self._sums["n"][i, j], self._sums["x"][i, j], self._sums["x"][j, i]
+        covariance = n * self._sums["xy"][i, j] - sum_x * sum_y
+        variance_x = n * self._sums["xx"][i, j] - sum_x * sum_x
+        variance_y = n * self._sums["xx"][j, i] - sum_y * sum_y
+        with np.errstate(invalid="ignore", divide="ignore"):
+            correlation = covariance / np.sqrt(variance_x * variance_y)
+        return np.where((n > 1) & (variance_x > 0) & (variance_y > 0), np.clip(correlation, -1, 1), np.nan)
+
+    def correlation(self):
+        """Returns the correlation matrix as a DataFrame, cached until the next update."""
+        if self._matrix is None:
+            size = len(self.columns or [])
+            rows, columns = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+            self._matrix = pd.DataFrame(self._pearson(rows, columns), index=self.columns, columns=self.columns)
+        return self._matrix
+
+    def correlation_between(self, column1, column2):
+        i, j = self.columns.index(column1), self.columns.index(column2)
+        if self._matrix is not None:
+            return float(self._matrix.iat[i, j])
+        return float(self._pearson(i, j))
+
+# Engines of DataFrames analysed in this process, keyed by id and checked against a weak reference
+_correlation_engines = {}
+
+def correlation_engine(data, dtype=CORRELATION_DTYPE, build=True):
+    """
+    Returns the cached correlation engine for a DataFrame, folding in rows appended since.
+
+    Rows are assumed to be only appended; edit values in place and the cached
+    sums go stale, so call clear_correlation_engines(data) after such edits.
+    """
+    key = (id(data), np.dtype(dtype).str)
+    cached = _correlation_engines.get(key)
+    if cached is not None and cached[0]() is data and cached[1].rows <= len(data):
+        engine = cached[1]
+    elif build:
+        engine = CorrelationEngine(dtype)
+        _correlation_engines[key] = (weakref.ref(data, lambda _: _correlation_engines.pop(key, None)), engine)
+    else:
+        return None
+    if engine.rows < len(data):
+        engine.update(data.iloc[engine.rows:])
+    return engine
+
+def clear_correlation_engines(data=None):
+    """Forgets the cached correlation engine of data, or of every DataFrame when data is None."""
+    if data is None:
+        _correlation_engines.clear()
+        return
+    for key in [key for key in _correlation_engines if key[0] == id(data)]:
+        del _correlation_engines[key]
+
+def correlation_engine_for_csv(filename, chunk_size=STATS_CHUNK_SIZE, dtype=CORRELATION_DTYPE):
+    """Builds a correlation engine over a CSV in one chunked pass."""
+    engine = CorrelationEngine(dtype)
+    chunks = (csv_cache.iter_csv_chunks(filename, chunk_size) if USE_CSV_CACHE
+              else pd.read_csv(filename, chunksize=chunk_size))
+    for chunk in chunks:
+        engine.update(chunk)
+    return engine
 
 def calculate_correlation(data, column1, column2):
-    """Calculates the correlation between two columns."""
+    """Calculates the correlation between two columns.
+
+    Once a heatmap (or correlation_engine) has covered the data, this is a lookup.
+    """
     validate_columns(data, column1, column2)
+    engine = correlation_engine(data, build=False)
+    if engine is not None and column1 in engine.columns and column2 in engine.columns:
+        return engine.correlation_between(column1, column2)
     correlation = data[column1].corr(data[column2])
     return correlation
 
-def plot_heatmap(data):
-    """Plots a correlation heatmap for the data."""
-    correlation_matrix = data.corr()
-    sns.heatmap(correlation_matrix, annot=True, cmap="coolwarm")
-    plt.title("Correlation Heatmap")
-    plt.grid(True)
-    plt.show()
+def plot_heatmap(data, output_file=None):
+    """Plots a correlation heatmap for the numeric columns of the data."""
+    correlation_matrix = correlation_engine(data).correlation()
+    plt, sns, figure, axes = _new_figure(output_file)
+    sns.heatmap(correlation_matrix, annot=True, cmap="coolwarm", ax=axes)
+    axes.set_title("Correlation Heatmap")
+    axes.grid(True)
+    _finish_figure(plt, figure, output_file)
+
+CHART_TYPES = {
+    "histogram": (plot_histogram, 1),
+    "boxplot": (plot_boxplot, 1),
+    "scatter": (plot_scatter, 2),
+    "heatmap": (plot_heatmap, 0),
+}
+
+def _chart_file_name(chart_type, columns, image_format):
+    name = "_".join([chart_type, *columns])
+    safe_name = "".join(character if character.isalnum() or character in "-_" else "_" for character in name)
+    return f"{safe_name}.{image_format}"
+
+def _render_job(filename, chart_type, columns, output_file):
+    """Renders one chart in a worker; the CSV cache makes repeated loads cheap memory maps."""
+    plot_function, _ = CHART_TYPES[chart_type]
+    data = read_data(filename, usecols=list(columns) or None)
+    plot_function(data, *columns, output_file=output_file)
+    return output_file
+
+def render_charts(filename, jobs, output_directory, workers=RENDER_WORKERS, image_format=RENDER_FORMAT):
+    """
+    Renders many charts of one CSV to image files in a process pool.
+
+    Args:
+        filename (str): Path of the CSV file.
+        jobs (list): (chart type, column, ...) tuples, e.g. ("histogram", "price"),
+            ("scatter", "x", "y") or ("heatmap",).
+        output_directory (str): Directory the images are written to.
+        workers (int, optional): Number of worker processes. Defaults to RENDER_WORKERS.
+        image_format (str, optional): "png" or "svg". Defaults to RENDER_FORMAT.
+
+    Returns:
+        dict: Job -> path of the written image, or the error message if it failed.
+    """
+    for job in jobs:
+        if job[0] not in CHART_TYPES or len(job) - 1 != CHART_TYPES[job[0]][1]:
+            raise ValueError(f"Error: Invalid chart job: {job}")
+    os.makedirs(output_directory, exist_ok=True)
+    output_files = [os.path.join(output_directory, _chart_file_name(job[0], job[1:], image_format)) for job in jobs]
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(jobs) or 1))) as executor:
+        futures = [executor.submit(_render_job, filename, job[0], tuple(job[1:]), output_file)
+                   for job, output_file in zip(jobs, output_files)]
+        for job, future in zip(jobs, futures):
+            try:
+                results[tuple(job)] = future.result()
+            except Exception as e:
+                results[tuple(job)] = str(e)
+    return results
+
+REPORT_ANALYSES = {
+    # analysis type -> number of columns it takes (None for any number)
+    "stats": None,
+    "histogram": 1,
+    "boxplot": 1,
+    "scatter": 2,
+    "correlation": 2,
+    "heatmap": 0,
+}
+
+def describe_columns(data, columns):
+    """describe()-style summaries for several numeric columns from one pass over a 2D array."""
+    values = np.column_stack([pd.to_numeric(data[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+                              for column in columns]) if columns else np.empty((len(data), 0))
+    counts = (~np.isnan(values)).sum(axis=0)
+    with warnings.catch_warnings():
+        # all-NaN columns are reported as NaN, like describe() does
+        warnings.simplefilter("ignore", RuntimeWarning)
+        summary = np.vstack([
+            counts,
+            np.nanmean(values, axis=0),
+            np.nanstd(values, axis=0, ddof=1),
+            np.nanmin(values, axis=0),
+            np.nanpercentile(values, [25, 50, 75], axis=0),
+            np.nanmax(values, axis=0),
+        ])
+    return pd.DataFrame(summary, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"], columns=columns)
+
+def plan_report(filename, analyses):
+    """
+    Validates a report spec against the CSV header and plans its shared work.
+
+    Returns:
+        dict: "usecols" to load (None for every column, which a heatmap needs),
+        "stats_columns" to summarize in one pass, and whether a correlation engine is needed.
+    """
+    header = pd.read_csv(filename, nrows=0).columns
+    needed = []
+    for analysis in analyses:
+        kind, columns = analysis[0], list(analysis[1:])
+        if kind not in REPORT_ANALYSES:
+            raise ValueError(f"Error: Unknown analysis: {kind}")
+        expected = REPORT_ANALYSES[kind]
+        if expected is not None and len(columns) != expected:
+            raise ValueError(f"Error: {kind} takes {expected} column(s), got {analysis}")
+        validate_columns(pd.DataFrame(columns=header), *columns)
+        needed.extend(column for column in columns if column not in needed)
+
+    kinds = [analysis[0] for analysis in analyses]
+    return {
+        "usecols": None if "heatmap" in kinds else needed,
+        "stats_columns": [column for analysis in analyses if analysis[0] == "stats"
+                          for column in analysis[1:]],
+        "correlation_engine": "heatmap" in kinds or kinds.count("correlation") > 1,
+    }
+
+def run_report(filename, analyses, output_file, charts_directory=None):
+    """
+    Runs many analyses of one CSV and writes a single HTML or JSON report with per-step timing.
+
+    The CSV is loaded once with only the columns the analyses need. Statistics for
+    every requested column come from one vectorized pass, and all correlations and
+    the heatmap share one correlation engine.
+
+    Args:
+        filename (str): Path of the CSV file.
+        analyses (list): (type, column, ...) entries, e.g. ("stats", "a", "b"), ("histogram", "a"),
+            ("boxplot", "a"), ("scatter", "a", "b"), ("correlation", "a", "b") or ("heatmap",).
+        output_file (str): Report path; a .json extension writes JSON, anything else HTML.
+        charts_directory (str, optional): Where chart images go. Defaults to next to the report.
+
+    Returns:
+        dict: The report data.
+    """
+    analyses = [tuple(analysis) for analysis in analyses]
+    started = time.perf_counter()
+    steps = []
+
+    def timed(name, function):
+        step_started = time.perf_counter()
+        result = function()
+        steps.append({"step": name, "seconds": round(time.perf_counter() - step_started, 4)})
+        return result
+
+    plan = timed("plan", lambda: plan_report(filename, analyses))
+    data = timed("load", lambda: read_data(filename, usecols=plan["usecols"]))
+    stats_columns = list(dict.fromkeys(plan["stats_columns"]))
+    summaries = timed("stats", lambda: describe_columns(data, stats_columns)) if stats_columns else None
+    if plan["correlation_engine"]:
+        timed("correlation engine", lambda: correlation_engine(data).correlation())
+
+    charts_directory = charts_directory or os.path.join(os.path.dirname(os.path.abspath(output_file)), "charts")
+    image_format = RENDER_FORMAT
+    results = []
+    for analysis in analyses:
+        kind, columns = analysis[0], analysis[1:]
+        entry = {"analysis": list(analysis)}
+        step_started = time.perf_counter()
+        if kind == "stats":
+            entry["result"] = {column: summaries[column].to_dict() for column in columns}
+        elif kind == "correlation":
+            entry["result"] = float(calculate_correlation(data, *columns))
+        else:
+            os.makedirs(charts_directory, exist_ok=True)
+            chart_file = os.path.join(charts_directory, _chart_file_name(kind, columns, image_format))
+            CHART_TYPES[kind][0](data, *columns, output_file=chart_file)
+            entry["chart"] = os.path.relpath(chart_file, os.path.dirname(os.path.abspath(output_file)))
+        entry["seconds"] = round(time.perf_counter() - step_started, 4)
+        results.append(entry)
+
+    report = {
+        "file": filename,
+        "rows": len(data),
+        "columns_loaded": list(data.columns),
+        "steps": steps,
+        "analyses": results,
+        "total_seconds": round(time.perf_counter() - started, 4),
+    }
+    if output_file.endswith(".json"):
+        with open(output_file, "w") as file:
+            json.dump(report, file, indent=2, default=float)
+    else:
+        with open(output_file, "w") as file:
+            file.write(render_report_html(report))
+    return report
+
+def render_report_html(report):
+    """Formats report data from run_report as a standalone HTML page."""
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        f"<title>Report: {html.escape(report['file'])}</title></head><body>",
+        f"<h1>Report: {html.escape(report['file'])}</h1>",
+        f"<p>{report['rows']} rows, {len(report['columns_loaded'])} columns loaded, "
+        f"{report['total_seconds']} s total</p>",
+        "<h2>Timing</h2><table border='1'><tr><th>Step</th><th>Seconds</th></tr>",
+    ]
+    for step in report["steps"]:
+        parts.append(f"<tr><td>{html.escape(step['step'])}</td><td>{step['seconds']}</td></tr>")
+    for entry in report["analyses"]:
+        parts.append(f"<tr><td>{html.escape(' '.join(map(str, entry['analysis'])))}</td><td>{entry['seconds']}</td></tr>")
+    parts.append("</table>")
+
+    for entry in report["analyses"]:
+        parts.append(f"<h2>{html.escape(' '.join(map(str, entry['analysis'])))}</h2>")
+        if "chart" in entry:
+            parts.append(f"<img src='{html.escape(entry['chart'])}' alt='{html.escape(entry['analysis'][0])}'>")
+        elif isinstance(entry["result"], dict):
+            parts.append(pd.DataFrame(entry["result"]).to_html())
+        else:
+            parts.append(f"<p>{entry['result']}</p>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
 
 def main():
     # Read the data from a CSV file
@@ -100,4 +786,16 @@ def main():
         plot_heatmap(data)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Command line arguments
+    parser = argparse.ArgumentParser(description="Data analysis and visualization")
+    parser.add_argument("--spec", help="JSON report spec: {\"file\", \"analyses\", \"output\", \"charts_directory\"}")
+    args = parser.parse_args()
+
+    if args.spec:
+        with open(args.spec) as spec_file:
+            spec = json.load(spec_file)
+        report = run_report(spec["file"], spec["analyses"], spec.get("output", "report.html"),
+                            spec.get("charts_directory"))
+        print(f"Report with {len(report['analyses'])} analyses written in {report['total_seconds']} s.")
+    else:
+        main()
\ No newline at end of file
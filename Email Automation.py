@@ -1,6 +1,13 @@
+import argparse
 import smtplib
 import imaplib
 import email
+import re
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from email.header import decode_header, make_header
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
@@ -11,6 +18,348 @@ imap_server = 'your_imap_server'
 imap_port = 993
 email_address = 'your_email_address'
 email_password = 'your_email_password'
+imap_use_ssl = True  # Set to False for a plain-text server such as the local imap_stub
+imap_pool_size = 4
+imap_keepalive_seconds = 300  # idle connections get a NOOP this often, and before reuse
+# Safe to send twice after a dropped connection: flag changes, expunges and moves by UID are idempotent.
+# COPY is left out, since repeating it would duplicate the messages.
+imap_retryable_commands = {'CAPABILITY', 'SELECT', 'EXAMINE', 'SEARCH', 'FETCH', 'NOOP', 'STORE', 'EXPUNGE', 'MOVE'}
+fetch_batch_size = 500  # messages per header FETCH round trip
+summary_header_fields = 'SUBJECT FROM DATE'
+imap_max_set_length = 8000  # keeps command lines under the 8192-octet limit servers commonly enforce
+
+class ImapSession:
+    """An authenticated IMAP connection that reconnects itself and remembers the selected mailbox.
+
+    IMAP commands are called on the session as on an imaplib connection. If the
+    connection has dropped, the session logs in again and re-selects its mailbox.
+    Commands that are safe to repeat (imap_retryable_commands) are then retried
+    once; others, such as COPY, may already have run on the server, so the error
+    is raised to the caller instead.
+    """
+
+    def __init__(self, host, port, username, password, use_ssl=True, keepalive=imap_keepalive_seconds):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.keepalive = keepalive
+        self.connection = None
+        self.selected = None
+        self.last_used = 0.0
+
+    def connect(self):
+        connection_class = imaplib.IMAP4_SSL if self.use_ssl else imaplib.IMAP4
+        self.connection = connection_class(self.host, self.port)
+        self.connection.login(self.username, self.password)
+        # The greeting's list may omit extensions such as MOVE and UIDPLUS that are only offered after login
+        typ, data = self.connection.capability()
+        if typ == 'OK' and data and data[-1]:
+            self.connection.capabilities = tuple(data[-1].decode().upper().split())
+        self.selected = None
+        self.last_used = time.monotonic()
+
+    def discard(self):
+        """Drops the connection without waiting for the server."""
+        if self.connection is not None:
+            try:
+                self.connection.shutdown()
+            except (imaplib.IMAP4.error, OSError):
+                pass
+        self.connection = None
+        self.selected = None
+
+    def reconnect(self):
+        selected = self.selected
+        self.discard()
+        self.connect()
+        if selected is not None:
+            self.select(*selected)
+
+    def ensure_alive(self):
+        """Connects if needed, and checks a connection idle for longer than keepalive with NOOP."""
+        if self.connection is None:
+            self.connect()
+        elif time.monotonic() - self.last_used >= self.keepalive:
+            try:
+                self.connection.noop()
+            except (imaplib.IMAP4.abort, OSError):
+                self.reconnect()
+            self.last_used = time.monotonic()
+
+    def select(self, mailbox='INBOX', readonly=False):
+        """Selects mailbox unless it is already the selected one."""
+        if self.selected == (mailbox, readonly):
+            return
+        status, data = self.connection.select(mailbox, readonly)
+        if status != 'OK':
+            self.selected = None
+            raise imaplib.IMAP4.error(f"Could not select {mailbox}: {data}")
+        self.selected = (mailbox, readonly)
+
+    def close_mailbox(self):
+        if self.selected is not None:
+            self.connection.close()
+            self.selected = None
+
+    def logout(self):
+        if self.connection is not None:
+            try:
+                self.close_mailbox()
+                self.connection.logout()
+            except (imaplib.IMAP4.error, OSError):
+                pass
+        self.connection = None
+        self.selected = None
+
+    def __getattr__(self, name):
+        if self.connection is None:
+            raise AttributeError(name)
+        attribute = getattr(self.connection, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            try:
+                result = getattr(self.connection, name)(*args, **kwargs)
+            except (imaplib.IMAP4.abort, OSError):
+                self.reconnect()
+                command = args[0] if name == 'uid' and args else name
+                if str(command).upper() not in imap_retryable_commands:
+                    raise
+                result = getattr(self.connection, name)(*args, **kwargs)
+            self.last_used = time.monotonic()
+            return result
+
+        return call
+
+class ImapPool:
+    """A small pool of authenticated IMAP sessions for one account.
+
+    Idle sessions are reused most recently used first, preferring one that already
+    has the wanted mailbox selected so that no SELECT is needed. A background thread
+    sends NOOP on sessions idle for keepalive seconds so the server does not time
+    them out, and drops the ones that have died.
+    """
+
+    def __init__(self, host, port, username, password, use_ssl=True, size=imap_pool_size,
+                 keepalive=imap_keepalive_seconds):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.keepalive = keepalive
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._stop = threading.Event()
+        self._keepalive_thread = None
+        self._retired = False
+
+    def _take_idle(self, mailbox):
+        with self._lock:
+            for position in range(len(self._idle) - 1, -1, -1):
+                selected = self._idle[position].selected
+                if selected is not None and selected[0] == mailbox:
+                    return self._idle.pop(position)
+            return self._idle.pop() if self._idle else None
+
+    @contextmanager
+    def session(self, mailbox='INBOX', readonly=False):
+        """Borrows a session with mailbox selected; it returns to the pool only if the block finishes without error."""
+        self._slots.acquire()
+        session = self._take_idle(mailbox) or ImapSession(self.host, self.port, self.username, self.password,
+                                                          self.use_ssl, self.keepalive)
+        reusable = False
+        try:
+            session.ensure_alive()
+            session.select(mailbox, readonly)
+            yield session
+            reusable = True
+        except (imaplib.IMAP4.abort, OSError):
+            session.discard()
+            raise
+        finally:
+            if reusable and session.connection is not None and not self._retired:
+                with self._lock:
+                    self._idle.append(session)
+                    if self._keepalive_thread is None:
+                        self._keepalive_thread = threading.Thread(target=self._keep_alive, name='imap-keepalive',
+                                                                  daemon=True)
+                        self._keepalive_thread.start()
+            else:
+                # after an error the session may hold a half-finished command or another mailbox
+                session.logout()
+            self._slots.release()
+
+    def _keep_alive(self):
+        """Sends NOOP on sessions that have been idle for keepalive seconds, until close()."""
+        while not self._stop.wait(self.keepalive / 2):
+            now = time.monotonic()
+            with self._lock:
+                due = [session for session in self._idle if now - session.last_used >= self.keepalive]
+                self._idle = [session for session in self._idle if session not in due]
+            for session in due:
+                try:
+                    session.connection.noop()
+                except (imaplib.IMAP4.error, OSError):
+                    session.discard()
+                    continue
+                session.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(session)
+
+    def close(self):
+        """Stops the keepalive thread and logs out every idle session."""
+        self._stop.set()
+        if self._keepalive_thread is not None:
+            self._keepalive_thread.join()
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._keepalive_thread = None
+            self._stop.clear()
+        for session in idle:
+            session.logout()
+
+    def retire(self):
+        """Closes the pool for good; sessions still borrowed are logged out when they are returned."""
+        self._retired = True
+        self.close()
+
+_imap_pool = None
+_imap_pool_lock = threading.Lock()
+
+def get_imap_pool():
+    """Returns the shared session pool, built on first use and rebuilt if the email configuration has changed."""
+    global _imap_pool
+    settings = (imap_server, imap_port, email_address, email_password, imap_use_ssl, imap_pool_size,
+                imap_keepalive_seconds)
+    with _imap_pool_lock:
+        if _imap_pool is None or _imap_pool[0] != settings:
+            if _imap_pool is not None:
+                _imap_pool[1].retire()
+            pool = ImapPool(imap_server, imap_port, email_address, email_password, use_ssl=imap_use_ssl,
+                            size=imap_pool_size, keepalive=imap_keepalive_seconds)
+            _imap_pool = (settings, pool)
+        return _imap_pool[1]
+
+def close_imap_pool():
+    """Logs out the pooled IMAP sessions, if a pool was ever built."""
+    global _imap_pool
+    with _imap_pool_lock:
+        if _imap_pool is not None:
+            _imap_pool[1].retire()
+            _imap_pool = None
+
+@contextmanager
+def borrow_session(session=None, mailbox='INBOX'):
+    """Yields the given session with mailbox selected, or borrows one from the shared pool."""
+    if session is not None:
+        session.ensure_alive()
+        session.select(mailbox)
+        yield session
+    else:
+        with get_imap_pool().session(mailbox) as pooled_session:
+            yield pooled_session
+
+MessageSummary = namedtuple('MessageSummary', ['uid', 'subject', 'sender', 'date', 'flags'])
+
+def _uid_ranges(uids):
+    """Sorted UIDs as IMAP set parts, e.g. [1, 2, 3, 7] -> ['1:3', '7']."""
+    parts = []
+    start = previous = None
+    for uid in sorted(set(int(uid) for uid in uids)):
+        if previous is not None and uid == previous + 1:
+            previous = uid
+            continue
+        if start is not None:
+            parts.append(f"{start}:{previous}" if previous > start else str(start))
+        start = previous = uid
+    if start is not None:
+        parts.append(f"{start}:{previous}" if previous > start else str(start))
+    return parts
+
+def compress_uids(uids):
+    """Turns UIDs into an IMAP set with ranges, e.g. [1, 2, 3, 7] -> '1:3,7'."""
+    return ','.join(_uid_ranges(uids))
+
+def uid_set_chunks(uids, max_length=imap_max_set_length):
+    """Yields compressed UID sets no longer than max_length characters, covering all uids."""
+    chunk = []
+    length = 0
+    for part in _uid_ranges(uids):
+        if chunk and length + 1 + len(part) > max_length:
+            yield ','.join(chunk)
+            chunk, length = [], 0
+        chunk.append(part)
+        length += len(part) + (1 if length else 0)
+    if chunk:
+        yield ','.join(chunk)
+
+def _check(response, action):
+    status, data = response
+    if status != 'OK':
+        raise imaplib.IMAP4.error(f"{action} failed: {data}")
+    return data
+
+def _expunge_uids(imap_conn, uid_set):
+    """Expunges only the given messages with UID EXPUNGE (UIDPLUS); returns False if unsupported."""
+    if 'UIDPLUS' not in imap_conn.capabilities:
+        return False
+    _check(imap_conn.uid('EXPUNGE', uid_set), 'UID EXPUNGE')
+    return True
+
+def _decode_header_value(value):
+    if value is None:
+        return None
+    try:
+        return str(make_header(decode_header(value)))
+    except (UnicodeDecodeError, LookupError):
+        return value
+
+def _parse_summaries(fetch_data):
+    """Builds MessageSummary tuples from a header-only UID FETCH response."""
+    summaries = []
+    for position, item in enumerate(fetch_data):
+        if not isinstance(item, tuple):
+            continue
+        # UID and FLAGS may come before or after the header literal
+        trailer = fetch_data[position + 1] if position + 1 < len(fetch_data) else b''
+        metadata = item[0] + (trailer if isinstance(trailer, bytes) else b'')
+        uid_match = re.search(rb'UID (\d+)', metadata)
+        flags_match = re.search(rb'FLAGS \(([^)]*)\)', metadata)
+        headers = email.message_from_bytes(item[1])
+        summaries.append(MessageSummary(
+            uid=int(uid_match.group(1)) if uid_match else None,
+            subject=_decode_header_value(headers['Subject']),
+            sender=_decode_header_value(headers['From']),
+            date=headers['Date'],
+            flags=flags_match.group(1).decode().split() if flags_match else [],
+        ))
+    return summaries
+
+def iter_message_summaries(criteria='ALL', mailbox='INBOX', mark_seen=False, batch_size=fetch_batch_size,
+                           session=None):
+    """
+    Yields a MessageSummary for every message matching criteria, fetching headers only.
+
+    Messages are addressed by UID and fetched batch_size at a time with
+    BODY.PEEK[HEADER.FIELDS (...)], so bodies and attachments are never downloaded
+    and nothing is marked seen by the fetch itself. With mark_seen, each batch is
+    flagged \\Seen with one UID STORE once all of its summaries have been consumed.
+    """
+    with borrow_session(session, mailbox) as imap_conn:
+        _, data = imap_conn.uid('SEARCH', None, criteria)
+        uids = data[0].split()
+        for start in range(0, len(uids), batch_size):
+            uid_set = compress_uids(uids[start:start + batch_size])
+            _, fetch_data = imap_conn.uid('FETCH', uid_set,
+                                          f'(UID FLAGS BODY.PEEK[HEADER.FIELDS ({summary_header_fields})])')
+            yield from _parse_summaries(fetch_data)
+            if mark_seen:
+                imap_conn.uid('STORE', uid_set, '+FLAGS.SILENT', '(\\Seen)')
 
 def send_email(subject, body, recipient, sender=email_address):
     # Create a multipart message
@@ -37,106 +386,54 @@ def send_email(subject, body, recipient, sender=email_address):
     except Exception as e:
         print("An error occurred while sending the email:", str(e))
 
-def process_incoming_emails():
+def process_incoming_emails(session=None):
     try:
-        # Create IMAP connection
-        imap_conn = imaplib.IMAP4_SSL(imap_server, imap_port)
-        imap_conn.login(email_address, email_password)
-
-        # Select the mailbox to process
-        imap_conn.select('INBOX')
-
-        # Search for emails based on criteria
-        _, data = imap_conn.search(None, 'ALL')
-
-        # Iterate through email IDs
-        for email_id in data[0].split():
-            _, email_data = imap_conn.fetch(email_id, '(RFC822)')
-            raw_email = email_data[0][1].decode('utf-8')
-
+        # Iterate through header summaries, marking each batch as seen (optional)
+        for summary in iter_message_summaries('ALL', mark_seen=True, session=session):
             # Process the email as needed
             # Example: Print email subject
-            message = email.message_from_string(raw_email)
-            subject = message['Subject']
-            print("Received email with subject:", subject)
-
-            # Mark the email as seen (optional)
-            imap_conn.store(email_id, '+FLAGS', '\\Seen')
-
-        # Close IMAP connection
-        imap_conn.close()
-        imap_conn.logout()
+            print("Received email with subject:", summary.subject)
     except Exception as e:
         print("An error occurred while processing the emails:", str(e))
 
-def search_emails(criteria):
+def search_emails(criteria, session=None):
     try:
-        # Create IMAP connection
-        imap_conn = imaplib.IMAP4_SSL(imap_server, imap_port)
-        imap_conn.login(email_address, email_password)
-
-        # Select the mailbox to search
-        imap_conn.select('INBOX')
-
-        # Search for emails based on criteria
-        _, data = imap_conn.search(None, criteria)
-
-        # Iterate through email IDs
-        for email_id in data[0].split():
-            _, email_data = imap_conn.fetch(email_id, '(RFC822)')
-            raw_email = email_data[0][1].decode('utf-8')
-
+        # Iterate through header summaries of the emails matching the criteria
+        for summary in iter_message_summaries(criteria, session=session):
             # Process the email as needed
             # Example: Print email subject
-            message = email.message_from_string(raw_email)
-            subject = message['Subject']
-            print("Found email with subject:", subject)
-
-        # Close IMAP connection
-        imap_conn.close()
-        imap_conn.logout()
+            print("Found email with subject:", summary.subject)
     except Exception as e:
         print("An error occurred while searching emails:", str(e))
 
-def delete_emails(criteria):
+def delete_emails(criteria, session=None):
     try:
-        # Create IMAP connection
-        imap_conn = imaplib.IMAP4_SSL(imap_server, imap_port)
-        imap_conn.login(email_address, email_password)
-
-        # Select the mailbox to delete emails from
-        imap_conn.select('INBOX')
+        # Borrow a session with the mailbox to delete emails from selected
+        with borrow_session(session) as imap_conn:
+            # Search for email UIDs based on criteria
+            _, data = imap_conn.uid('SEARCH', None, criteria)
 
-        # Search for emails based on criteria
-        _, data = imap_conn.search(None, criteria)
+            # Flag and expunge the matches a range-compressed UID set at a time
+            expunged = True
+            for uid_set in uid_set_chunks(data[0].split()):
+                _check(imap_conn.uid('STORE', uid_set, '+FLAGS.SILENT', '(\\Deleted)'), 'UID STORE')
+                expunged = _expunge_uids(imap_conn, uid_set) and expunged
 
-        # Iterate through email IDs and delete emails
-        for email_id in data[0].split():
-            imap_conn.store(email_id, '+FLAGS', '\\Deleted')
-
-        # Expunge deleted emails
-        imap_conn.expunge()
-
-        # Close IMAP connection
-        imap_conn.close()
-        imap_conn.logout()
+            # Without UIDPLUS, fall back to expunging every deleted email
+            if not expunged:
+                imap_conn.expunge()
 
         print("Emails deleted successfully.")
     except Exception as e:
         print("An error occurred while deleting emails:", str(e))
 
-def get_email_body(email_id):
+def get_email_body(email_id, session=None):
     try:
-        # Create IMAP connection
-        imap_conn = imaplib.IMAP4_SSL(imap_server, imap_port)
-        imap_conn.login(email_address, email_password)
-
-        # Select the mailbox to fetch email from
-        imap_conn.select('INBOX')
-
-        # Fetch the email data
-        _, email_data = imap_conn.fetch(email_id, '(RFC822)')
-        raw_email = email_data[0][1].decode('utf-8')
+        # Borrow a session with the mailbox to fetch email from selected
+        with borrow_session(session) as imap_conn:
+            # Fetch the email data
+            _, email_data = imap_conn.fetch(email_id, '(RFC822)')
+            raw_email = email_data[0][1].decode('utf-8')
 
         # Process the email body
         message = email.message_from_string(raw_email)
@@ -151,18 +448,13 @@ def get_email_body(email_id):
     except Exception as e:
         print("An error occurred while retrieving the email body:", str(e))
 
-def get_email_sender(email_id):
+def get_email_sender(email_id, session=None):
     try:
-        # Create IMAP connection
-        imap_conn = imaplib.IMAP4_SSL(imap_server, imap_port)
-        imap_conn.login(email_address, email_password)
-
-        # Select the mailbox to fetch email from
-        imap_conn.select('INBOX')
-
-        # Fetch the email data
-        _, email_data = imap_conn.fetch(email_id, '(RFC822)')
-        raw_email = email_data[0][1].decode('utf-8')
+        # Borrow a session with the mailbox to fetch email from selected
+        with borrow_session(session) as imap_conn:
+            # Fetch the email data
+            _, email_data = imap_conn.fetch(email_id, '(RFC822)')
+            raw_email = email_data[0][1].decode('utf-8')
 
         # Process the email sender
         message = email.message_from_string(raw_email)
@@ -170,66 +462,51 @@ def get_email_sender(email_id):
     except Exception as e:
         print("An error occurred while retrieving the email sender:", str(e))
 
-def move_emails(criteria, destination_mailbox):
+def move_emails(criteria, destination_mailbox, session=None):
     try:
-        # Create IMAP connection
-        imap_conn = imaplib.IMAP4_SSL(imap_server, imap_port)
-        imap_conn.login(email_address, email_password)
-
-        # Select the source mailbox to move emails from
-        imap_conn.select('INBOX')
-
-        # Search for emails based on criteria
-        _, data = imap_conn.search(None, criteria)
-
-        # Iterate through email IDs and move emails
-        for email_id in data[0].split():
-            imap_conn.copy(email_id, destination_mailbox)
-            imap_conn.store(email_id, '+FLAGS', '\\Deleted')
-
-        # Expunge deleted emails
-        imap_conn.expunge()
-
-        # Close IMAP connection
-        imap_conn.close()
-        imap_conn.logout()
+        # Borrow a session with the source mailbox to move emails from selected
+        with borrow_session(session) as imap_conn:
+            # Search for email UIDs based on criteria
+            _, data = imap_conn.uid('SEARCH', None, criteria)
+
+            # Move the matches a range-compressed UID set at a time
+            supports_move = 'MOVE' in imap_conn.capabilities
+            expunged = True
+            for uid_set in uid_set_chunks(data[0].split()):
+                if supports_move:
+                    # RFC 6851: copy, flag and expunge in one command
+                    _check(imap_conn.uid('MOVE', uid_set, destination_mailbox), 'UID MOVE')
+                    continue
+                _check(imap_conn.uid('COPY', uid_set, destination_mailbox), 'UID COPY')
+                _check(imap_conn.uid('STORE', uid_set, '+FLAGS.SILENT', '(\\Deleted)'), 'UID STORE')
+                expunged = _expunge_uids(imap_conn, uid_set) and expunged
+
+            # Without UIDPLUS, fall back to expunging every deleted email
+            if not expunged:
+                imap_conn.expunge()
 
         print("Emails moved successfully.")
     except Exception as e:
         print("An error occurred while moving emails:", str(e))
 
-def mark_email_as_unread(email_id):
+def mark_email_as_unread(email_id, session=None):
     try:
-        # Create IMAP connection
-        imap_conn = imaplib.IMAP4_SSL(imap_server, imap_port)
-        imap_conn.login(email_address, email_password)
-
-        # Select the mailbox to modify email flags
-        imap_conn.select('INBOX')
-
-        # Mark the email as unread
-        imap_conn.store(email_id, '-FLAGS', '\\Seen')
-
-        # Close IMAP connection
-        imap_conn.close()
-        imap_conn.logout()
+        # Borrow a session with the mailbox to modify email flags selected
+        with borrow_session(session) as imap_conn:
+            # Mark the email as unread
+            imap_conn.store(email_id, '-FLAGS', '\\Seen')
 
         print("Email marked as unread successfully.")
     except Exception as e:
         print("An error occurred while marking the email as unread:", str(e))
 
-def get_email_attachments(email_id):
+def get_email_attachments(email_id, session=None):
     try:
-        # Create IMAP connection
-        imap_conn = imaplib.IMAP4_SSL(imap_server, imap_port)
-        imap_conn.login(email_address, email_password)
-
-        # Select the mailbox to fetch email from
-        imap_conn.select('INBOX')
-
-        # Fetch the email data
-        _, email_data = imap_conn.fetch(email_id, '(RFC822)')
-        raw_email = email_data[0][1]
+        # Borrow a session with the mailbox to fetch email from selected
+        with borrow_session(session) as imap_conn:
+            # Fetch the email data
+            _, email_data = imap_conn.fetch(email_id, '(RFC822)')
+            raw_email = email_data[0][1]
 
         # Process the email attachments
         message = email.message_from_bytes(raw_email)
@@ -240,34 +517,94 @@ def get_email_attachments(email_id):
             attachment_name = part.get_filename()
             attachments.append((attachment_name, attachment_data))
 
-        # Close IMAP connection
-        imap_conn.close()
-        imap_conn.logout()
-
         return attachments
     except Exception as e:
         print("An error occurred while retrieving the email attachments:", str(e))
 
-# Example usage
-send_email('Test Email', 'This is a test email.', 'recipient@example.com')
-process_incoming_emails()
-search_emails('SUBJECT "Important"')
-delete_emails('SUBJECT "Spam"')
-
-# Additional function usage
-email_id = '12345'  # Replace with the actual email ID
-body = get_email_body(email_id)
-print("Email Body:", body)
-
-sender = get_email_sender(email_id)
-print("Email Sender:", sender)
-
-move_emails('SUBJECT "Archive"', 'Archive')
-
-mark_email_as_unread(email_id)
-
-attachments = get_email_attachments(email_id)
-for attachment in attachments:
-    attachment_name, attachment_data = attachment
-    with open(attachment_name, 'wb') as file:
-        file.write(attachment_data)
\ No newline at end of file
+def _per_message_cleanup(imap_conn):
+    """The former one-command-per-message delete and move, kept as the benchmark baseline."""
+    _, data = imap_conn.search(None, 'SUBJECT "Spam"')
+    for email_id in data[0].split():
+        imap_conn.store(email_id, '+FLAGS', '\\Deleted')
+    imap_conn.expunge()
+    _, data = imap_conn.search(None, 'SUBJECT "Archive"')
+    for email_id in data[0].split():
+        imap_conn.copy(email_id, 'Archive')
+        imap_conn.store(email_id, '+FLAGS', '\\Deleted')
+    imap_conn.expunge()
+
+def _bulk_cleanup(imap_conn):
+    delete_emails('SUBJECT "Spam"', session=imap_conn)
+    move_emails('SUBJECT "Archive"', 'Archive', session=imap_conn)
+
+def benchmark_bulk_operations(message_count=10000):
+    """
+    Counts IMAP round trips for deleting and moving messages against a local imap_stub server.
+
+    Half of the messages are deleted and a quarter moved, first one command per
+    message, then with UID sets using COPY+STORE and with UID MOVE.
+    """
+    from imap_stub import ImapStubServer
+
+    variants = [
+        ("per message", _per_message_cleanup, ("IMAP4rev1", "UIDPLUS")),
+        ("UID sets, COPY+STORE", _bulk_cleanup, ("IMAP4rev1", "UIDPLUS")),
+        ("UID sets, MOVE", _bulk_cleanup, ("IMAP4rev1", "UIDPLUS", "MOVE")),
+    ]
+    print(f"{'Variant':<24}{'Round trips':>12}{'Seconds':>10}")
+    for label, cleanup, capabilities in variants:
+        server = ImapStubServer(capabilities=capabilities).start()
+        server.add_mailbox('Archive')
+        for number in range(message_count):
+            subject = ("Spam", "Archive", "Keep", "Spam")[number % 4]
+            server.add_message(f"From: sender{number}@example.com\r\nSubject: {subject} {number}\r\n\r\nBody\r\n")
+
+        session = ImapSession('127.0.0.1', server.port, 'benchmark', 'benchmark', use_ssl=False)
+        session.connect()
+        session.select('INBOX')
+        server.reset_counts()
+        started = time.perf_counter()
+        cleanup(session)
+        elapsed = time.perf_counter() - started
+        round_trips = sum(server.commands.values())
+        remaining = len(server.mailboxes['INBOX'].messages), len(server.mailboxes['Archive'].messages)
+        session.logout()
+        server.stop()
+        print(f"{label:<24}{round_trips:>12}{elapsed:>10.2f}  (inbox {remaining[0]}, archive {remaining[1]})")
+
+if __name__ == '__main__':
+    # Command line arguments
+    parser = argparse.ArgumentParser(description='Email automation')
+    parser.add_argument('--benchmark', type=int, metavar='MESSAGES',
+                        help='Count IMAP round trips of bulk delete/move against a local stub server')
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark_bulk_operations(args.benchmark)
+        raise SystemExit
+
+    # Example usage
+    send_email('Test Email', 'This is a test email.', 'recipient@example.com')
+    process_incoming_emails()
+    search_emails('SUBJECT "Important"')
+    delete_emails('SUBJECT "Spam"')
+
+    # Additional function usage
+    email_id = '12345'  # Replace with the actual email ID
+    body = get_email_body(email_id)
+    print("Email Body:", body)
+
+    sender = get_email_sender(email_id)
+    print("Email Sender:", sender)
+
+    move_emails('SUBJECT "Archive"', 'Archive')
+
+    mark_email_as_unread(email_id)
+
+    attachments = get_email_attachments(email_id)
+    for attachment in attachments:
+        attachment_name, attachment_data = attachment
+        with open(attachment_name, 'wb') as file:
+            file.write(attachment_data)
+
+    # Log out the pooled IMAP sessions
+    close_imap_pool()
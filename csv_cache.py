@@ -0,0 +1,326 @@
+"""On-disk columnar cache for parsed CSV files.
+
+Parsed frames are stored one raw binary file per column, keyed by the CSV's
+path, size, mtime and read options. Later reads memory-map only the columns
+they touch instead of parsing the CSV again.
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Cache configuration
+CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "csv_column_cache")
+CACHE_MAX_BYTES = 10 * 1024 ** 3
+CACHE_MAX_CATEGORIES = 100_000  # distinct strings per column held in memory while an entry is written
+META_FILE_NAME = "meta.json"
+
+
+def _column_kind(dtype):
+    """Return how a column of this dtype is stored: "numpy", "masked" or "codes"."""
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        return "numpy"
+    numpy_dtype = getattr(dtype, "numpy_dtype", None)
+    if numpy_dtype is not None and np.dtype(numpy_dtype).kind in "biuf":
+        return "masked"
+    return "codes"
+
+
+class _EntryWriter:
+    """Appends DataFrame chunks to a new cache entry and publishes it atomically on commit."""
+
+    def __init__(self, entry_directory, all_columns, max_categories=CACHE_MAX_CATEGORIES):
+        self.entry_directory = entry_directory
+        self.temp_directory = f"{entry_directory}.tmp{os.getpid()}"
+        self.all_columns = all_columns
+        self.max_categories = max_categories
+        self.columns = None
+        self.specs = []
+        self.category_maps = []
+        self.rows = 0
+        self.failed = False
+        shutil.rmtree(self.temp_directory, ignore_errors=True)
+        os.makedirs(self.temp_directory)
+
+    def append(self, data_frame):
+        if self.failed:
+            return
+        try:
+            self._append(data_frame)
+        except (TypeError, ValueError, OverflowError):
+            # A chunk did not match the earlier ones or a column has too many distinct strings;
+            # parsing carries on without caching
+            self.abort()
+
+    def _append(self, data_frame):
+        if self.columns is None:
+            self.columns = list(data_frame.columns)
+            for index, column in enumerate(self.columns):
+                dtype = data_frame[column].dtype
+                kind = _column_kind(dtype)
+                spec = {"kind": kind, "dtype": str(dtype), "file": f"{index}.bin"}
+                if kind == "numpy":
+                    spec["storage"] = dtype.str
+                elif kind == "masked":
+                    spec["storage"] = np.dtype(dtype.numpy_dtype).str
+                    spec["mask"] = f"{index}.mask"
+                else:
+                    spec["storage"] = np.dtype(np.int32).str
+                    spec["categories"] = f"{index}.categories"
+                self.specs.append(spec)
+                self.category_maps.append({})
+        elif list(data_frame.columns) != self.columns:
+            raise ValueError("Columns changed between chunks")
+
+        for column, spec, category_map in zip(self.columns, self.specs, self.category_maps):
+            series = data_frame[column]
+            if str(series.dtype) != spec["dtype"]:
+                raise ValueError(f"Column '{column}' changed dtype between chunks")
+            if spec["kind"] == "numpy":
+                values = np.ascontiguousarray(series.to_numpy())
+            elif spec["kind"] == "masked":
+                values = series.to_numpy(dtype=spec["storage"], na_value=0)
+                self._write(spec["mask"], series.isna().to_numpy())
+            else:
+                codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                global_codes = np.array([category_map.setdefault(value, len(category_map)) for value in uniques],
+                                        dtype=np.int32)
+                values = np.full(len(codes), -1, dtype=np.int32)
+                valid = codes >= 0
+                values[valid] = global_codes[codes[valid]]
+                if len(category_map) > self.max_categories:
+                    # IDs or free text would keep every value in memory until commit
+                    raise ValueError(f"Column '{column}' has too many distinct values to cache")
+            self._write(spec["file"], values)
+        self.rows += len(data_frame)
+
+    def _write(self, file_name, values):
+        with open(os.path.join(self.temp_directory, file_name), "ab") as file:
+            values.tofile(file)
+
+    def commit(self):
+        """Publish the entry. Returns False if it could not be written."""
+        if self.failed or self.columns is None:
+            self.abort()
+            return False
+        for spec, category_map in zip(self.specs, self.category_maps):
+            if "categories" in spec:
+                with open(os.path.join(self.temp_directory, spec["categories"]), "wb") as file:
+                    pickle.dump(list(category_map), file)
+        meta = {"columns": self.columns, "specs": self.specs, "rows": self.rows, "all_columns": self.all_columns}
+        with open(os.path.join(self.temp_directory, META_FILE_NAME), "w") as file:
+            json.dump(meta, file)
+
+        shutil.rmtree(self.entry_directory, ignore_errors=True)
+        try:
+            os.rename(self.temp_directory, self.entry_directory)
+        except OSError:
+            # Another process published the same entry first
+            self.abort()
+            return False
+        return True
+
+    def abort(self):
+        self.failed = True
+        self.category_maps = []
+        shutil.rmtree(self.temp_directory, ignore_errors=True)
+
+
+class ColumnCache:
+    """
+    Cache of parsed CSV files stored as memory-mappable column files.
+
+    Entries are keyed by the CSV's absolute path, size, mtime and read options, so
+    editing the CSV or changing how it is parsed misses the cache. An entry only
+    holds the columns that have been requested so far. The least recently used
+    entries are evicted once the cache exceeds max_bytes. Files with a string column
+    of more than max_categories distinct values are not cached.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, max_bytes=CACHE_MAX_BYTES, max_categories=CACHE_MAX_CATEGORIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_categories = max_categories
+
+    def _entry_directory(self, csv_file, read_options):
+        stat = os.stat(csv_file)
+        options = sorted((name, repr(value)) for name, value in read_options.items())
+        identity = repr((os.path.abspath(csv_file), stat.st_size, stat.st_mtime_ns, options))
+        return os.path.join(self.directory, hashlib.sha1(identity.encode()).hexdigest())
+
+    def _load_meta(self, entry_directory):
+        meta_path = os.path.join(entry_directory, META_FILE_NAME)
+        try:
+            with open(meta_path) as file:
+                meta = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(meta_path)  # marks the entry as recently used for eviction
+        return meta
+
+    @staticmethod
+    def _resolve_columns(csv_file, usecols):
+        """Turn usecols into an explicit list of column names, or None for every column."""
+        if usecols is None:
+            return None
+        if callable(usecols):
+            return [column for column in pd.read_csv(csv_file, nrows=0).columns if usecols(column)]
+        return list(usecols)
+
+    @staticmethod
+    def _covers(meta, columns):
+        if meta is None:
+            return False
+        if columns is None:
+            return meta["all_columns"]
+        return meta["all_columns"] or set(columns) <= set(meta["columns"])
+
+    @staticmethod
+    def _check_columns(meta, columns):
+        """Raise the error pandas.read_csv gives when usecols names columns the file does not have."""
+        if columns is None or not meta["all_columns"]:
+            return
+        missing = [column for column in columns if column not in meta["columns"]]
+        if missing:
+            raise ValueError(f"Usecols do not match columns, columns expected but not found: {missing}")
+
+    @staticmethod
+    def _parse_columns(meta, columns):
+        """Columns to parse on a miss: the requested ones plus whatever the old entry already held."""
+        if columns is None:
+            return None
+        cached = meta["columns"] if meta is not None else []
+        return set(cached) | set(columns)
+
+    def _load_column(self, entry_directory, spec, rows, start, stop):
+        def mapped(file_name, storage):
+            if rows == 0:
+                return np.empty(0, dtype=storage)
+            # Copy-on-write, so callers can modify the frame like one parsed from the CSV
+            values = np.memmap(os.path.join(entry_directory, file_name), dtype=storage, mode="c", shape=(rows,))
+            return values[start:stop].view(np.ndarray)
+
+        values = mapped(spec["file"], spec["storage"])
+        if spec["kind"] == "numpy":
+            return pd.Series(values, copy=False)
+        if spec["kind"] == "masked":
+            return pd.Series(values, copy=False).astype(spec["dtype"]).mask(mapped(spec["mask"], "?"))
+
+        with open(os.path.join(entry_directory, spec["categories"]), "rb") as file:
+            categories = pickle.load(file)
+        series = pd.Series(pd.Categorical.from_codes(np.asarray(values), categories=pd.Index(categories, dtype=object)))
+        if spec["dtype"] == "category":
+            return series
+        series = series.astype(object)
+        return series if spec["dtype"] == "object" else series.astype(spec["dtype"])
+
+    def _load_frame(self, entry_directory, meta, columns, start=0, stop=None):
+        stop = meta["rows"] if stop is None else min(stop, meta["rows"])
+        wanted = set(columns) if columns is not None else None
+        data = {}
+        for column, spec in zip(meta["columns"], meta["specs"]):
+            if wanted is None or column in wanted:
+                series = self._load_column(entry_directory, spec, meta["rows"], start, stop)
+                series.index = pd.RangeIndex(start, stop)
+                data[column] = series
+        return pd.DataFrame(data, index=pd.RangeIndex(start, stop), copy=False)
+
+    def _commit(self, writer):
+        if writer.commit():
+            self.evict(keep=writer.entry_directory)
+
+    def read_csv(self, csv_file, usecols=None, **read_options):
+        """
+        Read a CSV through the cache.
+
+        Args:
+            csv_file (str): Path of the CSV file.
+            usecols (list or callable, optional): Columns to return, as accepted by pandas.read_csv. Defaults to None.
+            **read_options: Other pandas.read_csv options; they are part of the cache key.
+
+        Returns:
+            pandas.DataFrame: The parsed data.
+        """
+        entry_directory = self._entry_directory(csv_file, read_options)
+        columns = self._resolve_columns(csv_file, usecols)
+        meta = self._load_meta(entry_directory)
+        if self._covers(meta, columns):
+            self._check_columns(meta, columns)
+            return self._load_frame(entry_directory, meta, columns)
+
+        parse_columns = self._parse_columns(meta, columns)
+        # A list rather than a callable, so pandas rejects requested columns the file lacks
+        data_frame = pd.read_csv(csv_file, usecols=list(parse_columns) if parse_columns else None, **read_options)
+        os.makedirs(self.directory, exist_ok=True)
+        writer = _EntryWriter(entry_directory, all_columns=parse_columns is None, max_categories=self.max_categories)
+        writer.append(data_frame)
+        self._commit(writer)
+        if columns is not None:
+            data_frame = data_frame[[column for column in data_frame.columns if column in set(columns)]]
+        return data_frame
+
+    def iter_csv_chunks(self, csv_file, chunk_size, usecols=None, **read_options):
+        """
+        Read a CSV in chunks through the cache, filling the cache while streaming on a miss.
+
+        Args:
+            csv_file (str): Path of the CSV file.
+            chunk_size (int): Number of rows per chunk.
+            usecols (list or callable, optional): Columns to return, as accepted by pandas.read_csv. Defaults to None.
+            **read_options: Other pandas.read_csv options; they are part of the cache key.
+
+        Returns:
+            Iterator[pandas.DataFrame]: The parsed chunks.
+        """
+        entry_directory = self._entry_directory(csv_file, read_options)
+        columns = self._resolve_columns(csv_file, usecols)
+        meta = self._load_meta(entry_directory)
+        if self._covers(meta, columns):
+            self._check_columns(meta, columns)
+            return (self._load_frame(entry_directory, meta, columns, start, start + chunk_size)
+                    for start in range(0, meta["rows"], chunk_size))
+
+        parse_columns = self._parse_columns(meta, columns)
+        chunks = pd.read_csv(csv_file, chunksize=chunk_size, usecols=list(parse_columns) if parse_columns else None,
+                             **read_options)
+        return self._fill_while_streaming(chunks, entry_directory, columns, all_columns=parse_columns is None)
+
+    def _fill_while_streaming(self, chunks, entry_directory, columns, all_columns):
+        os.makedirs(self.directory, exist_ok=True)
+        writer = _EntryWriter(entry_directory, all_columns, self.max_categories)
+        wanted = set(columns) if columns is not None else None
+        try:
+            for chunk in chunks:
+                writer.append(chunk)
+                yield chunk if wanted is None else chunk[[column for column in chunk.columns if column in wanted]]
+        except BaseException:
+            writer.abort()
+            raise
+        self._commit(writer)
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            meta_path = os.path.join(entry.path, META_FILE_NAME)
+            if not entry.is_dir() or not os.path.exists(meta_path):
+                continue
+            size = sum(file.stat().st_size for file in os.scandir(entry.path))
+            entries.append((os.stat(meta_path).st_mtime, size, entry.path))
+            total += size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        """Remove every cache entry."""
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,363 @@
+"""Minimal in-memory IMAP4rev1 server for exercising the email scripts locally.
+
+It speaks plain (non-TLS) IMAP on localhost and understands the commands the
+scripts use: LOGIN, SELECT/EXAMINE, NOOP, SEARCH, FETCH, STORE, COPY, MOVE,
+EXPUNGE, CLOSE and LOGOUT, with or without the UID prefix. Every command is
+counted, so callers can measure round trips.
+"""
+import re
+import socket
+import socketserver
+import threading
+from collections import Counter
+from email import message_from_bytes
+from email.policy import compat32
+
+
+class StubMailbox:
+    """Messages of one mailbox as [uid, flags, raw bytes] entries in sequence order."""
+
+    def __init__(self):
+        self.messages = []
+        self.next_uid = 1
+
+    def append(self, raw, flags=()):
+        self.messages.append([self.next_uid, set(flags), raw])
+        self.next_uid += 1
+        return self.next_uid - 1
+
+
+def _tokenize(text):
+    """Split IMAP arguments into atoms, quoted strings and nested parenthesized lists."""
+    tokens, stack, position = [], [], 0
+    while position < len(text):
+        character = text[position]
+        if character == " ":
+            position += 1
+        elif character == "(":
+            stack.append(tokens)
+            tokens = []
+            position += 1
+        elif character == ")":
+            inner, tokens = tokens, stack.pop()
+            tokens.append(inner)
+            position += 1
+        elif character == '"':
+            end = position + 1
+            value = []
+            while text[end] != '"':
+                if text[end] == "\\":
+                    end += 1
+                value.append(text[end])
+                end += 1
+            tokens.append("".join(value))
+            position = end + 1
+        else:
+            # atoms may carry a bracketed section with spaces, e.g. BODY.PEEK[HEADER.FIELDS (SUBJECT)]
+            end, depth = position, 0
+            while end < len(text) and (depth or text[end] not in " ()"):
+                depth += {"[": 1, "]": -1}.get(text[end], 0)
+                end += 1
+            tokens.append(text[position:end])
+            position = end
+    return tokens
+
+
+def _parse_set(text, largest):
+    """Expand a sequence/UID set such as 1:5,7,9:* into a set of numbers."""
+    numbers = set()
+    for part in text.split(","):
+        low, _, high = part.partition(":")
+        low = largest if low == "*" else int(low)
+        high = low if not high else (largest if high == "*" else int(high))
+        numbers.update(range(min(low, high), max(low, high) + 1))
+    return numbers
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        # Responses are written line by line; without this, Nagle's algorithm delays each round trip
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.selected = None
+        self.readonly = False
+        self.logged_in = False
+
+    def capabilities(self):
+        extra = self.server.post_login_capabilities if self.logged_in else []
+        return self.server.capabilities + [name for name in extra if name not in self.server.capabilities]
+
+    def send(self, line):
+        self.wfile.write(line if isinstance(line, bytes) else line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.open_sockets.add(self.request)
+        self.send("* OK IMAP4rev1 stub ready")
+        for raw_line in self.rfile:
+            line = raw_line.decode().rstrip("\r\n")
+            tag, _, rest = line.partition(" ")
+            command, _, arguments = rest.partition(" ")
+            command = command.upper()
+            uid = command == "UID"
+            if uid:
+                command, _, arguments = arguments.partition(" ")
+                command = command.upper()
+            with server.lock:
+                server.commands[f"UID {command}" if uid else command] += 1
+                server.command_log.append(line)
+                try:
+                    status = getattr(self, f"do_{command}", self.do_unknown)(_tokenize(arguments), uid)
+                except Exception as e:  # a stub should report, not die
+                    status = f"BAD {e}"
+            self.send(f"{tag} {status}")
+            if command == "LOGOUT":
+                break
+
+    def finish(self):
+        with self.server.lock:
+            self.server.open_sockets.discard(self.request)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def do_unknown(self, arguments, uid):
+        return "BAD unknown command"
+
+    def do_CAPABILITY(self, arguments, uid):
+        self.send("* CAPABILITY " + " ".join(self.capabilities()))
+        return "OK CAPABILITY completed"
+
+    def do_LOGIN(self, arguments, uid):
+        if self.server.credentials and tuple(arguments[:2]) != self.server.credentials:
+            return "NO [AUTHENTICATIONFAILED] invalid credentials"
+        self.server.logins += 1
+        self.logged_in = True
+        return "OK LOGIN completed"
+
+    def do_NOOP(self, arguments, uid):
+        return "OK NOOP completed"
+
+    def do_LOGOUT(self, arguments, uid):
+        self.send("* BYE logging out")
+        return "OK LOGOUT completed"
+
+    def do_SELECT(self, arguments, uid, readonly=False):
+        name = arguments[0]
+        if name not in self.server.mailboxes:
+            return "NO no such mailbox"
+        self.selected, self.readonly = name, readonly
+        mailbox = self.server.mailboxes[name]
+        self.send(f"* {len(mailbox.messages)} EXISTS")
+        self.send("* 0 RECENT")
+        self.send("* OK [UIDVALIDITY 1] UIDs valid")
+        self.send(f"* OK [UIDNEXT {mailbox.next_uid}] next UID")
+        return f"OK [{'READ-ONLY' if readonly else 'READ-WRITE'}] SELECT completed"
+
+    def do_EXAMINE(self, arguments, uid):
+        return self.do_SELECT(arguments, uid, readonly=True)
+
+    def _mailbox(self):
+        if self.selected is None:
+            raise ValueError("no mailbox selected")
+        return self.server.mailboxes[self.selected]
+
+    def _targets(self, message_set, uid):
+        """(sequence number, entry) pairs addressed by a sequence or UID set."""
+        messages = self._mailbox().messages
+        if uid:
+            wanted = _parse_set(message_set, messages[-1][0] if messages else 0)
+            return [(number, entry) for number, entry in enumerate(messages, 1) if entry[0] in wanted]
+        wanted = _parse_set(message_set, len(messages))
+        return [(number, messages[number - 1]) for number in sorted(wanted) if number <= len(messages)]
+
+    def do_SEARCH(self, arguments, uid):
+        if arguments[:1] and arguments[0].upper() == "CHARSET":
+            arguments = arguments[2:]
+        matches = []
+        for number, (message_uid, flags, raw) in enumerate(self._mailbox().messages, 1):
+            message = message_from_bytes(raw, policy=compat32)
+            position, matched = 0, True
+            while position < len(arguments):
+                key = arguments[position].upper()
+                position += 1
+                if key in ("SUBJECT", "FROM", "TO"):
+                    matched &= arguments[position].lower() in (message[key] or "").lower()
+                    position += 1
+                elif key in ("SEEN", "UNSEEN", "DELETED", "UNDELETED"):
+                    flag = "\\" + key.removeprefix("UN").capitalize()
+                    matched &= (flag in flags) != key.startswith("UN")
+                elif key == "UID":
+                    matched &= message_uid in _parse_set(arguments[position], self._mailbox().next_uid - 1)
+                    position += 1
+                elif key != "ALL":
+                    raise ValueError(f"unsupported search key {key}")
+            if matched:
+                matches.append(message_uid if uid else number)
+        self.send("* SEARCH" + "".join(f" {match}" for match in matches))
+        return "OK SEARCH completed"
+
+    def do_FETCH(self, arguments, uid):
+        items = arguments[1] if isinstance(arguments[1], list) else [arguments[1]]
+        items = [item.upper() if isinstance(item, str) else item for item in items]
+        if uid and "UID" not in items:
+            items = ["UID"] + items
+        for number, entry in self._targets(arguments[0], uid):
+            message_uid, flags, raw = entry
+            parts = []
+            for item in items:
+                if item == "UID":
+                    parts.append(f"UID {message_uid}".encode())
+                elif item == "FLAGS":
+                    parts.append(f"FLAGS ({' '.join(sorted(flags))})".encode())
+                elif item == "RFC822.SIZE":
+                    parts.append(f"RFC822.SIZE {len(raw)}".encode())
+                else:
+                    data, name = self._section(item, raw)
+                    parts.append(f"{name} {{{len(data)}}}\r\n".encode() + data)
+                    if not item.startswith("BODY.PEEK") and not self.readonly:
+                        flags.add("\\Seen")
+            self.send(f"* {number} FETCH (".encode() + b" ".join(parts) + b")\r\n")
+        return "OK FETCH completed"
+
+    @staticmethod
+    def _section(item, raw):
+        header_end = raw.find(b"\r\n\r\n")
+        header = raw[:header_end + 4] if header_end >= 0 else raw
+        if item in ("RFC822", "BODY[]", "BODY.PEEK[]"):
+            return raw, item.replace(".PEEK", "")
+        if item in ("RFC822.HEADER", "BODY[HEADER]", "BODY.PEEK[HEADER]"):
+            return header, item.replace(".PEEK", "")
+        match = re.fullmatch(r"BODY(?:\.PEEK)?\[HEADER\.FIELDS \((.*)\)\]", item)
+        if match:
+            fields = match.group(1).split()
+            lines = re.split(rb"\r\n(?![ \t])", header)
+            kept = [line for line in lines if line.split(b":")[0].decode().upper() in fields]
+            data = b"\r\n".join(kept) + b"\r\n\r\n"
+            return data, f"BODY[HEADER.FIELDS ({match.group(1)})]"
+        raise ValueError(f"unsupported fetch item {item}")
+
+    def do_STORE(self, arguments, uid):
+        mode = arguments[1].upper()
+        flags = arguments[2] if isinstance(arguments[2], list) else [arguments[2]]
+        for number, entry in self._targets(arguments[0], uid):
+            if mode.startswith("+"):
+                entry[1].update(flags)
+            elif mode.startswith("-"):
+                entry[1].difference_update(flags)
+            else:
+                entry[1] = set(flags)
+            if not mode.endswith(".SILENT"):
+                uid_part = f"UID {entry[0]} " if uid else ""
+                self.send(f"* {number} FETCH ({uid_part}FLAGS ({' '.join(sorted(entry[1]))}))")
+        return "OK STORE completed"
+
+    def do_COPY(self, arguments, uid):
+        destination = self.server.mailboxes.get(arguments[1])
+        if destination is None:
+            return "NO [TRYCREATE] no such mailbox"
+        for _, (_, flags, raw) in self._targets(arguments[0], uid):
+            destination.append(raw, flags - {"\\Deleted"})
+        return "OK COPY completed"
+
+    def do_MOVE(self, arguments, uid):
+        if "MOVE" not in self.capabilities():
+            return "BAD MOVE not supported"
+        status = self.do_COPY(arguments, uid)
+        if not status.startswith("OK"):
+            return status
+        moved = {id(entry) for _, entry in self._targets(arguments[0], uid)}
+        self._expunge(lambda entry: id(entry) in moved)
+        return "OK MOVE completed"
+
+    def _expunge(self, condition):
+        messages = self._mailbox().messages
+        # Reported highest first, so every number is still valid when the client reads it
+        for number in range(len(messages), 0, -1):
+            if condition(messages[number - 1]):
+                self.send(f"* {number} EXPUNGE")
+        messages[:] = [entry for entry in messages if not condition(entry)]
+
+    def do_EXPUNGE(self, arguments, uid):
+        wanted = _parse_set(arguments[0], self._mailbox().next_uid) if uid else None
+        self._expunge(lambda entry: "\\Deleted" in entry[1] and (wanted is None or entry[0] in wanted))
+        return "OK EXPUNGE completed"
+
+    def do_CLOSE(self, arguments, uid):
+        if not self.readonly:
+            messages = self._mailbox().messages
+            messages[:] = [entry for entry in messages if "\\Deleted" not in entry[1]]
+        self.selected = None
+        return "OK CLOSE completed"
+
+
+class ImapStubServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded IMAP stub holding mailboxes in memory.
+
+    Use start() to serve in a background thread and stop() to shut it down.
+    `commands` counts every command received (UID commands as "UID FETCH", ...).
+    `post_login_capabilities` are only advertised once a client has logged in,
+    as servers commonly do for MOVE and UIDPLUS.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), credentials=None,
+                 capabilities=("IMAP4rev1", "UIDPLUS", "MOVE"), post_login_capabilities=()):
+        super().__init__(address, _Handler)
+        self.credentials = credentials
+        self.capabilities = list(capabilities)
+        self.post_login_capabilities = list(post_login_capabilities)
+        self.mailboxes = {"INBOX": StubMailbox()}
+        self.commands = Counter()
+        self.command_log = []
+        self.connections = 0
+        self.logins = 0
+        self.open_sockets = set()
+        self.lock = threading.RLock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def add_mailbox(self, name):
+        with self.lock:
+            self.mailboxes.setdefault(name, StubMailbox())
+
+    def add_message(self, raw, mailbox="INBOX", flags=()):
+        if isinstance(raw, str):
+            raw = raw.encode()
+        with self.lock:
+            return self.mailboxes.setdefault(mailbox, StubMailbox()).append(raw, flags)
+
+    def reset_counts(self):
+        with self.lock:
+            self.commands.clear()
+            self.command_log.clear()
+            self.connections = 0
+            self.logins = 0
+
+    def drop_connections(self):
+        """Cuts every open client connection, as a server restart or idle timeout would."""
+        with self.lock:
+            sockets = list(self.open_sockets)
+        for client in sockets:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,38 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_DIRECTORY)  # for the importable helper modules such as csv_cache
+
+
+@pytest.fixture(scope="session")
+def load_script():
+    """
+    Import one of the repository's scripts (their file names contain spaces) as a module.
+
+    Scripts that run their example usage at import are only executed up to the stop
+    marker, e.g. "# Example usage".
+    """
+    modules = {}
+
+    def load(file_name, stop=None):
+        if file_name not in modules:
+            name = os.path.splitext(file_name)[0].lower().replace(" ", "_")
+            path = os.path.join(REPOSITORY_DIRECTORY, file_name)
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            # Registered so worker processes can unpickle the script's functions
+            sys.modules[name] = module
+            if stop is None:
+                spec.loader.exec_module(module)
+            else:
+                with open(path) as file:
+                    source = file.read()
+                exec(compile(source[:source.index(stop)], path, "exec"), module.__dict__)
+            modules[file_name] = module
+        return modules[file_name]
+
+    return load
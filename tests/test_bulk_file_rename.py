@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def bulk_rename(load_script):
+    return load_script("Bulk file rename.py", stop="# Example usage")
+
+
+def _make_files(directory, contents):
+    directory.mkdir(exist_ok=True)
+    for name, data in contents.items():
+        (directory / name).write_bytes(data)
+
+
+@pytest.mark.parametrize("methods", [("hardlink", "hardlink"), ("hardlink", "auto"), ("auto", "copy")])
+def test_backup_twice_keeps_sources(bulk_rename, tmp_path, methods):
+    contents = {"a.txt": b"alpha" * 1000, "b.bin": b"\x00\x01" * 300}
+    source, backup = tmp_path / "source", tmp_path / "backup"
+    _make_files(source, contents)
+
+    for method in methods:
+        assert bulk_rename.backup_files(str(source), str(backup), workers=2, method=method) == (2, 5600)
+        for name, data in contents.items():
+            assert (source / name).read_bytes() == data
+            assert (backup / name).read_bytes() == data
+    assert sorted(os.listdir(backup)) == sorted(contents)
+
+
+@pytest.mark.parametrize("method", ["auto", "copy", "hardlink"])
+def test_copy_file_copies_large_files_with_metadata(bulk_rename, tmp_path, method):
+    source, target = tmp_path / "source.bin", tmp_path / "target.bin"
+    data = os.urandom(3 * bulk_rename.COPY_BUFFER_SIZE + 17)
+    source.write_bytes(data)
+    os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+
+    assert bulk_rename.copy_file(str(source), str(target), len(data), True, method) == len(data)
+    assert target.read_bytes() == data
+    assert target.stat().st_mtime_ns == 1_000_000_000
+    assert sorted(os.listdir(tmp_path)) == ["source.bin", "target.bin"]
+
+
+class Crash(Exception):
+    pass
+
+
+PLANS = {
+    "chain": ({"a.txt": b"a", "p_001.txt": b"p1"}, [("a.txt", "p_001.txt"), ("p_001.txt", "p_002.txt")], []),
+    "cycle": ({"a.txt": b"a", "b.txt": b"b"}, [("a.txt", "b.txt"), ("b.txt", "a.txt")], []),
+    "displaced": ({"a.txt": b"a", "b.txt": b"b"}, [("a.txt", "b.txt")], ["b.txt"]),
+}
+
+
+def _crash_run(bulk_rename, monkeypatch, directory, renames, conflicts, crash_at, after_rename):
+    """Apply a plan, crashing at rename number crash_at (before or after it happens) or at the commit."""
+    real_rename = os.rename
+    real_write = bulk_rename._write_journal_record
+    calls = []
+
+    def rename(source, target):
+        if len(calls) == crash_at and not after_rename:
+            raise Crash()
+        real_rename(source, target)
+        calls.append(source)
+        if len(calls) - 1 == crash_at and after_rename:
+            raise Crash()
+
+    def write(journal, record):
+        if "commit" in record:
+            raise Crash()
+        real_write(journal, record)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(bulk_rename.os, "rename", rename)
+        patch.setattr(bulk_rename, "_write_journal_record", write)
+        with pytest.raises(Crash):
+            bulk_rename.apply_renames(str(directory), renames, conflicts)
+
+
+def _contents(directory):
+    return {name: (directory / name).read_bytes() for name in os.listdir(directory)}
+
+
+@pytest.mark.parametrize("plan", sorted(PLANS))
+@pytest.mark.parametrize("after_rename", [False, True])
+def test_resume_and_rollback_after_crash(bulk_rename, monkeypatch, tmp_path, plan, after_rename):
+    files, renames, conflicts = PLANS[plan]
+    final = {name: data for name, data in files.items() if name not in {old for old, _ in renames}}
+    final.update({new: files[old] for old, new in renames})
+    steps = bulk_rename._build_steps(renames, conflicts)
+
+    for crash_at in range(len(steps) + 1):
+        for recovery, expected in ((bulk_rename.resume_renames, final), (bulk_rename.rollback_renames, files)):
+            directory = tmp_path / f"{crash_at}-{recovery.__name__}"
+            _make_files(directory, files)
+            _crash_run(bulk_rename, monkeypatch, directory, renames, conflicts, crash_at, after_rename)
+            recovery(str(directory))
+            assert _contents(directory) == expected, (crash_at, recovery.__name__)
+
+
+def test_resume_leaves_a_committed_journal(bulk_rename, tmp_path):
+    directory = tmp_path / "files"
+    _make_files(directory, {"a.txt": b"a", "b.txt": b"b"})
+    bulk_rename.apply_renames(str(directory), [("a.txt", "b.txt"), ("b.txt", "a.txt")], [], keep_journal=True)
+    bulk_rename.resume_renames(str(directory))
+    assert (directory / "a.txt").read_bytes() == b"b"
+    bulk_rename.rollback_renames(str(directory))
+    assert _contents(directory) == {"a.txt": b"a", "b.txt": b"b"}
+
+
+def test_discard_removes_only_the_planned_displaced_files(bulk_rename, monkeypatch, tmp_path):
+    directory = tmp_path / "files"
+    _make_files(directory, {"a.txt": b"a", "b.txt": b"b", ".c.txt.bulk_rename.displaced": b"user file"})
+
+    def no_listing(path="."):
+        raise AssertionError("the directory should not be listed")
+
+    monkeypatch.setattr(bulk_rename.os, "scandir", no_listing)
+    monkeypatch.setattr(bulk_rename.os, "listdir", no_listing)
+    bulk_rename.apply_renames(str(directory), [("a.txt", "b.txt")], ["b.txt"], keep_journal=True)
+    bulk_rename.discard_journal(str(directory))
+    bulk_rename.apply_renames(str(directory), [("b.txt", "d.txt")], [])
+    monkeypatch.undo()
+
+    assert _contents(directory) == {"d.txt": b"a", ".c.txt.bulk_rename.displaced": b"user file"}
+
+
+def test_directory_index_is_cached_until_the_directory_changes(bulk_rename, tmp_path, capsys):
+    directory = tmp_path / "files"
+    _make_files(directory, {"b.txt": b"12345", "a.log": b"1", "c.TXT": b"123"})
+
+    index = bulk_rename.get_directory_index(str(directory))
+    assert bulk_rename.get_directory_index(str(directory)) is index
+    assert index.count() == 3
+    assert index.sorted_names() == ["a.log", "b.txt", "c.TXT"]
+    assert sorted(index.names_with_extension(".txt")) == ["b.txt", "c.TXT"]
+    filtered = bulk_rename.filter_files_by_size(str(directory), 3)
+    assert sorted(filtered) == [os.path.join(str(directory), name) for name in ("a.log", "c.TXT")]
+
+    (directory / "d.txt").write_bytes(b"")
+    os.utime(directory, ns=(0, 0))  # a different directory mtime even on coarse-grained filesystems
+    bulk_rename.count_files(str(directory))
+    assert capsys.readouterr().out.endswith("Total files: 4\n")
+
+
+def test_recursive_index_sees_subdirectories(bulk_rename, tmp_path):
+    directory = tmp_path / "files"
+    _make_files(directory, {"a.txt": b"a"})
+    _make_files(directory / "nested", {"b.txt": b"b"})
+    index = bulk_rename.DirectoryIndex(str(directory), recursive=True)
+    assert index.sorted_names() == ["a.txt", os.path.join("nested", "b.txt")]
+    assert not index.is_stale()
+    (directory / "nested" / "c.txt").write_bytes(b"c")
+    os.utime(directory / "nested", ns=(0, 0))
+    assert index.is_stale()
+
+
+def test_incremental_backup_hashes_and_stores_only_changes(bulk_rename, tmp_path, capsys):
+    directory = tmp_path / "files"
+    store = str(tmp_path / "store")
+    _make_files(directory, {"a.txt": b"same", "b.txt": b"same", "c.txt": b"first"})
+
+    first = bulk_rename.incremental_backup(str(directory), store)
+    assert "3 files: 3 hashed, 2 new objects (9 bytes copied)" in capsys.readouterr().out
+    (directory / "c.txt").write_bytes(b"second")
+    second = bulk_rename.incremental_backup(str(directory), store)
+    assert "3 files: 1 hashed, 1 new objects (6 bytes copied)" in capsys.readouterr().out
+    assert bulk_rename.list_snapshots(store) == [first, second]
+
+    (directory / "a.txt").rename(directory / "renamed.txt")
+    (directory / "b.txt").write_bytes(b"changed")
+    bulk_rename.restore_snapshot(str(directory), store, snapshot=first, prune=True)
+    assert _contents(directory) == {"a.txt": b"same", "b.txt": b"same", "c.txt": b"first"}
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_watch_renames_existing_and_incoming_files(bulk_rename, tmp_path, use_inotify):
+    directory = tmp_path / "files"
+    _make_files(directory, {"old.txt": b"old", "in_003.txt": b"taken", "skip.log": b"log"})
+    stop = threading.Event()
+    watcher = threading.Thread(target=bulk_rename.watch_and_rename, args=(str(directory), "in", ".txt"),
+                               kwargs={"debounce": 0.05, "poll_interval": 0.05, "use_inotify": use_inotify,
+                                       "stop_event": stop})
+    watcher.start()
+    try:
+        _wait_for(lambda: (directory / "in_004.txt").exists())
+        for name in ("a.txt", "b.txt"):
+            (directory / name).write_bytes(name.encode())
+        _wait_for(lambda: (directory / "in_006.txt").exists())
+    finally:
+        stop.set()
+        watcher.join()
+
+    contents = _contents(directory)
+    assert contents.pop(bulk_rename.WATCH_STATE_NAME)
+    assert contents == {"in_003.txt": b"taken", "in_004.txt": b"old", "skip.log": b"log",
+                        "in_005.txt": b"a.txt", "in_006.txt": b"b.txt"}
+    assert bulk_rename._load_watch_counter(str(directory), "in") == 7
+
+
+def test_rename_batch_skips_a_file_that_disappeared(bulk_rename, monkeypatch, tmp_path, capsys):
+    directory = tmp_path / "files"
+    _make_files(directory, {"a.txt": b"a", "b.txt": b"b", "c.txt": b"c"})
+    real_rename = os.rename
+
+    def rename(source, target):
+        if os.path.basename(source) == "b.txt":
+            raise FileNotFoundError(2, "No such file or directory", source)
+        real_rename(source, target)
+
+    monkeypatch.setattr(bulk_rename.os, "rename", rename)
+    assert bulk_rename._rename_batch(str(directory), "in", ["a.txt", "b.txt", "c.txt"], 1) == 3
+    assert "Could not rename 'b.txt'" in capsys.readouterr().out
+    assert _contents(directory) == {"in_001.txt": b"a", "b.txt": b"b", "in_002.txt": b"c",
+                                    bulk_rename.WATCH_STATE_NAME: b'{"prefix": "in", "counter": 3}'}
+
+
+@pytest.mark.parametrize("restore", ["y", "n"])
+def test_bulk_rename_chain_with_undo_journal(bulk_rename, monkeypatch, tmp_path, restore):
+    directory = tmp_path / "files"
+    files = {"a.txt": b"a", "b.txt": b"b", "p_001.txt": b"p1", "p_003.txt": b"p3"}
+    _make_files(directory, files)
+    monkeypatch.setattr("builtins.input", lambda prompt: restore)
+
+    bulk_rename.bulk_rename(str(directory), "p", backup=True)
+    if restore == "y":
+        assert _contents(directory) == files
+    else:
+        assert _contents(directory) == {"p_001.txt": b"a", "p_002.txt": b"b", "p_003.txt": b"p1", "p_004.txt": b"p3"}
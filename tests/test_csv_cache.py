@@ -0,0 +1,42 @@
+import pytest
+
+from csv_cache import ColumnCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ColumnCache(str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("i,f,s\n1,1.5,a\n2,2.5,b\n")
+    return str(path)
+
+
+def test_cache_hits_are_writable(cache, csv_file):
+    for _ in range(2):
+        data_frame = cache.read_csv(csv_file)
+        data_frame.loc[0, "i"] = 99
+        assert data_frame.loc[0, "i"] == 99
+    assert cache.read_csv(csv_file).loc[0, "i"] == 1
+
+
+def test_high_cardinality_column_is_not_cached(tmp_path, csv_file):
+    cache = ColumnCache(str(tmp_path / "cache"), max_categories=1)
+    chunks = list(cache.iter_csv_chunks(csv_file, 1))
+    assert [chunk.loc[chunk.index[0], "s"] for chunk in chunks] == ["a", "b"]
+    assert not any(path.is_dir() for path in (tmp_path / "cache").iterdir())
+
+
+@pytest.mark.parametrize("read", [
+    lambda cache, csv_file, usecols: cache.read_csv(csv_file, usecols=usecols),
+    lambda cache, csv_file, usecols: cache.iter_csv_chunks(csv_file, 1, usecols=usecols),
+])
+def test_missing_usecols_raise_like_pandas(cache, csv_file, read):
+    with pytest.raises(ValueError, match="columns expected but not found"):
+        read(cache, csv_file, ["i", "missing"])  # miss
+    cache.read_csv(csv_file)
+    with pytest.raises(ValueError, match="columns expected but not found"):
+        read(cache, csv_file, ["i", "missing"])  # hit
@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def csv_to_excel(load_script, monkeypatch):
+    module = load_script("CSV to Excel.py")
+    monkeypatch.setattr(module, "USE_CSV_CACHE", False)
+    return module
+
+
+def test_filter_column_missing_from_one_file(csv_to_excel, tmp_path):
+    first = tmp_path / "a.csv"
+    second = tmp_path / "b.csv"
+    first.write_text("group,kind,keep,value\nx,p,yes,1\nx,q,yes,3\nx,p,no,50\n")
+    second.write_text("group,kind,value\nx,p,100\ny,p,200\n")
+    plan = csv_to_excel.QueryPlan([str(first), str(second)], [
+        csv_to_excel.Filter([("keep", "yes")]),
+        csv_to_excel.Aggregate(["group", "kind"], "value", "sum"),
+    ])
+
+    expected = pd.DataFrame({"group": ["x", "x"], "kind": ["p", "q"], "value": [1.0, 3.0]})
+    for result in (plan.collect(), pd.concat(plan.stream(chunk_size=1))):
+        result = result.sort_values(["group", "kind"]).reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_rollover_sheet_names_do_not_clash_with_partitions(csv_to_excel, tmp_path):
+    import openpyxl
+
+    excel_file = str(tmp_path / "split.xlsx")
+    namer = csv_to_excel.PartitionNamer(excel_file, "sheets")
+    chunk = pd.DataFrame({"value": [1, 2, 3]})
+    with csv_to_excel.StreamingExcelWriter(excel_file, max_rows=2, namer=namer) as writer:
+        writer.write_chunk(chunk, sheet_name=namer(("a",)))
+        writer.write_chunk(chunk, sheet_name=namer(("a (2)",)))
+        writer.write_chunk(chunk, sheet_name=namer(("a",)))
+
+    sheet_names = openpyxl.load_workbook(excel_file, read_only=True).sheetnames
+    assert len(sheet_names) == len({name.lower() for name in sheet_names}) == writer.sheet_count == 9
+
+
+def test_partitions_named_like_the_default_sheet(csv_to_excel, tmp_path):
+    import openpyxl
+
+    excel_file = str(tmp_path / "split.xlsx")
+    data_frame = pd.DataFrame({"key": ["Sheet1", "Sheet", "Sheet1"], "value": [1, 2, 3]})
+    csv_to_excel.save_split_to_excel(data_frame, excel_file, ["key"])
+
+    workbook = openpyxl.load_workbook(excel_file, read_only=True)
+    assert workbook.sheetnames == ["Sheet1", "Sheet"]
+    assert [row[1] for row in workbook["Sheet"].iter_rows(min_row=2, values_only=True)] == [2]
+
+    namer = csv_to_excel.PartitionNamer(excel_file, "sheets")
+    chunk = pd.DataFrame({"value": [1, 2, 3]})
+    with csv_to_excel.StreamingExcelWriter(excel_file, max_rows=2, namer=namer) as writer:
+        writer.write_chunk(chunk, sheet_name=namer(("Sheet1",)))
+        writer.write_chunk(chunk, sheet_name=namer(("Sheet",)))
+
+    sheet_names = openpyxl.load_workbook(excel_file, read_only=True).sheetnames
+    assert len(sheet_names) == len({name.lower() for name in sheet_names}) == writer.sheet_count == 6
+
+
+@pytest.mark.parametrize("operations", [
+    lambda m: [m.Dedup()],
+    lambda m: [m.Sort("key")],
+    lambda m: [m.Uppercase(["name"]), m.Dedup(), m.Sort("key")],
+    lambda m: [m.Rename({"key": "group"}), m.Sort("group"), m.Filter([("name", "b")])],
+    lambda m: [m.Dedup(), m.Aggregate(["key"], "value", "sum")],
+    lambda m: [m.Sort("value"), m.Aggregate(["key"], "value", "count")],
+])
+def test_spilled_steps_keep_pandas_order_and_results(csv_to_excel, operations):
+    data_frame = pd.DataFrame({
+        "key": [3, 1, 2, 1, 3, 2, 1, None, 2],
+        "name": ["c", "b", "a", "b", "x", "a", "z", "n", "b"],
+        "value": [None, 1.0, 5.0, 1.0, None, 5.0, 2.0, 7.0, 3.0],
+    })
+    operations = operations(csv_to_excel)
+    chunks = [data_frame.iloc[start:start + 2] for start in range(0, len(data_frame), 2)]
+
+    spilled = pd.concat(csv_to_excel.spill_to_disk(iter(chunks), operations, chunk_size=3), ignore_index=True)
+    expected = csv_to_excel._apply_operations(data_frame, operations).reset_index(drop=True)
+    pd.testing.assert_frame_equal(spilled.astype(expected.dtypes.to_dict()), expected)
+
+
+@pytest.mark.parametrize("rows, expected_keys", [
+    (["1,2", "1,3", "a,4", "1,5"], ["1", "a"]),
+    (["1,2", "1,3", "1.0,4", "2,5"], [1.0, 2.0]),
+    (["True,2", "True,3", "False,4", "true,5"], [False, True]),
+])
+def test_chunked_aggregate_keeps_group_keys_consistent(csv_to_excel, tmp_path, rows, expected_keys):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("key,value\n" + "\n".join(rows) + "\n")
+    operations = [csv_to_excel.Rename({"key": "group"})]
+    aggregate = csv_to_excel.Aggregate(["group"], "value", "sum")
+
+    result = csv_to_excel.aggregate_in_chunks(str(csv_file), operations, aggregate, chunk_size=2)
+    expected = aggregate.apply(csv_to_excel._apply_operations(pd.read_csv(csv_file), operations))
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False)
+    assert sorted(result["group"], key=str) == sorted(expected_keys, key=str)
+
+
+def test_chunked_aggregate_reports_malformed_rows(csv_to_excel, tmp_path, capsys):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("key,value\n1,2\n1,3\n1,4\n1,2,3\n")
+    aggregate = csv_to_excel.Aggregate(["key"], "value", "sum")
+
+    assert csv_to_excel.aggregate_in_chunks(str(csv_file), [], aggregate, chunk_size=2) is None
+    assert "Unable to aggregate" in capsys.readouterr().out
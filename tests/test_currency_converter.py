@@ -0,0 +1,259 @@
+import numpy as np
+import pytest
+
+RATES = {"USD": 1.0, "EUR": 0.9214, "JPY": 149.58, "KWD": 0.30752, "VND": 25410.0, "IDR": 15900.0}
+
+
+class FixedRateStore:
+    def rates(self):
+        return RATES
+
+
+@pytest.fixture
+def converter(load_script):
+    return load_script("Currency Converter.py").CurrencyConverter(store=FixedRateStore())
+
+
+@pytest.mark.parametrize("from_currency, to_currency, amount", [
+    ("VND", "USD", 10 ** 9),
+    ("IDR", "USD", 10 ** 11),
+    ("JPY", "KWD", 10 ** 9),
+    ("USD", "VND", 123_456_789),
+    ("KWD", "JPY", 987_654_321),
+    ("EUR", "IDR", 10 ** 12),  # too large for the int64 fast path
+])
+def test_minor_units_match_float_conversion(converter, load_script, from_currency, to_currency, amount):
+    module = load_script("Currency Converter.py")
+    from_digits = module.MINOR_UNIT_DIGITS.get(from_currency, module.DEFAULT_MINOR_DIGITS)
+    to_digits = module.MINOR_UNIT_DIGITS.get(to_currency, module.DEFAULT_MINOR_DIGITS)
+
+    minor = converter.convert_batch([from_currency], [to_currency], np.array([amount]), minor_units=True)
+    expected = converter.convert(from_currency, to_currency, amount / 10 ** from_digits) * 10 ** to_digits
+    assert minor.dtype == np.int64
+    assert abs(int(minor[0]) - expected) <= 1
+
+
+def test_minor_units_overflow(converter):
+    with pytest.raises(OverflowError):
+        converter.convert_batch("USD", "VND", np.array([2 ** 62]), minor_units=True)
+
+
+def _baseline_convert(from_currency, to_currency, amount):
+    """The original CurrencyConverter.convert arithmetic."""
+    if from_currency != "USD":
+        amount = amount / RATES[from_currency]
+    return round(amount * RATES[to_currency], 4)
+
+
+@pytest.mark.parametrize("amount", [0.0, 1.0, 2.5, 100.005, 1234.56785, 0.00005, 7.77775, 10 ** 9 + 0.12345])
+@pytest.mark.parametrize("from_currency, to_currency", [("USD", "EUR"), ("EUR", "JPY"), ("KWD", "USD"), ("VND", "IDR")])
+def test_convert_matches_baseline_rounding(converter, from_currency, to_currency, amount):
+    expected = _baseline_convert(from_currency, to_currency, amount)
+    assert converter.convert(from_currency, to_currency, amount) == expected
+    assert converter.convert_batch([from_currency], [to_currency], [amount])[0] == expected
+
+
+def test_convert_batch_matches_round_near_halves(converter):
+    # x.xxxx5 amounts sit on a rounding half in decimal, so any scaling error shows up here
+    amounts = np.arange(1, 20001) / 1e4 + 0.00005
+    result = converter.convert_batch("USD", "USD", amounts)
+    assert result.tolist() == [round(float(amount), 4) for amount in amounts]
+
+
+def test_convert_keeps_nan_and_infinity(converter):
+    assert np.isnan(converter.convert("EUR", "USD", float("nan")))
+    assert converter.convert("EUR", "USD", float("inf")) == float("inf")
+    result = converter.convert_batch("EUR", "USD", [float("nan"), float("-inf")])
+    assert np.isnan(result[0]) and result[1] == float("-inf")
+
+
+def test_encode_currencies(load_script):
+    import pandas as pd
+
+    module = load_script("Currency Converter.py")
+    index = {"USD": 0, "EUR": 1, "JPY": 2}
+    codes = ["EUR", "USD", "EUR", "JPY"]
+    for column in (codes, np.array(codes, dtype=object), pd.Series(codes), pd.Series(codes, dtype="category")):
+        assert module.encode_currencies(column, index).tolist() == [1, 0, 1, 2]
+    assert module.encode_currencies("JPY", index) == 2
+    assert module.encode_currencies(np.array([2, 0]), index).tolist() == [2, 0]
+
+    for invalid in (["EUR", "XXX"], ["EUR", None], np.array([0, 3]), np.array([-1])):
+        with pytest.raises(KeyError):
+            module.encode_currencies(invalid, index)
+
+
+class CountingFetcher:
+    def __init__(self, rates=RATES, release=None):
+        self.rates = rates
+        self.calls = []
+        self.release = release
+
+    def __call__(self, base):
+        self.calls.append(base)
+        if self.release is not None:
+            assert self.release.wait(10)
+        return dict(self.rates)
+
+
+def test_rate_store_fetches_the_base_table_once(load_script, tmp_path):
+    module = load_script("Currency Converter.py")
+    cache_file = str(tmp_path / "rates.json")
+    fetcher = CountingFetcher()
+    store = module.RateStore(fetcher=fetcher, cache_file=cache_file)
+
+    assert store.rate("EUR", "JPY") == RATES["JPY"] / RATES["EUR"]
+    assert store.rate("KWD", "USD") == 1 / RATES["KWD"]
+    assert fetcher.calls == ["USD"]
+
+    restarted = module.RateStore(fetcher=CountingFetcher(), cache_file=cache_file)
+    assert restarted.rates() == RATES
+    assert restarted.fetcher.calls == []
+
+
+def test_stale_rates_are_served_while_one_refresh_runs(load_script):
+    import threading
+
+    module = load_script("Currency Converter.py")
+    release = threading.Event()
+    fetcher = CountingFetcher(release=release)
+    store = module.RateStore(fetcher=fetcher, ttl=0, cache_file=None)
+    release.set()
+    first = store.rates()
+    release.clear()
+
+    futures = [store.refresh_async() for _ in range(3)]
+    assert futures[0] is futures[1] is futures[2]
+    assert store.rates() is first
+    release.set()
+    assert futures[0].result(10) == RATES
+    assert fetcher.calls == ["USD", "USD"]
+
+
+def test_historical_rates_by_date(load_script, tmp_path):
+    module = load_script("Currency Converter.py")
+    history = module.HistoricalRateStore(str(tmp_path / "history"))
+    assert history.ingest([
+        {"base": "USD", "date": "2024-01-01", "rates": {"USD": 1.0, "EUR": 0.9}},
+        {"base": "USD", "date": "2024-01-05", "rates": {"USD": 1.0, "EUR": 0.8, "JPY": 140.0}},
+    ]) == 2
+    # an older date forces a rewrite; a snapshot in another base is rebased
+    assert history.ingest([{"base": "EUR", "date": "2024-01-03", "rates": {"EUR": 1.0, "USD": 1.25}}]) == 1
+
+    reopened = module.HistoricalRateStore(str(tmp_path / "history"))
+    assert reopened.rate_on("EUR", "2024-01-04") == 0.8  # the previous snapshot covers gaps
+    assert reopened.rate_on("EUR", "2024-01-05") == 0.8
+    with pytest.raises(KeyError):
+        reopened.rate_on("EUR", "2023-12-31")
+    dates, rates = reopened.rates_between("EUR", "2024-01-02", "2024-01-31")
+    assert dates.astype(str).tolist() == ["2024-01-03", "2024-01-05"]
+    assert rates.tolist() == [0.8, 0.8]
+
+    converter = module.CurrencyConverter(store=FixedRateStore(), history=reopened)
+    result = converter.convert_batch("EUR", "USD", [9.0, 8.0, 8.0], dates=["2024-01-01", "2024-01-06", "2023-01-01"])
+    assert result[:2].tolist() == [10.0, 10.0] and np.isnan(result[2])
+    assert np.isnan(reopened.convert("USD", "JPY", [1.0], ["2024-01-03"])[0])
+
+
+class FakeMaster:
+    """Stands in for the Tk root, collecting after() callbacks instead of running a main loop."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, milliseconds, callback):
+        self.scheduled.append(callback)
+
+    def run_scheduled(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for callback in scheduled:
+            callback()
+
+
+def test_refresh_results_are_delivered_by_polling(load_script):
+    from concurrent.futures import Future
+
+    module = load_script("Currency Converter.py")
+    app = object.__new__(module.App)  # no display needed for the polling logic
+    app.master = FakeMaster()
+    app._pending = []
+    results, errors = [], []
+
+    slow, failing, late = Future(), Future(), Future()
+    app.when_done(slow, results.append, errors.append)
+    app.when_done(failing, results.append, errors.append)
+    app.when_done(late, results.append, errors.append, timeout=0)
+    assert len(app.master.scheduled) == 1
+
+    failing.set_exception(ConnectionError("offline"))
+    app.master.run_scheduled()
+    assert results == [] and [type(error) for error in errors] == [ConnectionError, TimeoutError]
+
+    slow.set_result(RATES)
+    app.master.run_scheduled()
+    assert results == [RATES] and len(errors) == 2
+    assert app.master.scheduled == [] and app._pending == []
+
+
+def _serve(server):
+    import threading
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def rates_api():
+    """A local rates API that answers 304 Not Modified to a matching If-None-Match."""
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append((self.path, self.headers.get("If-None-Match")))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = json.dumps({"base": "USD", "rates": RATES}).encode()
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = _serve(ThreadingHTTPServer(("127.0.0.1", 0), Handler))
+    yield f"http://127.0.0.1:{server.server_port}/latest/{{base}}", requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+def test_service_converts_and_revalidates_rates(load_script, rates_api):
+    import requests
+
+    module = load_script("Currency Converter.py")
+    url_template, requests_seen = rates_api
+    converter = module.make_converter(url_template, cache_file=None)
+    server = _serve(module.make_server(converter, port=0))
+    service = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with requests.Session() as session:
+            reply = session.get(f"{service}/convert", params={"from": "eur", "to": "JPY", "amount": "10"}).json()
+            assert reply["result"] == converter.convert("EUR", "JPY", 10.0)
+            assert session.get(f"{service}/convert", params={"from": "EUR", "to": "XXX"}).status_code == 400
+            assert session.get(f"{service}/nowhere").status_code == 404
+
+            assert converter.store.refresh() == RATES
+            metrics = session.get(f"{service}/metrics").json()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert requests_seen == [("/latest/USD", None), ("/latest/USD", '"v1"')]
+    assert metrics["counters"]["fetch"] == 2 and metrics["counters"]["fetch_not_modified"] == 1
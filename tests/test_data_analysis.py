@@ -0,0 +1,146 @@
+import pytest
+
+
+@pytest.fixture
+def analysis(load_script):
+    return load_script("Data Analysis and Visualization.py")
+
+
+def test_streaming_statistics_ignores_trailing_blank_lines(analysis, tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("a,b\n1,2\n3,4\n5,6\n" + "\n" * 20)
+    for workers in (1, 4):
+        summary = analysis.streaming_statistics(str(csv_file), ["a"], workers=workers)["a"]
+        assert summary["count"] == 3
+        assert summary["mean"] == 3
+
+
+def test_statistics_default_handles_quoted_line_breaks(analysis, tmp_path):
+    # byte-range splitting would cut these rows, so it must be opt-in on any machine
+    assert analysis.streaming_statistics.__defaults__[0] == analysis.calculate_statistics.__defaults__[0] == 1
+    csv_file = tmp_path / "notes.csv"
+    rows = "".join(f'{number},"line one\nline two {number}"\n' for number in range(1, 2001))
+    csv_file.write_text("value,note\n" + rows)
+    mean, median, summary = analysis.calculate_statistics(str(csv_file), "value")
+    assert summary["count"] == 2000
+    assert mean == 1000.5
+
+
+@pytest.fixture
+def measurements(tmp_path):
+    import numpy as np
+    import pandas as pd
+
+    generator = np.random.default_rng(7)
+    x = generator.normal(size=500)
+    data = pd.DataFrame({"x": x, "y": 2 * x + generator.normal(size=500), "z": generator.uniform(size=500),
+                         "label": generator.choice(["a", "b"], size=500)})
+    data.loc[::7, "y"] = np.nan
+    csv_file = tmp_path / "measurements.csv"
+    data.to_csv(csv_file, index=False)
+    return str(csv_file), data
+
+
+def test_render_charts_writes_images_in_worker_processes(analysis, measurements, tmp_path):
+    csv_file, _ = measurements
+    jobs = [("histogram", "x"), ("scatter", "x", "y"), ("heatmap",), ("boxplot", "missing")]
+    results = analysis.render_charts(csv_file, jobs, str(tmp_path / "charts"), workers=2, image_format="svg")
+
+    for job in jobs[:3]:
+        with open(results[job]) as image:
+            assert image.read(200).lstrip().startswith("<?xml")
+    assert "missing" in results[("boxplot", "missing")]
+    with pytest.raises(ValueError):
+        analysis.render_charts(csv_file, [("scatter", "x")], str(tmp_path / "charts"))
+
+
+def test_binned_kde_matches_the_exact_kde(analysis):
+    import numpy as np
+
+    values = np.random.default_rng(3).normal(5, 2, size=20_000)
+    support, density = analysis.binned_kde(values)
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    exact = np.exp(-0.5 * ((support[:, None] - values[None, :]) / bandwidth) ** 2).sum(axis=1) / (
+        len(values) * bandwidth * np.sqrt(2 * np.pi))
+    assert support[0] == values.min() and support[-1] == values.max()
+    assert np.max(np.abs(density - exact)) < 1e-3 * exact.max()
+    assert analysis.binned_kde(np.ones(10)) is None
+
+
+def test_large_data_is_drawn_from_binned_counts(analysis, measurements, monkeypatch, tmp_path):
+    _, data = measurements
+    monkeypatch.setattr(analysis, "LARGE_DATA_ROWS", 100)
+    analysis.plot_scatter(data, "x", "y", output_file=str(tmp_path / "scatter.png"))
+    analysis.plot_histogram(data, "y", output_file=str(tmp_path / "histogram.png"))
+    for name in ("scatter.png", "histogram.png"):
+        assert (tmp_path / name).read_bytes().startswith(b"\x89PNG")
+
+    plt, sns, figure, axes = analysis._new_figure("unused.png")
+    analysis._draw_binned_histogram(sns, axes, data["y"])
+    assert sum(patch.get_height() for patch in axes.patches) == data["y"].notna().sum()
+    plt, sns, figure, axes = analysis._new_figure("unused.png")
+    analysis._draw_density_scatter(axes, data["x"], data["y"])
+    assert len(axes.images) == 1 and not axes.collections
+
+
+def test_correlation_engine_matches_pandas(analysis, measurements):
+    import pandas as pd
+
+    _, data = measurements
+    data = data.drop(columns="label")
+    expected = data.corr()
+
+    whole = analysis.CorrelationEngine()
+    whole.update(data, chunk_rows=64)
+    pd.testing.assert_frame_equal(whole.correlation(), expected, atol=1e-12)
+
+    merged = analysis.CorrelationEngine()
+    for part in (data.iloc[:100], data.iloc[100:] + 1000):
+        engine = analysis.CorrelationEngine()
+        engine.update(part)
+        merged.merge(engine)
+    shifted = pd.concat([data.iloc[:100], data.iloc[100:] + 1000])
+    pd.testing.assert_frame_equal(merged.correlation(), shifted.corr(), atol=1e-9)
+
+
+def test_correlations_are_cached_and_follow_appended_rows(analysis, measurements):
+    _, data = measurements
+    data = data.drop(columns="label").iloc[:300].copy()
+    analysis.clear_correlation_engines()
+
+    engine = analysis.correlation_engine(data)
+    assert analysis.calculate_correlation(data, "x", "y") == pytest.approx(data["x"].corr(data["y"]), abs=1e-12)
+    data.loc[len(data)] = [10.0, -10.0, 0.5]
+    assert analysis.correlation_engine(data) is engine and engine.rows == len(data)
+    assert analysis.calculate_correlation(data, "x", "y") == pytest.approx(data["x"].corr(data["y"]), abs=1e-12)
+
+    analysis.clear_correlation_engines(data)
+    assert analysis.correlation_engine(data, build=False) is None
+
+
+def test_run_report_loads_once_and_shares_work(analysis, measurements, tmp_path):
+    import json
+
+    csv_file, data = measurements
+    analyses = [("stats", "x", "y"), ("correlation", "x", "y"), ("histogram", "z")]
+    report_file = tmp_path / "report.json"
+    analysis.run_report(csv_file, analyses, str(report_file))
+    report = json.loads(report_file.read_text())
+
+    assert report["rows"] == len(data)
+    assert report["columns_loaded"] == ["x", "y", "z"]
+    assert [step["step"] for step in report["steps"]] == ["plan", "load", "stats"]
+    stats, correlation, histogram = report["analyses"]
+    assert stats["result"]["y"]["count"] == data["y"].count()
+    assert stats["result"]["y"]["mean"] == pytest.approx(data["y"].mean())
+    assert stats["result"]["x"]["50%"] == pytest.approx(data["x"].median())
+    assert correlation["result"] == pytest.approx(data["x"].corr(data["y"]))
+    assert (tmp_path / histogram["chart"]).exists()
+
+    html_report = analysis.run_report(csv_file, [("heatmap",), ("correlation", "x", "z")], str(tmp_path / "r.html"))
+    assert html_report["columns_loaded"] == list(data.columns)
+    assert [step["step"] for step in html_report["steps"]] == ["plan", "load", "correlation engine"]
+    assert "<img src='charts/heatmap.png'" in (tmp_path / "r.html").read_text()
+
+    with pytest.raises(ValueError):
+        analysis.plan_report(csv_file, [("scatter", "x")])
@@ -0,0 +1,155 @@
+import pytest
+
+from imap_stub import ImapStubServer
+
+
+@pytest.fixture
+def email_automation(load_script):
+    return load_script("Email Automation.py")
+
+
+def _start_server(capabilities=("IMAP4rev1",), post_login_capabilities=()):
+    server = ImapStubServer(capabilities=capabilities, post_login_capabilities=post_login_capabilities).start()
+    server.add_mailbox("Archive")
+    for number in range(8):
+        subject = ("Spam", "Archive", "Keep", "Spam")[number % 4]
+        server.add_message(f"From: sender{number}@example.com\r\nSubject: {subject} {number}\r\n\r\nBody\r\n")
+    return server
+
+
+@pytest.fixture
+def server():
+    server = _start_server(post_login_capabilities=("UIDPLUS", "MOVE"))
+    yield server
+    server.stop()
+
+
+def _subjects(server, mailbox):
+    return sorted(raw.split(b"Subject: ")[1].split(b"\r\n")[0].decode()
+                  for _, _, raw in server.mailboxes[mailbox].messages)
+
+
+def test_capabilities_advertised_after_login_are_used(email_automation, server):
+    session = email_automation.ImapSession("127.0.0.1", server.port, "user", "password", use_ssl=False)
+    session.connect()
+    assert {"UIDPLUS", "MOVE"} <= set(session.capabilities)
+
+    server.reset_counts()
+    email_automation.delete_emails('SUBJECT "Spam"', session=session)
+    email_automation.move_emails('SUBJECT "Archive"', "Archive", session=session)
+    session.logout()
+
+    assert server.commands["UID MOVE"] == 1
+    assert server.commands["UID EXPUNGE"] == 1
+    assert server.commands["UID COPY"] == server.commands["EXPUNGE"] == 0
+    assert _subjects(server, "INBOX") == ["Keep 2", "Keep 6"]
+    assert _subjects(server, "Archive") == ["Archive 1", "Archive 5"]
+
+
+def test_without_move_or_uidplus_falls_back_to_copy_and_expunge(email_automation):
+    server = _start_server()
+    try:
+        session = email_automation.ImapSession("127.0.0.1", server.port, "user", "password", use_ssl=False)
+        session.connect()
+        email_automation.move_emails('SUBJECT "Archive"', "Archive", session=session)
+        session.logout()
+    finally:
+        server.stop()
+
+    assert server.commands["UID MOVE"] == server.commands["UID EXPUNGE"] == 0
+    assert server.commands["UID COPY"] == server.commands["EXPUNGE"] == 1
+    assert _subjects(server, "Archive") == ["Archive 1", "Archive 5"]
+
+
+def test_flag_and_expunge_commands_survive_a_dropped_connection(email_automation, server, capsys):
+    session = email_automation.ImapSession("127.0.0.1", server.port, "user", "password", use_ssl=False)
+    session.connect()
+    session.select("INBOX")
+    server.mailboxes["INBOX"].messages[0][1].add("\\Seen")
+
+    server.drop_connections()
+    email_automation.mark_email_as_unread("1", session=session)
+    assert "successfully" in capsys.readouterr().out
+    assert "\\Seen" not in server.mailboxes["INBOX"].messages[0][1]
+
+    server.drop_connections()
+    session.uid("STORE", "1:2", "+FLAGS.SILENT", "(\\Deleted)")
+    server.drop_connections()
+    session.uid("EXPUNGE", "1:2")
+    server.drop_connections()
+    session.uid("MOVE", "3", "Archive")
+    session.logout()
+
+    assert [entry[0] for entry in server.mailboxes["INBOX"].messages] == [4, 5, 6, 7, 8]
+    assert _subjects(server, "Archive") == ["Keep 2"]
+
+
+def test_copy_is_not_repeated_after_a_dropped_connection(email_automation, server):
+    session = email_automation.ImapSession("127.0.0.1", server.port, "user", "password", use_ssl=False)
+    session.connect()
+    session.select("INBOX")
+    server.drop_connections()
+    with pytest.raises((email_automation.imaplib.IMAP4.abort, OSError)):
+        session.uid("COPY", "1", "Archive")
+    session.logout()
+    assert server.mailboxes["Archive"].messages == []
+
+
+@pytest.fixture
+def pooled(email_automation, server, monkeypatch):
+    """Points the script's configuration at the stub server, so functions borrow from the shared pool."""
+    monkeypatch.setattr(email_automation, "imap_server", "127.0.0.1")
+    monkeypatch.setattr(email_automation, "imap_port", server.port)
+    monkeypatch.setattr(email_automation, "imap_use_ssl", False)
+    yield email_automation
+    email_automation.close_imap_pool()
+
+
+def test_pooled_sessions_are_reused_and_reconnect(pooled, server, capsys):
+    pooled.search_emails('SUBJECT "Spam"')
+    pooled.search_emails('SUBJECT "Keep"')
+    assert (server.connections, server.logins, server.commands["SELECT"]) == (1, 1, 1)
+
+    server.drop_connections()
+    pooled.search_emails('SUBJECT "Archive"')
+    assert server.logins == 2
+    assert "error" not in capsys.readouterr().out
+
+
+def test_pool_follows_configuration_changes(pooled, server, monkeypatch):
+    pooled.search_emails("ALL")
+    other = _start_server()
+    try:
+        monkeypatch.setattr(pooled, "imap_port", other.port)
+        assert [summary.uid for summary in pooled.iter_message_summaries("ALL")] == list(range(1, 9))
+        assert other.logins == 1
+    finally:
+        pooled.close_imap_pool()
+        other.stop()
+
+
+def test_summaries_are_fetched_and_marked_seen_in_uid_batches(pooled, server):
+    server.reset_counts()
+    summaries = list(pooled.iter_message_summaries("ALL", mark_seen=True, batch_size=3))
+
+    assert [summary.uid for summary in summaries] == list(range(1, 9))
+    assert summaries[1].subject == "Archive 1" and summaries[1].sender == "sender1@example.com"
+    assert server.commands["UID SEARCH"] == 1
+    assert server.commands["UID FETCH"] == server.commands["UID STORE"] == 3
+    assert all("\\Seen" in flags for _, flags, _ in server.mailboxes["INBOX"].messages)
+
+
+def _expand(uid_set):
+    uids = []
+    for part in uid_set.split(","):
+        low, _, high = part.partition(":")
+        uids.extend(range(int(low), int(high or low) + 1))
+    return uids
+
+
+def test_uid_sets_are_compressed_and_chunked(email_automation):
+    uids = [b"1", b"2", b"3", b"7", b"9", b"10"] + [str(uid).encode() for uid in range(20, 40, 2)]
+    assert email_automation.compress_uids(uids[:6]) == "1:3,7,9:10"
+    chunks = list(email_automation.uid_set_chunks(uids, max_length=10))
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert [uid for chunk in chunks for uid in _expand(chunk)] == sorted(int(uid) for uid in uids)